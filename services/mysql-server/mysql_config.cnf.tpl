@@ -12,16 +12,22 @@ ssl-ca = "/etc/mysql/ssl/superset_cluster_ca_certificate.pem"
 ssl-cert = "/etc/mysql/ssl/mysql_server_certificate.pem"
 ssl-key = "/etc/mysql/ssl/mysql_server_key.pem"
 require_secure_transport = "ON"
-max_connections = "50"
+max_connections = "${MAX_CONNECTIONS}"
 max_connect_errors = "50"
 slow_query_log = "ON"
 long_query_time = "10"
 log_queries_not_using_indexes = "ON"
 slow_query_log_file = "/var/log/mysql/slow-queries.log"
-replica_parallel_workers = "4"
+replica_parallel_workers = "${REPLICA_PARALLEL_WORKERS}"
 replica_parallel_type = "LOGICAL_CLOCK"
 replica_preserve_commit_order = "ON"
 innodb_flush_method = "O_DIRECT"
 innodb_change_buffer_max_size = "10"
-innodb_buffer_pool_size = "1G"
-innodb_buffer_pool_instances = "1"
+innodb_buffer_pool_size = "${INNODB_BUFFER_POOL_SIZE}"
+innodb_buffer_pool_instances = "${INNODB_BUFFER_POOL_INSTANCES}"
+innodb_redo_log_capacity = "${INNODB_REDO_LOG_CAPACITY}"
+innodb_io_capacity = "${INNODB_IO_CAPACITY}"
+innodb_io_capacity_max = "${INNODB_IO_CAPACITY_MAX}"
+innodb_flush_neighbors = "${INNODB_FLUSH_NEIGHBORS}"
+innodb_read_io_threads = "${INNODB_READ_IO_THREADS}"
+innodb_write_io_threads = "${INNODB_WRITE_IO_THREADS}"
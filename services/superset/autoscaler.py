@@ -0,0 +1,248 @@
+"""
+Superset Worker Autoscaler
+
+This module watches the Celery broker and workers of the Superset service and scales
+the Celery worker pools and the Superset service replicas within configured limits.
+
+Classes:
+--------
+- `Sample`:
+  One observation: the number of tasks waiting in the broker queue, the estimated
+  time a new task waits before it is started, the share of busy worker processes
+  and the pool size of every worker.
+
+- `CeleryMetrics`:
+  Takes samples from the Redis broker, where the queue length is read, and from the
+  workers consuming the queue through Celery remote control, which reports their pools,
+  active and completed tasks. Workers of other queues are told apart by their name prefix.
+  The waiting time is estimated from the queue length and the measured task throughput.
+
+- `Autoscaler`:
+  Decides on every sample whether to grow or shrink the worker pools or to change the
+  number of Superset service replicas, and applies the decision through Celery remote
+  control and the Docker Swarm API.
+
+Key Functionalities:
+--------------------
+- Hysteresis: scaling up requires `scale_up_after` consecutive samples under pressure,
+  scaling down `scale_down_after` consecutive idle samples with an empty queue, and no
+  decision is taken within `cooldown` seconds after the previous one.
+
+- Scope: only the interactive `sql_lab` queue and its workers are scaled, the `reports` and
+  `maintenance` workers keep their fixed pools.
+
+- Order of Scaling: worker pools grow first, since it is cheap and immediate, replicas are
+  added once all pools are at their maximum. Replicas are removed before pools are shrunk.
+
+- Initialization: the replicas only start Gunicorn and the Celery workers, the metadata database is
+  initialized once by the `initialization` job before the service is created. The number of replicas
+  is not changed while that job still exists, so scaling out never runs next to the migrations.
+
+- Limits: every setting is read from the `AUTOSCALER_<SETTING>` environment variables,
+  see `SETTINGS` for the settings and their defaults.
+
+Example Usage:
+--------------
+The autoscaler runs as the `autoscaler` service next to Superset on one of the management nodes.
+Against a local Redis and a local single node swarm running a `superset` service:
+
+```bash
+AUTOSCALER_MAX_REPLICAS=3 python3 autoscaler.py --broker redis://localhost:6379/0 --service superset
+```
+"""
+
+import argparse
+import logging
+import os
+import time
+
+import celery  # pylint: disable=import-error
+import docker
+import redis  # pylint: disable=import-error
+
+logger = logging.getLogger(__name__)
+
+SETTINGS = {
+    "min_concurrency": 2.0,
+    "max_concurrency": 8.0,
+    "min_replicas": 1.0,
+    "max_replicas": 1.0,
+    "step": 2.0,
+    "scale_up_utilisation": 0.8,
+    "scale_down_utilisation": 0.3,
+    "target_latency": 10.0,
+    "scale_up_after": 2.0,
+    "scale_down_after": 6.0,
+    "cooldown": 60.0,
+    "interval": 10.0
+}
+
+PRIORITY_SEPARATOR = "\x06\x16"
+
+
+class Sample:  # pylint: disable=too-few-public-methods
+    def __init__(self, depth: int, latency: float, utilisation: float, workers: dict[str, int]) -> None:
+        self.depth = depth
+        self.latency = latency
+        self.utilisation = utilisation
+        self.workers = workers
+
+    def __repr__(self) -> str:
+        return (
+            f"Sample(depth={self.depth}, latency={self.latency:.1f}s, "
+            f"utilisation={self.utilisation:.2f}, workers={self.workers})"
+        )
+
+
+class CeleryMetrics:
+    def __init__(self, app: celery.Celery, broker: redis.Redis, queue: str) -> None:
+        self.app = app
+        self.broker = broker
+        self.worker_prefix = f"{queue}@"
+        self.queues = [queue] + [f"{queue}{PRIORITY_SEPARATOR}{priority}" for priority in (3, 6, 9)]
+        self.completed: int | None = None
+        self.sampled = time.monotonic()
+
+    def queue_depth(self) -> int:
+        pipeline = self.broker.pipeline(transaction=False)
+        for queue in self.queues:
+            pipeline.llen(queue)
+        return sum(pipeline.execute())
+
+    def sample(self) -> Sample:
+        inspect = self.app.control.inspect(timeout=2)
+        stats = inspect.stats() or {}
+        active = inspect.active() or {}
+        depth = self.queue_depth()
+        workers = {
+            worker: len(worker_stats["pool"].get("processes", [])) or worker_stats["pool"].get("max-concurrency", 0)
+            for worker, worker_stats in stats.items() if worker.startswith(self.worker_prefix)
+        }
+        busy = sum(len(active.get(worker, [])) for worker in workers)
+        completed = sum(sum(stats[worker].get("total", {}).values()) for worker in workers)
+        now = time.monotonic()
+        throughput = 0.0
+        if self.completed is not None and now > self.sampled:
+            throughput = max(completed - self.completed, 0) / (now - self.sampled)
+        self.completed, self.sampled = completed, now
+        if depth == 0:
+            latency = 0.0
+        else:
+            latency = depth / throughput if throughput > 0 else float("inf")
+        return Sample(depth, latency, busy / sum(workers.values()) if sum(workers.values()) else 1.0, workers)
+
+
+class Autoscaler:
+    # pylint: disable=too-many-instance-attributes
+    def __init__(
+            self,
+            settings: dict[str, float],
+            metrics: CeleryMetrics,
+            client: docker.client.DockerClient,
+            service: str,
+            initialization: str) -> None:
+        # pylint: disable=too-many-arguments,too-many-positional-arguments
+        self.settings = settings
+        self.metrics = metrics
+        self.client = client
+        self.service = service
+        self.initialization = initialization
+        self.pressure = 0
+        self.idle = 0
+        self.decided = float("-inf")
+
+    def replicas(self) -> int:
+        return self.client.services.get(self.service).attrs["Spec"]["Mode"]["Replicated"]["Replicas"]
+
+    def initialized(self) -> bool:
+        return all(
+            service.name != self.initialization
+            for service in self.client.services.list(filters={"name": self.initialization})
+        )
+
+    def decide(self, sample: Sample, replicas: int, now: float) -> tuple[str, dict[str, int] | int] | None:
+        settings = self.settings
+        under_pressure = sample.depth > 0 and (
+            sample.latency > settings["target_latency"] or sample.utilisation >= settings["scale_up_utilisation"]
+        )
+        idle = sample.depth == 0 and sample.utilisation <= settings["scale_down_utilisation"]
+        self.pressure = self.pressure + 1 if under_pressure else 0
+        self.idle = self.idle + 1 if idle else 0
+        if now - self.decided < settings["cooldown"]:
+            return None
+        if self.pressure >= settings["scale_up_after"]:
+            grow = {
+                worker: int(min(settings["step"], settings["max_concurrency"] - concurrency))
+                for worker, concurrency in sample.workers.items() if concurrency < settings["max_concurrency"]
+            }
+            if grow:
+                return "grow", grow
+            if replicas < settings["max_replicas"]:
+                return "replicas", replicas + 1
+        if self.idle >= settings["scale_down_after"]:
+            if replicas > settings["min_replicas"]:
+                return "replicas", replicas - 1
+            shrink = {
+                worker: int(min(settings["step"], concurrency - settings["min_concurrency"]))
+                for worker, concurrency in sample.workers.items() if concurrency > settings["min_concurrency"]
+            }
+            if shrink:
+                return "shrink", shrink
+        return None
+
+    def apply(self, decision: tuple[str, dict[str, int] | int]) -> None:
+        action, target = decision
+        if action == "replicas":
+            if not self.initialized():
+                logger.info("Replicas kept while the %s job initializes the metadata", self.initialization)
+                return
+            self.client.services.get(self.service).scale(target)
+        else:
+            for worker, processes in target.items():  # type: ignore[union-attr]
+                if action == "grow":
+                    self.metrics.app.control.pool_grow(processes, destination=[worker])
+                else:
+                    self.metrics.app.control.pool_shrink(processes, destination=[worker])
+        self.pressure = 0
+        self.idle = 0
+        self.decided = time.monotonic()
+
+    def run(self) -> None:
+        while True:
+            try:
+                sample = self.metrics.sample()
+                decision = self.decide(sample, self.replicas(), time.monotonic())
+                if decision is not None:
+                    logger.info("%s: %s %s", sample, *decision)
+                    self.apply(decision)
+            except (redis.exceptions.RedisError, docker.errors.DockerException, OSError) as error:
+                logger.warning("Autoscaling skipped: %s", error)
+            time.sleep(self.settings["interval"])
+
+
+def settings_from_environment() -> dict[str, float]:
+    return {
+        setting: float(os.environ.get(f"AUTOSCALER_{setting.upper()}", default))
+        for setting, default in SETTINGS.items()
+    }
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s [%(levelname)s] %(message)s')
+    parser = argparse.ArgumentParser(description="Scale Celery worker pools and Superset replicas with the load.")
+    parser.add_argument("--broker", default=os.environ.get("AUTOSCALER_BROKER", "redis://redis:6379/0"))
+    parser.add_argument("--queue", default="sql_lab")
+    parser.add_argument("--service", default="superset")
+    parser.add_argument("--initialization", default="superset-init")
+    arguments = parser.parse_args()
+    Autoscaler(
+        settings_from_environment(),
+        CeleryMetrics(
+            celery.Celery(broker=arguments.broker),
+            redis.Redis.from_url(arguments.broker),
+            arguments.queue
+        ),
+        docker.from_env(),
+        arguments.service,
+        arguments.initialization
+    ).run()
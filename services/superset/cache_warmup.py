@@ -0,0 +1,104 @@
+"""
+Cache Warm-up Module
+
+This module keeps the chart data of the most viewed dashboards in the cache, so that the first viewer after
+an expiry does not wait for the queries to MySQL. It is installed into `/app/pythonpath` of the Superset image,
+imported by the Celery workers through `CeleryConfig.imports` and configured with `CACHE_WARMUP_<SETTING>` in
+`superset_config.py`, whose `beat_schedule` runs the warm-up from the `celery-beat` service.
+
+Functions:
+----------
+- `warm_up_dashboards`:
+  Scheduled `CACHE_WARMUP_LEAD` seconds before the chart data cache expires. Chooses the `top_n` dashboards
+  viewed most since `since` from the Superset action log, queues the warm-up of each of their charts and reports the
+  hit rate of the chart data cache.
+
+- `warm_up_chart`:
+  Runs the queries of one chart of a dashboard as `CACHE_WARMUP_USER`, bypassing the cached values, and
+  stores the results in the chart data cache for another `CACHE_DEFAULT_TIMEOUT`. The rate of these tasks
+  is limited to `CACHE_WARMUP_RATE_LIMIT` on every `maintenance` worker.
+
+- `report`:
+  Computes the hit rate of the chart data cache since the previous warm-up from the reads counted by
+  `compressed_cache.CompressedRedisCache`, and logs it.
+
+Key Functionalities:
+--------------------
+- Reporting: the charts warmed up and failed, the hits and misses seen at the last run and the hit rate
+  since the run before are kept in the Redis hash `cache_warmup_stats` on the broker instance.
+
+Example Usage:
+--------------
+```bash
+redis-cli -h redis HGETALL cache_warmup_stats
+```
+"""
+
+import logging
+
+import redis  # pylint: disable=import-error
+from flask import current_app  # pylint: disable=import-error
+from superset.commands.chart.warm_up_cache import ChartWarmUpCacheCommand  # pylint: disable=import-error
+from superset.commands.exceptions import CommandException  # pylint: disable=import-error
+from superset.extensions import celery_app, security_manager  # pylint: disable=import-error
+from superset.tasks.cache import TopNDashboardsStrategy  # pylint: disable=import-error
+from superset.utils.core import override_user  # pylint: disable=import-error
+
+logger = logging.getLogger(__name__)
+
+STATS_KEY = "cache_warmup_stats"
+
+
+def stats_client() -> redis.Redis:
+    return redis.Redis.from_url(current_app.config["CACHE_WARMUP_STATS_URL"], socket_timeout=1)
+
+
+def report(charts: int) -> None:
+    data_cache = current_app.config["DATA_CACHE_CONFIG"]
+    try:
+        with redis.Redis.from_url(data_cache["CACHE_REDIS_URL"], socket_timeout=1) as cache:
+            hits, misses = (
+                int(value or 0)
+                for value in cache.hmget(f"compression_stats:{data_cache['CACHE_KEY_PREFIX']}", "hits", "misses")
+            )
+        with stats_client() as client:
+            previous_hits, previous_misses = (int(value or 0) for value in client.hmget(STATS_KEY, "hits", "misses"))
+            reads = max(hits - previous_hits, 0) + max(misses - previous_misses, 0)
+            hit_rate = max(hits - previous_hits, 0) * 100 / max(reads, 1)
+            client.hset(
+                STATS_KEY,
+                mapping={"hits": hits, "misses": misses, "hit_rate": f"{hit_rate:.1f}", "charts": charts}
+            )
+    except redis.exceptions.RedisError as error:
+        logger.warning("Cache warm-up statistics not reported: %s", error)
+        return
+    logger.info("Cache warm-up: chart data cache hit rate %.0f%% of %d reads since the previous run", hit_rate, reads)
+
+
+@celery_app.task(name="cache_warmup.warm_up_chart", ignore_result=True)
+def warm_up_chart(chart_id: int, dashboard_id: int) -> None:
+    try:
+        with override_user(security_manager.find_user(username=current_app.config["CACHE_WARMUP_USER"])):
+            error = ChartWarmUpCacheCommand(chart_id, dashboard_id, None).run().get("viz_error")
+    except CommandException as exception:
+        error = str(exception)
+    if error:
+        logger.warning("Chart %s of dashboard %s not warmed up: %s", chart_id, dashboard_id, error)
+    try:
+        with stats_client() as client:
+            client.hincrby(STATS_KEY, "failed" if error else "warmed", 1)
+    except redis.exceptions.RedisError as redis_error:
+        logger.warning("Cache warm-up statistics not reported: %s", redis_error)
+
+
+@celery_app.task(name="cache_warmup.warm_up_dashboards", ignore_result=True)
+def warm_up_dashboards(top_n: int, since: str) -> None:
+    payloads = TopNDashboardsStrategy(top_n=top_n, since=since).get_payloads()
+    for payload in payloads:
+        warm_up_chart.delay(payload["chart_id"], payload["dashboard_id"])
+    logger.info(
+        "Cache warm-up: %d charts of the %d most viewed dashboards queued",
+        len(payloads),
+        len({payload["dashboard_id"] for payload in payloads})
+    )
+    report(len(payloads))
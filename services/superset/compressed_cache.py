@@ -0,0 +1,181 @@
+"""
+Compressed Redis Cache Module
+
+This module provides a Flask-Caching backend storing large cache values compressed in Redis,
+so that the same Redis memory holds several times more chart data, filter state and explore
+form data entries. It is installed into `/app/pythonpath` of the Superset image and selected
+with `"CACHE_TYPE": "compressed_cache.CompressedRedisCache"` in `superset_config.py`.
+
+Classes:
+--------
+- `CompressingSerializer`:
+  Wraps the serializer of `RedisCache`. Serialized values of at least `threshold` bytes are
+  compressed and prefixed with a two byte header naming the codec, values that do not shrink and
+  smaller values are stored as before. Values are decompressed on read according to their header,
+  so entries written before compression was enabled, or with another codec, remain readable.
+
+- `CompressionStats`:
+  Counts the values written and read, their serialized and stored sizes, the CPU time
+  spent compressing and decompressing them, and the reads finding a value or not.
+
+- `CompressedRedisCache`:
+  `RedisCache` using `CompressingSerializer`, it reports the statistics of its cache
+  every `report_interval` seconds.
+
+Key Functionalities:
+--------------------
+- Fast Codec: zlib at its fastest level, which needs no package beyond the standard library.
+  The header leaves room for further codecs in `CODECS`.
+
+- Reporting: the statistics are logged with the compression ratio and the hit rate, and added to the
+  Redis hash `compression_stats:<key prefix>`, which sums them over all Gunicorn and Celery processes.
+  The cache warm-up reports the hit rate of the chart data cache from it (see `cache_warmup.py`).
+
+Example Usage:
+--------------
+```python
+DATA_CACHE_CONFIG = {
+    "CACHE_TYPE": "compressed_cache.CompressedRedisCache",
+    "CACHE_KEY_PREFIX": "superset_data_cache",
+    "CACHE_REDIS_URL": "redis://redis-cache:6379/2",
+    "CACHE_OPTIONS": {"compress_threshold": 1024}
+}
+```
+
+```bash
+redis-cli -h redis-cache -n 2 HGETALL compression_stats:superset_data_cache
+```
+"""
+
+import logging
+import threading
+import time
+import typing
+import zlib
+
+import flask_caching.backends.rediscache  # pylint: disable=import-error
+import redis  # pylint: disable=import-error
+
+logger = logging.getLogger(__name__)
+
+HEADER_MARKER = b"\xff"
+
+CODECS: dict[bytes, tuple[typing.Callable[[bytes], bytes], typing.Callable[[bytes], bytes]]] = {
+    b"z": (lambda data: zlib.compress(data, 1), zlib.decompress)
+}
+
+DEFAULT_CODEC = b"z"
+
+
+class CompressionStats:
+    def __init__(self) -> None:
+        self.lock = threading.Lock()
+        self.counters = dict.fromkeys(
+            (
+                "writes", "compressed", "serialized_bytes", "stored_bytes",
+                "compress_ns", "decompressed", "decompress_ns", "hits", "misses"
+            ),
+            0
+        )
+
+    def add(self, **counters: int) -> None:
+        with self.lock:
+            for counter, value in counters.items():
+                self.counters[counter] += value
+
+    def take(self) -> dict[str, int]:
+        with self.lock:
+            counters = self.counters
+            self.counters = dict.fromkeys(counters, 0)
+        return counters
+
+
+class CompressingSerializer:
+    def __init__(self, serializer: typing.Any, threshold: int, codec: bytes = DEFAULT_CODEC) -> None:
+        self.serializer = serializer
+        self.threshold = threshold
+        self.codec = codec
+        self.stats = CompressionStats()
+
+    def dumps(self, value: typing.Any, *args, **kwargs) -> bytes:
+        serialized = self.serializer.dumps(value, *args, **kwargs)
+        if len(serialized) < self.threshold:
+            self.stats.add(writes=1, serialized_bytes=len(serialized), stored_bytes=len(serialized))
+            return serialized
+        started = time.thread_time_ns()
+        compressed = HEADER_MARKER + self.codec + CODECS[self.codec][0](serialized)
+        elapsed = time.thread_time_ns() - started
+        stored = compressed if len(compressed) < len(serialized) else serialized
+        self.stats.add(
+            writes=1,
+            compressed=int(stored is compressed),
+            serialized_bytes=len(serialized),
+            stored_bytes=len(stored),
+            compress_ns=elapsed
+        )
+        return stored
+
+    def loads(self, value: bytes | None) -> typing.Any:
+        if value is not None and value[:1] == HEADER_MARKER and value[1:2] in CODECS:
+            started = time.thread_time_ns()
+            value = CODECS[value[1:2]][1](value[2:])
+            self.stats.add(decompressed=1, decompress_ns=time.thread_time_ns() - started)
+        return self.serializer.loads(value)
+
+
+class CompressedRedisCache(flask_caching.backends.rediscache.RedisCache):
+    def __init__(
+            self,
+            *args,
+            compress_threshold: int = 1024,
+            report_interval: float = 60.0,
+            **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self.serializer = CompressingSerializer(
+            flask_caching.backends.rediscache.RedisCache.serializer,
+            compress_threshold
+        )
+        self.report_interval = report_interval
+        self.reported = time.monotonic()
+
+    def report(self) -> None:
+        now = time.monotonic()
+        if now - self.reported < self.report_interval:
+            return
+        self.reported = now
+        stats = self.serializer.stats.take()
+        if not stats["writes"] and not stats["hits"] and not stats["misses"]:
+            return
+        logger.info(
+            "Cache %s: %d writes, %d compressed, ratio %.2f, %.1f ms compressing, %d decompressed in %.1f ms, "
+            "hit rate %.0f%%",
+            self.key_prefix,
+            stats["writes"],
+            stats["compressed"],
+            stats["serialized_bytes"] / max(stats["stored_bytes"], 1),
+            stats["compress_ns"] / 1000000,
+            stats["decompressed"],
+            stats["decompress_ns"] / 1000000,
+            stats["hits"] * 100 / max(stats["hits"] + stats["misses"], 1)
+        )
+        try:
+            pipeline = self._write_client.pipeline(transaction=False)
+            for counter, value in stats.items():
+                pipeline.hincrby(f"compression_stats:{self.key_prefix}", counter, value)
+            pipeline.execute()
+        except redis.exceptions.RedisError as error:
+            logger.warning("Cache %s statistics not reported: %s", self.key_prefix, error)
+
+    def get(self, key: str) -> typing.Any:
+        value = super().get(key)
+        if value is None:
+            self.serializer.stats.add(misses=1)
+        else:
+            self.serializer.stats.add(hits=1)
+        self.report()
+        return value
+
+    def set(self, key: str, value: typing.Any, timeout: int | None = None) -> typing.Any:
+        result = super().set(key, value, timeout)
+        self.report()
+        return result
@@ -5,25 +5,35 @@ set -euxo pipefail
 if superset test_db \
     "mysql+mysqlconnector://superset:$(< /run/secrets/mysql_superset_password)@${VIRTUAL_IP_ADDRESS}:6446/superset" \
     --connect-args {}; then
-  
-  superset fab create-admin \
-  --username "superset" \
-  --firstname "superset" \
-  --lastname "superset" \
-  --email "superset@cluster.com" \
-  --password "cluster"
 
-  superset db upgrade
-  superset init
-  
-  /app/set_database_uri.exp
-  /usr/bin/run-server.sh &
+  /app/set_database_uri.exp store_sqllab_database_id
+  gunicorn --config /app/gunicorn_config.py &
+
+  celery \
+    --app superset.tasks.celery_app:app worker \
+    --hostname "sql_lab@%h" \
+    --queues "sql_lab" \
+    --pool prefork \
+    --concurrency "${CELERY_CONCURRENCY:-4}" \
+    --prefetch-multiplier 1 \
+    -O fair &
 
   celery \
     --app superset.tasks.celery_app:app worker \
+    --hostname "reports@%h" \
+    --queues "reports" \
     --pool prefork \
-    --concurrency 4 \
+    --concurrency "${CELERY_REPORTS_CONCURRENCY:-2}" \
+    --prefetch-multiplier 1 \
     -O fair &
+
+  celery \
+    --app superset.tasks.celery_app:app worker \
+    --hostname "maintenance@%h" \
+    --queues "maintenance" \
+    --pool threads \
+    --concurrency "${CELERY_MAINTENANCE_CONCURRENCY:-2}" \
+    --prefetch-multiplier 4 &
   
   wait
 else
@@ -0,0 +1,62 @@
+"""
+Gunicorn Configuration Module
+
+This module configures the Gunicorn server running the Superset web application behind Nginx.
+The profile is sized from the CPUs and memory of the management node when Superset is deployed
+(`sizing.superset_web`) and passed in the `GUNICORN_<SETTING>` environment variables of the service,
+which are read here when the container starts. Without them the defaults of the Superset image apply.
+
+Settings:
+---------
+- `GUNICORN_WORKER_CLASS`: `sync`, `gthread` or `gevent`.
+- `GUNICORN_WORKERS`: number of worker processes.
+- `GUNICORN_THREADS`: threads of a `gthread` worker, concurrent connections of a `gevent` worker.
+- `GUNICORN_PRELOAD`: `true` to import Superset once in the master process before forking the workers.
+- `GUNICORN_MAX_REQUESTS`, `GUNICORN_MAX_REQUESTS_JITTER`: recycle a worker after that many requests.
+- `GUNICORN_KEEPALIVE`: seconds an idle connection from Nginx is kept open.
+- `GUNICORN_TIMEOUT`: seconds a worker may spend on a request before it is restarted.
+
+Key Functionalities:
+--------------------
+- Preloading: workers share the memory pages of the imported application and are forked quickly
+  when they are recycled. The connections of the metadata engine opened by the master process are
+  dropped in every forked worker, so that no connection is shared between processes.
+
+- Localhost Binding: Gunicorn accepts connections on `127.0.0.1:8088` only, from Nginx.
+
+Example Usage:
+--------------
+```bash
+GUNICORN_WORKERS=4 GUNICORN_THREADS=8 gunicorn --config /app/gunicorn_config.py
+```
+"""
+
+# pylint: disable=invalid-name
+
+import os
+
+wsgi_app = "superset.app:create_app()"
+bind = f"{os.environ.get('SUPERSET_BIND_ADDRESS', '127.0.0.1')}:{os.environ.get('SUPERSET_PORT', '8088')}"
+
+worker_class = os.environ.get("GUNICORN_WORKER_CLASS", "gthread")
+workers = int(os.environ.get("GUNICORN_WORKERS", "1"))
+threads = int(os.environ.get("GUNICORN_THREADS", "20"))
+worker_connections = threads
+preload_app = os.environ.get("GUNICORN_PRELOAD", "false") == "true"
+max_requests = int(os.environ.get("GUNICORN_MAX_REQUESTS", "0"))
+max_requests_jitter = int(os.environ.get("GUNICORN_MAX_REQUESTS_JITTER", "0"))
+keepalive = int(os.environ.get("GUNICORN_KEEPALIVE", "2"))
+timeout = int(os.environ.get("GUNICORN_TIMEOUT", "60"))
+
+limit_request_line = 0
+limit_request_field_size = 0
+accesslog = "-"
+errorlog = "-"
+loglevel = os.environ.get("GUNICORN_LOGLEVEL", "info")
+
+
+def post_fork(server, worker):  # pylint: disable=unused-argument
+    if server.cfg.preload_app:
+        from superset.extensions import db  # pylint: disable=import-error,import-outside-toplevel
+        with server.app.wsgi().app_context():
+            db.engine.dispose(close=False)
@@ -0,0 +1,19 @@
+#!/bin/bash
+
+set -euxo pipefail
+
+superset test_db \
+  "mysql+mysqlconnector://superset:$(< /run/secrets/mysql_superset_password)@${VIRTUAL_IP_ADDRESS}:6446/superset" \
+  --connect-args {}
+
+superset fab create-admin \
+--username "superset" \
+--firstname "superset" \
+--lastname "superset" \
+--email "superset@cluster.com" \
+--password "cluster"
+
+superset db upgrade
+superset init
+
+/app/set_database_uri.exp create_mysql_connection
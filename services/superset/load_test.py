@@ -0,0 +1,166 @@
+"""
+Web Tier Load Test
+
+This module validates the Gunicorn profile of a Superset container by loading Gunicorn directly,
+without Nginx, first with a single client and then with as many concurrent clients as the profile
+serves requests at once, the workers times the threads read from the `GUNICORN_<SETTING>` variables.
+
+Classes:
+--------
+- `Sample`:
+  The outcome of one load phase: completed requests, failed requests, throughput
+  and latency percentiles.
+
+Functions:
+----------
+- `load`:
+  Runs `concurrency` clients against one path for `duration` seconds. The clients are
+  spread over several processes, so that the load test is not limited by one interpreter,
+  and each of them reuses its keep-alive connection as Nginx does.
+
+- `validate`:
+  Compares the two phases with the limits of the test and returns the failed checks: any failed
+  request, a 95th percentile latency above `max_p95` seconds, or a throughput under load growing
+  less than `min_speedup` times over the single client.
+
+Key Functionalities:
+--------------------
+- Scaling Check: the default `min_speedup` is half the number of worker processes, a profile whose
+  workers do not serve requests in parallel, for example starved of CPUs, fails the test.
+
+Example Usage:
+--------------
+Inside a running Superset container:
+
+```bash
+python3 /app/load_test.py --path /health --duration 10
+```
+"""
+
+import argparse
+import concurrent.futures
+import http.client
+import logging
+import os
+import sys
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class Sample:  # pylint: disable=too-few-public-methods
+    def __init__(self, latencies: list[float], errors: int, duration: float) -> None:
+        self.requests = len(latencies)
+        self.errors = errors
+        self.throughput = len(latencies) / duration
+        ordered = sorted(latencies) or [0.0]
+        self.p50, self.p95, self.p99 = (
+            ordered[min(int(len(ordered) * quantile), len(ordered) - 1)] for quantile in (0.5, 0.95, 0.99)
+        )
+
+    def __repr__(self) -> str:
+        return (
+            f"Sample(requests={self.requests}, errors={self.errors}, throughput={self.throughput:.1f}/s, "
+            f"p50={self.p50 * 1000:.1f}ms, p95={self.p95 * 1000:.1f}ms, p99={self.p99 * 1000:.1f}ms)"
+        )
+
+
+def client(host: str, port: int, path: str, deadline: float) -> tuple[list[float], int]:
+    connection = http.client.HTTPConnection(host, port, timeout=30)
+    latencies: list[float] = []
+    errors = 0
+    while time.time() < deadline:
+        started = time.perf_counter()
+        try:
+            connection.request("GET", path)
+            response = connection.getresponse()
+            response.read()
+        except (OSError, http.client.HTTPException):
+            errors += 1
+            connection.close()
+            continue
+        if response.status == 200:
+            latencies.append(time.perf_counter() - started)
+        else:
+            errors += 1
+    connection.close()
+    return latencies, errors
+
+
+def clients(host: str, port: int, path: str, deadline: float, concurrency: int) -> tuple[list[float], int]:
+    results: list[tuple[list[float], int]] = []
+    lock = threading.Lock()
+
+    def run() -> None:
+        result = client(host, port, path, deadline)
+        with lock:
+            results.append(result)
+
+    client_threads = [threading.Thread(target=run) for _ in range(concurrency)]
+    for client_thread in client_threads:
+        client_thread.start()
+    for client_thread in client_threads:
+        client_thread.join()
+    return [latency for latencies, _ in results for latency in latencies], sum(errors for _, errors in results)
+
+
+def load(host: str, port: int, path: str, concurrency: int, duration: float) -> Sample:
+    # pylint: disable=too-many-arguments,too-many-positional-arguments
+    processes = max(min(concurrency, os.cpu_count() or 1), 1)
+    shares = [concurrency // processes + (process < concurrency % processes) for process in range(processes)]
+    deadline = time.time() + duration
+    latencies: list[float] = []
+    errors = 0
+    with concurrent.futures.ProcessPoolExecutor(max_workers=processes) as executor:
+        futures = [executor.submit(clients, host, port, path, deadline, share) for share in shares]
+        for future in futures:
+            process_latencies, process_errors = future.result()
+            latencies += process_latencies
+            errors += process_errors
+    return Sample(latencies, errors, duration)
+
+
+def validate(single: Sample, loaded: Sample, max_p95: float, min_speedup: float) -> list[str]:
+    failures = []
+    if single.errors or loaded.errors:
+        failures.append(f"{single.errors + loaded.errors} requests failed")
+    if loaded.p95 > max_p95:
+        failures.append(f"95th percentile latency {loaded.p95:.2f}s above {max_p95:.2f}s")
+    if loaded.throughput < single.throughput * min_speedup:
+        failures.append(
+            f"throughput {loaded.throughput:.1f}/s under load is less than {min_speedup:.1f} times "
+            f"{single.throughput:.1f}/s of a single client"
+        )
+    return failures
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s [%(levelname)s] %(message)s')
+    workers = int(os.environ.get("GUNICORN_WORKERS", "1"))
+    threads = int(os.environ.get("GUNICORN_THREADS", "20"))
+    parser = argparse.ArgumentParser(description="Validate the Gunicorn profile of the Superset web tier under load.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=int(os.environ.get("SUPERSET_PORT", "8088")))
+    parser.add_argument("--path", default="/health")
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--concurrency", type=int, default=workers * threads)
+    parser.add_argument("--max-p95", type=float, default=1.0)
+    parser.add_argument("--min-speedup", type=float, default=workers / 2)
+    arguments = parser.parse_args()
+    logger.info(
+        "Profile: %s workers of class %s with %s threads",
+        workers,
+        os.environ.get("GUNICORN_WORKER_CLASS", "gthread"),
+        threads
+    )
+    single_client = load(arguments.host, arguments.port, arguments.path, 1, arguments.duration)
+    logger.info("Single client: %s", single_client)
+    loaded_clients = load(arguments.host, arguments.port, arguments.path, arguments.concurrency, arguments.duration)
+    logger.info("%d clients: %s", arguments.concurrency, loaded_clients)
+    failed_checks = validate(single_client, loaded_clients, arguments.max_p95, arguments.min_speedup)
+    for failed_check in failed_checks:
+        logger.error("Profile check failed: %s", failed_check)
+    if failed_checks:
+        sys.exit(1)
+    logger.info("Profile checks passed")
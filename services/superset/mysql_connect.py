@@ -2,16 +2,36 @@
 MySQL Connection Management for Apache Superset
 
 This module provides functionality for creating a MySQL database connection
-in Apache Superset.
+in Apache Superset and for finding the default database of SQL Lab.
 
 Functions:
 ----------
 - `create_mysql_connection`:
-  Checks if a MySQL database connection already exists in Superset,
-  and if not, creates a new connection with the specified parameters.
-  The connection URI is constructed using the retrieved password
+  Checks if the MySQL database connections already exist in Superset,
+  and if not, creates them with the specified parameters.
+  The connection URIs are constructed using the retrieved password
   and the virtual IP address defined in the
-  environment variable `VIRTUAL_IP_ADDRESS`.
+  environment variable `VIRTUAL_IP_ADDRESS`:
+
+  - `MySQL` connects to the read-write port 6446 of MySQL Router, which
+    routes to the Group Replication primary.
+  - `MySQL (read-only)` connects to the read-only port 6447, which routes
+    round robin over the secondaries and falls back to the primary when
+    no secondary is online. It is meant for analytical SQL Lab and chart
+    queries, which then no longer load the primary.
+
+  Superset opens a connection per analytical query without pooling, the
+  engine parameters check each connection before it is used and replace
+  it after `SQLALCHEMY_POOL_RECYCLE` seconds, as the metadata engine does.
+
+  It runs once per deployment, from `initialize_metadata.sh` in the
+  `superset-init` job, before any replica of the Superset service starts.
+
+- `store_sqllab_database_id`:
+  Looks up the id of `MySQL (read-only)` by its name and writes it to
+  `SQLLAB_DATABASE_ID_FILE`, from which `superset_config.py` sets the
+  default database of SQL Lab when Gunicorn and Celery start. It only
+  reads the metadata, so every replica runs it from `entrypoint.sh`.
 
 Usage:
 ------
@@ -23,7 +43,7 @@ invoking the function.
 
 Example:
 --------
-To create a MySQL connection, you can call the function as follows:
+To create the MySQL connections, you can call the function as follows:
 
 ```python
 create_mysql_connection()
@@ -32,9 +52,16 @@ create_mysql_connection()
 import json
 import os
 
+import flask  # pylint: disable=import-error
 import superset  # pylint: disable=import-error
 import superset.models.core  # pylint: disable=import-error
 
+DATABASES = (
+    ("MySQL", 6446),
+    ("MySQL (read-only)", 6447)
+)
+SQLLAB_DATABASE = "MySQL (read-only)"
+
 
 def create_mysql_connection():
     with open(
@@ -42,17 +69,34 @@ def create_mysql_connection():
         mode="r",
         encoding="utf-8"
     ) as mysql_superset_password:
-        if not superset.db.session.query(superset.models.core.Database).filter_by(database_name='MySQL').first():
+        password = mysql_superset_password.read().strip()
+    for database_name, port in DATABASES:
+        if not superset.db.session.query(superset.models.core.Database).filter_by(database_name=database_name).first():
             mysql_connection = superset.models.core.Database(
-                database_name='MySQL',
+                database_name=database_name,
                 allow_run_async=True,
-                sqlalchemy_uri=f"mysql+mysqlconnector://superset:{mysql_superset_password.read().strip()}@{os.environ.get('VIRTUAL_IP_ADDRESS')}:6446/superset",  # noqa: E501 pylint: disable=line-too-long
+                sqlalchemy_uri=f"mysql+mysqlconnector://superset:{password}@{os.environ.get('VIRTUAL_IP_ADDRESS')}:{port}/superset",  # noqa: E501 pylint: disable=line-too-long
                 extra=json.dumps({
                     "async": True,
-                    "engine_params": {},
+                    "engine_params": {
+                        "pool_pre_ping": True,
+                        "pool_recycle": int(os.environ.get("SQLALCHEMY_POOL_RECYCLE", "3600"))
+                    },
                     "metadata_params": {},
                     "schemas_allowed_for_csv_upload": []
                 })
             )
             superset.db.session.add(mysql_connection)
             superset.db.session.commit()
+
+
+def store_sqllab_database_id():
+    sqllab_database = superset.db.session.query(superset.models.core.Database).filter_by(
+        database_name=SQLLAB_DATABASE
+    ).one()
+    with open(
+        file=flask.current_app.config["SQLLAB_DATABASE_ID_FILE"],
+        mode="w",
+        encoding="utf-8"
+    ) as sqllab_database_id:
+        sqllab_database_id.write(str(sqllab_database.id))
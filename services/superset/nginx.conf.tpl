@@ -0,0 +1,86 @@
+worker_processes ${NGINX_WORKER_PROCESSES};
+pid /app/nginx.pid;
+
+events {
+    worker_connections 1024;
+    multi_accept on;
+}
+
+http {
+    include /etc/nginx/mime.types;
+    default_type application/octet-stream;
+    sendfile on;
+    keepalive_timeout 65;
+
+    gzip on;
+    gzip_vary on;
+    gzip_proxied any;
+    gzip_comp_level 5;
+    gzip_min_length 1024;
+    gzip_types
+        text/plain
+        text/css
+        text/csv
+        text/javascript
+        application/javascript
+        application/json
+        application/xml
+        image/svg+xml;
+
+    proxy_cache_path /var/cache/nginx/superset
+        levels=1:2 keys_zone=static:10m max_size=1g inactive=30d use_temp_path=off;
+
+    upstream superset {
+        server 127.0.0.1:8088;
+        keepalive ${NGINX_UPSTREAM_KEEPALIVE};
+        keepalive_requests 10000;
+        keepalive_timeout 60s;
+    }
+
+    server {
+        listen 443 ssl http2;
+        ssl_certificate /etc/ssl/certs/superset_cluster_certificate.pem;
+        ssl_certificate_key /etc/ssl/certs/superset_cluster_key.pem;
+        ssl_protocols TLSv1.2 TLSv1.3;
+        ssl_ciphers HIGH:!aNULL:!MD5;
+        ssl_prefer_server_ciphers on;
+        ssl_session_cache shared:SSL:10m;
+
+        include /etc/nginx/security_headers.conf;
+
+        server_tokens off;
+        tcp_nopush on;
+        tcp_nodelay on;
+        client_max_body_size 50M;
+
+        proxy_http_version 1.1;
+        proxy_set_header Connection "";
+        proxy_set_header Accept-Encoding "";
+        proxy_set_header Host $host;
+        proxy_set_header X-Real-IP $remote_addr;
+        proxy_set_header X-Forwarded-For $proxy_add_x_forwarded_for;
+        proxy_set_header X-Forwarded-Proto $scheme;
+
+        location / {
+            proxy_pass http://superset;
+        }
+
+        location /static/ {
+            proxy_pass http://superset;
+            proxy_cache static;
+            proxy_cache_valid 200 30d;
+            proxy_cache_lock on;
+            proxy_cache_use_stale error timeout updating http_500 http_502 http_503 http_504;
+            proxy_ignore_headers Cache-Control Expires Set-Cookie;
+            proxy_hide_header Cache-Control;
+            proxy_hide_header Expires;
+            proxy_hide_header Set-Cookie;
+            expires 365d;
+            add_header X-Cache-Status $upstream_cache_status;
+            include /etc/nginx/security_headers.conf;
+        }
+    }
+
+    access_log /var/log/nginx/access.log;
+    error_log /var/log/nginx/error.log;
+}
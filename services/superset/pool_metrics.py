@@ -0,0 +1,131 @@
+"""
+Connection Pool Metrics Module
+
+This module provides a SQLAlchemy connection pool measuring how long connections are waited for
+and how often the pool is exhausted, so that the connection budget computed for the Superset
+metadata engine can be verified under load. It is installed into `/app/pythonpath` of the
+Superset image and selected with `"poolclass"` in `SQLALCHEMY_ENGINE_OPTIONS` of `superset_config.py`.
+
+Classes:
+--------
+- `PoolStats`:
+  Counts the checkouts of a process, the checkouts finding every connection of the pool in use,
+  the time spent waiting for a connection, the checkouts timing out and the highest saturation,
+  the share of the pool capacity (`pool_size` plus `max_overflow`) checked out at once.
+
+- `InstrumentedQueuePool`:
+  `QueuePool` recording every checkout in `PoolStats` and reporting the statistics every
+  `report_interval` seconds.
+
+Key Functionalities:
+--------------------
+- Reporting: the statistics are logged with the peak saturation of the process, and the counters are
+  added to the Redis hash `pool_stats:<name>` on the broker instance, which sums them over all
+  Gunicorn and Celery processes of all replicas.
+
+Example Usage:
+--------------
+```python
+SQLALCHEMY_ENGINE_OPTIONS = {
+    "poolclass": pool_metrics.InstrumentedQueuePool,
+    "pool_size": 5,
+    "max_overflow": 10
+}
+```
+
+```bash
+redis-cli -h redis HGETALL pool_stats:metadata
+```
+"""
+
+import logging
+import os
+import threading
+import time
+
+import redis  # pylint: disable=import-error
+import sqlalchemy.exc  # pylint: disable=import-error
+import sqlalchemy.pool  # pylint: disable=import-error
+
+logger = logging.getLogger(__name__)
+
+REPORT_URL = os.environ.get("POOL_STATS_REDIS_URL", "redis://redis:6379/0")
+
+
+class PoolStats:
+    def __init__(self) -> None:
+        self.lock = threading.Lock()
+        self.counters = dict.fromkeys(("checkouts", "saturated", "wait_ns", "timeouts"), 0)
+        self.peak_saturation = 0.0
+
+    def add(self, saturation: float, **counters: int) -> None:
+        with self.lock:
+            for counter, value in counters.items():
+                self.counters[counter] += value
+            self.peak_saturation = max(self.peak_saturation, saturation)
+
+    def take(self) -> tuple[dict[str, int], float]:
+        with self.lock:
+            counters, peak_saturation = self.counters, self.peak_saturation
+            self.counters = dict.fromkeys(counters, 0)
+            self.peak_saturation = 0.0
+        return counters, peak_saturation
+
+
+class InstrumentedQueuePool(sqlalchemy.pool.QueuePool):
+    name = "metadata"
+    report_interval = 60.0
+    stats = PoolStats()
+    reported = time.monotonic()
+    client: redis.Redis | None = None
+
+    def saturation(self) -> float:
+        if self._max_overflow < 0:
+            return 0.0
+        return self.checkedout() / max(self.size() + self._max_overflow, 1)
+
+    def _do_get(self):
+        saturated = self.saturation() >= 1.0
+        started = time.perf_counter_ns()
+        try:
+            connection = super()._do_get()
+        except sqlalchemy.exc.TimeoutError:
+            self.stats.add(1.0, checkouts=1, saturated=1, wait_ns=time.perf_counter_ns() - started, timeouts=1)
+            self.report()
+            raise
+        self.stats.add(
+            self.saturation(),
+            checkouts=1,
+            saturated=int(saturated),
+            wait_ns=time.perf_counter_ns() - started
+        )
+        self.report()
+        return connection
+
+    @classmethod
+    def report(cls) -> None:
+        now = time.monotonic()
+        if now - cls.reported < cls.report_interval:
+            return
+        cls.reported = now
+        counters, peak_saturation = cls.stats.take()
+        if not counters["checkouts"]:
+            return
+        logger.info(
+            "Pool %s: %d checkouts, %d saturated, %.1f ms waiting, %d timeouts, peak saturation %.0f%%",
+            cls.name,
+            counters["checkouts"],
+            counters["saturated"],
+            counters["wait_ns"] / 1000000,
+            counters["timeouts"],
+            peak_saturation * 100
+        )
+        try:
+            if cls.client is None:
+                cls.client = redis.Redis.from_url(REPORT_URL, socket_timeout=1)
+            pipeline = cls.client.pipeline(transaction=False)
+            for counter, value in counters.items():
+                pipeline.hincrby(f"pool_stats:{cls.name}", counter, value)
+            pipeline.execute()
+        except redis.exceptions.RedisError as error:
+            logger.warning("Pool %s statistics not reported: %s", cls.name, error)
@@ -11,26 +11,97 @@ management execution with Redis data management within the application.
 To use this configuration, ensure that the required Redis server, Gunicorn web server
 and MySQL database are properly set up, then import this module in your
 Superset application context.
+
+The Celery broker and results live on the `redis` instance, which never evicts keys,
+so that a burst of cached data can not push out queued tasks or query results.
+The caches live on the `redis-cache` instance, which evicts the least frequently used keys.
+Every workload has its own logical database:
+
+- `redis` 0: Celery broker, 1: Celery results, 2: SQL Lab query results
+- `redis-cache` 0: filter state, 1: explore form data, 2: chart data
+
+The caches compress values of at least 1 KiB (see `compressed_cache.py`).
+
+Celery tasks are routed to three queues, each consumed by its own worker started in
+`entrypoint.sh`: `sql_lab` for interactive queries and asynchronous chart data, `reports` for
+scheduled alerts and reports, and `maintenance` for cache warm-up, thumbnails and log pruning.
+Long reports therefore never hold the workers that interactive queries wait for.
+
+The `celery-beat` service runs `beat_schedule`, which warms up the chart data of the most viewed
+dashboards shortly before it expires from the cache (see `cache_warmup.py`), as set in `CACHE_WARMUP_<SETTING>`.
+
+The Superset metadata is written through the read-write port of MySQL Router. SQL Lab
+opens the `MySQL (read-only)` database on the read-only port (see `mysql_connect.py`),
+its connections fall back to the read-write port while the read-only port does not accept them.
+It is the default database of SQL Lab, its id is looked up by name when the container starts
+and read from `SQLLAB_DATABASE_ID_FILE`.
+
+The pool of the metadata engine is sized by the connection budget computed at deployment
+(`sizing.connection_budget`), which is passed in the `SQLALCHEMY_<SETTING>` environment variables,
+and its checkouts are measured (see `pool_metrics.py`).
+
+Responses are compressed by Nginx in front of Gunicorn (see `nginx.conf.tpl`), which also caches
+the static assets, so the web threads do not spend their time compressing them.
 """
 
 import os
+import socket
+import time
 
 import flask_caching.backends.rediscache  # pylint: disable=import-error
+import pool_metrics  # pylint: disable=import-error
+
+REDIS_BROKER_URL = "redis://redis:6379"
+REDIS_CACHE_URL = "redis://redis-cache:6379"
+
+READ_WRITE_PORT = 6446
+READ_ONLY_PORT = 6447
+READ_ONLY_PROBE_INTERVAL = 10
+read_only_probes: dict[str, tuple[float, bool]] = {}
+
+DATA_CACHE_TIMEOUT = 3600
+CACHE_WARMUP_TOP_N = 20
+CACHE_WARMUP_SINCE = "7 days ago"
+CACHE_WARMUP_LEAD = 600
+CACHE_WARMUP_RATE_LIMIT = "30/m"
+CACHE_WARMUP_USER = "superset"
+CACHE_WARMUP_STATS_URL = f"{REDIS_BROKER_URL}/0"
 
 
 class CeleryConfig:  # pylint: disable=too-few-public-methods
-    broker_url = "redis://redis:6379/0"
+    broker_url = f"{REDIS_BROKER_URL}/0"
     imports = (
         "superset.sql_lab",
         "superset.tasks.scheduler",
+        "cache_warmup",
     )
-    result_backend = "redis://redis:6379/0"
-    worker_prefetch_multiplier = 10
+    result_backend = f"{REDIS_BROKER_URL}/1"
+    result_expires = 3600
+    worker_prefetch_multiplier = 1
     task_acks_late = True
+    task_default_queue = "maintenance"
+    task_routes = {
+        "sql_lab.get_sql_results": {"queue": "sql_lab"},
+        "load_chart_data_into_cache": {"queue": "sql_lab"},
+        "load_explore_json_into_cache": {"queue": "sql_lab"},
+        "reports.prune_log": {"queue": "maintenance"},
+        "cache_warmup.*": {"queue": "maintenance"},
+        "reports.*": {"queue": "reports"}
+    }
     task_annotations = {
         "sql_lab.get_sql_results": {
             "rate_limit": "100/s",
         },
+        "cache_warmup.warm_up_chart": {
+            "rate_limit": CACHE_WARMUP_RATE_LIMIT,
+        },
+    }
+    beat_schedule = {
+        "cache-warmup": {
+            "task": "cache_warmup.warm_up_dashboards",
+            "schedule": DATA_CACHE_TIMEOUT - CACHE_WARMUP_LEAD,
+            "kwargs": {"top_n": CACHE_WARMUP_TOP_N, "since": CACHE_WARMUP_SINCE},
+        },
     }
 
 
@@ -41,35 +112,76 @@ with open(file="/run/secrets/superset_secret_key", mode="r", encoding="utf-8") a
 with open(file="/run/secrets/mysql_superset_password", mode="r", encoding="utf-8") as mysql_superset_password:
     SQLALCHEMY_DATABASE_URI = f"mysql+mysqlconnector://superset:{mysql_superset_password.read().strip()}@{os.environ.get('VIRTUAL_IP_ADDRESS')}:6446/superset"  # noqa: E501  pylint: disable=line-too-long
 
+SQLALCHEMY_ENGINE_OPTIONS = {
+    "poolclass": pool_metrics.InstrumentedQueuePool,
+    "pool_size": int(os.environ.get("SQLALCHEMY_POOL_SIZE", "5")),
+    "max_overflow": int(os.environ.get("SQLALCHEMY_MAX_OVERFLOW", "10")),
+    "pool_timeout": int(os.environ.get("SQLALCHEMY_POOL_TIMEOUT", "10")),
+    "pool_recycle": int(os.environ.get("SQLALCHEMY_POOL_RECYCLE", "3600")),
+    "pool_pre_ping": True
+}
+
 CELERY_CONFIG = CeleryConfig  # pylint: disable=invalid-name
-RESULTS_BACKEND = flask_caching.backends.rediscache.RedisCache(host="redis", port=6379, key_prefix="superset_results")
+RESULTS_BACKEND = flask_caching.backends.rediscache.RedisCache(
+    host="redis",
+    port=6379,
+    db=2,
+    key_prefix="superset_results"
+)
 
 
 def SQL_QUERY_MUTATOR(sql, **kwargs):  # pylint: disable=invalid-name,unused-argument
     return sql
 
 
+def read_only_port_available(host: str) -> bool:
+    probed, available = read_only_probes.get(host, (float("-inf"), False))
+    if time.monotonic() - probed > READ_ONLY_PROBE_INTERVAL:
+        try:
+            with socket.create_connection((host, READ_ONLY_PORT), timeout=1):
+                available = True
+        except OSError:
+            available = False
+        read_only_probes[host] = (time.monotonic(), available)
+    return available
+
+
+def DB_CONNECTION_MUTATOR(uri, params, username, security_manager, source):  # pylint: disable=invalid-name
+    # pylint: disable=unused-argument
+    if uri.port == READ_ONLY_PORT and not read_only_port_available(uri.host):
+        uri = uri.set(port=READ_WRITE_PORT)
+    return uri, params
+
+
 SQL_MAX_ROW = 10000
 DEFAULT_SQLLAB_LIMIT = 1000
 SQLLAB_TIMEOUT = 300
 SQLLAB_VALIDATION_TIMEOUT = 60
-SQLLAB_DEFAULT_DBID = 1
+SQLLAB_DATABASE_ID_FILE = "/app/superset_home/sqllab_database_id"
+if os.path.exists(SQLLAB_DATABASE_ID_FILE):
+    with open(SQLLAB_DATABASE_ID_FILE, mode="r", encoding="utf-8") as sqllab_database_id:
+        SQLLAB_DEFAULT_DBID = int(sqllab_database_id.read().strip())
+
+COMPRESS_REGISTER = False
 
 FILTER_STATE_CACHE_CONFIG = {
-    "CACHE_TYPE": "RedisCache",
+    "CACHE_TYPE": "compressed_cache.CompressedRedisCache",
     "CACHE_DEFAULT_TIMEOUT": 86400,
     "CACHE_KEY_PREFIX": "superset_filter_cache",
-    "CACHE_REDIS_URL": "redis://redis:6379/0"
+    "CACHE_REDIS_URL": f"{REDIS_CACHE_URL}/0",
+    "CACHE_OPTIONS": {"compress_threshold": 1024}
 }
 DATA_CACHE_CONFIG = {
-    "CACHE_TYPE": "RedisCache",
-    "CACHE_DEFAULT_TIMEOUT": 3600,
+    "CACHE_TYPE": "compressed_cache.CompressedRedisCache",
+    "CACHE_DEFAULT_TIMEOUT": DATA_CACHE_TIMEOUT,
     "CACHE_KEY_PREFIX": "superset_data_cache",
-    "CACHE_REDIS_URL": "redis://redis:6379/0"
+    "CACHE_REDIS_URL": f"{REDIS_CACHE_URL}/2",
+    "CACHE_OPTIONS": {"compress_threshold": 1024}
 }
 EXPLORE_FORM_DATA_CACHE_CONFIG = {
-    "CACHE_TYPE": "RedisCache",
+    "CACHE_TYPE": "compressed_cache.CompressedRedisCache",
     "CACHE_DEFAULT_TIMEOUT": 86400,
     "CACHE_KEY_PREFIX": "superset_explore_cache",
-    "CACHE_REDIS_URL": "redis://redis:6379/0"
+    "CACHE_REDIS_URL": f"{REDIS_CACHE_URL}/1",
+    "CACHE_OPTIONS": {"compress_threshold": 1024}
 }
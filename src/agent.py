@@ -0,0 +1,132 @@
+"""
+Remote Execution Agent Module
+
+This module is the long-lived process started once per node by `RemoteConnection`
+over the SSH transport. It keeps the container routines imported and serves
+framed requests from its standard input until the channel is closed.
+
+Classes:
+--------
+- `ThreadOutput`:
+  A text stream replacing `sys.stdout` and `sys.stderr`, which writes into a buffer
+  of the request handled by the current thread, so concurrent requests
+  do not mix their printed output.
+
+- `Agent`:
+  Reads request frames, runs every request in its own thread and writes the
+  structured reply frames back, tagged with the identifier of the request.
+
+Key Functionalities:
+--------------------
+- Method requests: `{"method": "run_mysql_server", "container": "mysql", "args": [], "kwargs": {}}`
+  calls the named public method of `container.ContainerConnection` for the given container.
+
+- Source requests: `{"method": "exec", "source": "print('Hello World')"}` executes Python source
+  with the `container` module namespace available, the same way it used to be executed
+  from the uploaded script.
+
+- Structured replies: every reply carries the captured standard output, the captured
+  standard error with a traceback if the request failed, and the typed return value,
+  raw bytes in the binary part of the frame.
+  Requests sent with `"trace": true` also get the spans recorded while they were handled.
+
+Example Usage:
+--------------
+The agent is not meant to be started by hand, `RemoteConnection` uploads it together
+with its dependencies and runs:
+
+```bash
+python3 /opt/superset-cluster/agent/agent.py
+```
+"""
+
+import io
+import os
+import sys
+import threading
+import traceback
+import typing
+
+import container
+import protocol
+import tracing
+
+
+class ThreadOutput(io.TextIOBase):
+    def __init__(self, fallback: typing.TextIO) -> None:
+        self.fallback = fallback
+        self.buffers = threading.local()
+
+    def capture(self) -> io.StringIO:
+        self.buffers.output = io.StringIO()
+        return self.buffers.output
+
+    def release(self) -> None:
+        del self.buffers.output
+
+    def write(self, text: str) -> int:  # type: ignore[override]
+        return getattr(self.buffers, "output", self.fallback).write(text)
+
+
+class Agent:
+    def __init__(self, requests: typing.BinaryIO, replies: typing.BinaryIO) -> None:
+        self.requests = requests
+        self.replies = replies
+        self.replies_lock = threading.Lock()
+        self.stdout = ThreadOutput(sys.stderr)
+        self.stderr = ThreadOutput(sys.stderr)
+        sys.stdout = self.stdout
+        sys.stderr = self.stderr
+
+    @staticmethod
+    def execute(request: dict) -> typing.Any:
+        if request["method"] == "exec":
+            return exec(request["source"], dict(vars(container)))  # pylint: disable=exec-used
+        if request["method"].startswith("_"):
+            raise AttributeError(f"Method {request['method']} is not allowed to be called remotely")
+        return getattr(
+            container.ContainerConnection(container=request.get("container")),
+            request["method"]
+        )(*request.get("args", []), **request.get("kwargs", {}))
+
+    def handle(self, request_id: int, request: dict) -> None:
+        output = self.stdout.capture()
+        error = self.stderr.capture()
+        result = None
+        with tracing.tracer.capture(request.get("trace", False)) as spans:
+            try:
+                with tracing.span(request["method"], "agent", container=request.get("container")):
+                    result = self.execute(request)
+            except Exception:  # pylint: disable=broad-exception-caught
+                error.write(traceback.format_exc())
+            finally:
+                self.stdout.release()
+                self.stderr.release()
+        descriptor, data = protocol.encode_result(result)
+        with self.replies_lock:
+            protocol.write_frame(
+                self.replies,
+                request_id,
+                {
+                    "output": output.getvalue(),
+                    "error": error.getvalue(),
+                    "result": descriptor,
+                    "spans": spans
+                },
+                data
+            )
+
+    def serve(self) -> None:
+        while True:
+            try:
+                request_id, request, _ = protocol.read_frame(self.requests)
+            except (EOFError, protocol.ChecksumError) as error:
+                sys.stderr.write(f"Agent stopped: {error}\n")
+                return
+            threading.Thread(target=self.handle, args=(request_id, request), daemon=True).start()
+
+
+if __name__ == "__main__":
+    replies_stream = os.fdopen(os.dup(sys.stdout.fileno()), "wb")
+    os.dup2(sys.stderr.fileno(), sys.stdout.fileno())
+    Agent(sys.stdin.buffer, replies_stream).serve()
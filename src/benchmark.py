@@ -0,0 +1,111 @@
+"""
+Orchestration Benchmark Module
+
+This module runs complete deployments of `initialize.Controller` against the simulated
+backend from `simulation.py` and reports how long the orchestration takes, how much of
+the work overlaps and how the deployment scales with the number of nodes.
+
+Functions:
+----------
+- `deploy`:
+  Creates a controller for the given node names, which generates the credentials, and runs
+  `start_cluster` on simulated connections, returning the measurements of the deployment.
+
+- `main`:
+  Parses the command line, repeats the deployment and prints one line of measurements per run.
+
+Key Functionalities:
+--------------------
+- Orchestration Overhead: With `--time-scale 0` all latencies vanish and the measured time is the cost of the
+  controller and the node code itself: credentials, scheduling, synchronization, readiness polling and the
+  startup of the processes running the commands on the nodes.
+
+- Parallelism: The sum of the phase durations divided by the wall-clock time of the bootstrap
+  shows how much of the work the scheduler overlaps, the critical path shows what bounds it.
+
+- Repeated Runs: The first run issues all certificates and transfers every file and image, later runs show the
+  warm path: the containers and the Swarm are reset, the PKI store and the files and images of the nodes persist.
+
+Example Usage:
+--------------
+Run from the repository root, so that the service directories are found:
+
+```bash
+python3 src/benchmark.py --mysql-nodes 3 --mgmt-nodes 2 --runs 3 --time-scale 0.01
+python3 src/benchmark.py --mysql-nodes 5 --mgmt-nodes 4 --no-registry --trace benchmark.trace.json
+```
+"""
+
+import argparse
+import logging
+import os
+import sys
+import tempfile
+import time
+
+import simulation
+import tracing
+
+
+def deploy(cluster: simulation.SimulatedCluster, mysql_nodes: list[str], mgmt_nodes: list[str]) -> dict:
+    sys.argv = [sys.argv[0], "10.0.0.100", "eth0", "24", ",".join(mgmt_nodes), ",".join(mysql_nodes)]
+    import initialize  # pylint: disable=import-outside-toplevel
+
+    initialize.Controller.connection_class = simulation.SimulatedConnection
+    cluster.reset()
+    started = time.monotonic()
+    controller = initialize.Controller()
+    credentials = time.monotonic() - started
+    controller.start_cluster()
+    bootstrap = controller.bootstrap
+    return {
+        "credentials": credentials,
+        "bootstrap": bootstrap.finished - bootstrap.started,
+        "serial": sum(phase.duration for phase in bootstrap.phases.values()),
+        "critical_path": " -> ".join(phase.name for phase in bootstrap.critical_path()),
+        "calls": sum(cluster.calls.values()),
+        "transferred": sum(cluster.transferred.values())
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark the cluster orchestration against simulated nodes.")
+    parser.add_argument("--mysql-nodes", type=int, default=3)
+    parser.add_argument("--mgmt-nodes", type=int, default=2)
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--time-scale", type=float, default=0.01)
+    parser.add_argument("--no-registry", action="store_true", help="build images instead of pulling them")
+    parser.add_argument("--trace", help="record a Chrome trace of all runs into the file")
+    arguments = parser.parse_args()
+    if arguments.mysql_nodes < 3 or arguments.mgmt_nodes < 2:
+        parser.error("at least 3 MySQL nodes and 2 management nodes are required")
+
+    os.chdir(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    logging.basicConfig(level=logging.WARNING, format='%(asctime)s [%(levelname)s] %(message)s')
+    if arguments.trace:
+        tracing.tracer.enable()
+    with tempfile.TemporaryDirectory(prefix="superset-cluster-benchmark-") as workspace:
+        os.environ["SUPERSET_CLUSTER_PKI_STORE"] = os.path.join(workspace, "pki")
+        cluster = simulation.SimulatedCluster(
+            os.path.join(workspace, "nodes"),
+            simulation.Latencies(time_scale=arguments.time_scale, registry=not arguments.no_registry)
+        )
+        simulation.SimulatedConnection.pool = simulation.SimulatedTransportPool(cluster)
+        for run in range(1, arguments.runs + 1):
+            result = deploy(
+                cluster,
+                [f"mysql-{index}" for index in range(arguments.mysql_nodes)],
+                [f"mgmt-{index}" for index in range(arguments.mgmt_nodes)]
+            )
+            print(
+                f"run {run}: credentials {result['credentials']:.2f}s, bootstrap {result['bootstrap']:.2f}s, "
+                f"serial {result['serial']:.2f}s, parallelism {result['serial'] / result['bootstrap']:.2f}x, "
+                f"{result['calls']} remote calls, {result['transferred'] / 1024:.0f} KiB transferred\n"
+                f"  critical path: {result['critical_path']}"
+            )
+    if arguments.trace:
+        tracing.tracer.export(arguments.trace)
+
+
+if __name__ == "__main__":
+    main()
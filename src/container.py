@@ -9,30 +9,47 @@ Classes:
 1. ContainerInstance:
    An abstract base class representing a generic container instance that requires
    health-check configuration. It serves as a blueprint for implementing concrete
-   container services with a `run` method for initialization.
+   container services with a `run` method for initialization and a `ready` method
+   probing the service with its own protocol.
 
 2. ContainerConnection:
    Manages connections to specific Docker containers, offering functionalities
-   for running commands, copying files, retrieving logs, and checking container
+   for running commands, copying files, streaming logs, and checking container
    health. It provides methods to execute commands on containers, transfer files
    to containers, and monitor the container's health status.
 
 3. MySQLServer (nested in `run_mysql_server`):
    Manages the setup and initialization of a MySQL Server instance, including
    configuration of health-check intervals, retries, and environmental variables.
+   The InnoDB, replication and connection settings of the configuration are sized
+   from the CPUs, memory and storage of the node (see `sizing.py`).
 
 4. MySQLMgmt (nested in `run_mysql_mgmt`):
    Configures and runs a MySQL Management instance that sets up virtual IPs and
    network-related environmental variables required for container orchestration.
 
 5. Redis (nested in `run_superset`):
-   Responsible for initializing and setting up a Redis container in a Docker
-   Swarm network, which is essential for supporting Superset in clustered
-   deployments.
+   Responsible for setting up the overlay network and two Redis services in the Docker
+   Swarm, which are essential for supporting Superset in clustered deployments.
+   `redis` holds the Celery queues and results and never evicts keys, `redis-cache`
+   holds the Superset caches and evicts the least frequently used keys, each with a
+   memory limit sized from the node (see `sizing.py`).
+   Swarm places the single task of each on one of the management nodes and moves it
+   to another one when its node fails. Both are ready once they answer `redis-cli ping`,
+   probed in the task container when it runs on the node.
 
 6. Superset (nested in `run_superset`):
    Manages the setup of the Superset service, configuring health checks,
    environment variables, and Docker secrets for secure handling of sensitive data.
+   The metadata database is migrated and initialized once per deployment by the
+   `superset-init` job, which completes before the service is created, so the replicas,
+   also those added by the autoscaler, only start Gunicorn and the Celery workers.
+   The replicas are spread over the management nodes of the swarm, next to them the
+   `autoscaler` service scales the Celery worker pools and the Superset replicas with
+   the queue depth, within limits sized from the node, and the `celery-beat` service
+   schedules the cache warm-up. The Gunicorn profile of the web tier is sized from the
+   node as well. The SQLAlchemy pools and the Celery concurrency are kept within the
+   connections the MySQL nodes accept.
 
 Key Functionalities:
 --------------------
@@ -45,13 +62,42 @@ Key Functionalities:
   users are allowed to execute shell commands on the target container and retrieve
   the output, handling any errors that occur during execution.
 
-- File Transfer to Containers:
-  users are able to package files as a tar archive
-  and transfer them into a specified directory in the target container.
+- Image Distribution:
+  images staged on one node are described by their layer chain identifiers, so that
+  the remaining nodes can receive only the layers they miss (see `images.py`).
 
-- Container Health Checking:
-  mechanisms for polling container health until it reaches a defined "healthy" status or
-  a timeout occurs are provided.
+- File Transfer to Containers:
+  users are able to transfer files and whole directories into a specified directory
+  in the target container with one request, the tar archive is generated on the fly
+  from the file system while it is sent, so memory use does not grow with the files.
+  A file can also be read from the container as raw bytes.
+
+- Log Retrieval:
+  logs are streamed line by line between `since` and `until` cursors with tail and line limits,
+  `follow_logs` returns only the lines written since its previous call (see `logs.py`).
+  Readiness results carry only the last lines written since the container was started.
+  Services such as Redis are logged through the task container Swarm runs on the node.
+
+- Swarm Formation:
+  the first management node initializes the swarm, the remaining management nodes
+  join it as managers and the MySQL nodes as drained managers, enough of them for an
+  odd number of managers, or as drained workers. They never run tasks, but keep the
+  Raft quorum when a management node fails and report their resources for sizing MySQL.
+  The first management node labels every node with its role, so that services are placed
+  on the management nodes only.
+
+- Docker State:
+  all connections in a process share one Docker client and an index of the containers
+  kept current from the Docker events stream (see `dockerstate.py`), container lookups
+  such as the containers of the `superset` service are answered without API requests.
+
+- Container Readiness Checking:
+  services are probed right after they are started, with exponential backoff and jitter,
+  until the first probe succeeds or the health check budget of the container runs out.
+  A state change of the container, such as its start or health status, ends the wait
+  between probes early.
+  MySQL Server and MySQL Router ports must send the MySQL handshake, Redis must answer PING
+  and Superset must report `/health`. The measured time-to-ready is part of the output.
 
 Usage Example:
 --------------
@@ -67,22 +113,29 @@ print(ContainerConnection(
 """
 
 import abc
-import ast
 import io
 import ipaddress
 import json
 import random
 import re
 import socket
+import stat
 import tarfile
-import os
 import time
+import os
 import typing
 import subprocess
 
 import docker
 import requests
 
+import dockerstate
+import images
+import logs
+import readiness
+import sizing
+import tracing
+
 
 # pylint: disable=too-few-public-methods
 class ContainerInstance(abc.ABC):
@@ -94,10 +147,16 @@ class ContainerInstance(abc.ABC):
     def run(self):
         pass
 
+    @abc.abstractmethod
+    def ready(self) -> bool:
+        pass
+
 
 class ContainerConnection:
+    # pylint: disable=too-many-public-methods
     def __init__(self, container: str | None) -> None:
-        self.client = docker.from_env()
+        self.docker_state = dockerstate.shared()
+        self.client = self.docker_state.client
         self.container = container
 
     @staticmethod
@@ -106,9 +165,20 @@ class ContainerConnection:
             client.images.get(image)
         except docker.errors.ImageNotFound:
             try:
-                client.images.pull(image)
+                with tracing.span("pull_image", "image", image=image):
+                    client.images.pull(image)
             except (docker.errors.DockerException, requests.exceptions.RequestException):
-                client.images.build(path=build_context, tag=image)
+                with tracing.span("build_image", "image", image=image):
+                    client.images.build(path=build_context, tag=image)
+
+    def stage_image(self, image: str, build_context: str) -> None:
+        self.pull_or_build_image(self.client, image, build_context)
+
+    def image_layers(self, image: str) -> dict | None:
+        return images.image_layers(self.client, image)
+
+    def count_present_layers(self, chain_ids: list[str]) -> int:
+        return images.count_present_layers(self.client, chain_ids)
 
     def run_command_on_the_container(
             self,
@@ -141,13 +211,69 @@ class ContainerConnection:
     def info(self) -> dict:
         return self.client.info()
 
+    @staticmethod
+    def archive_member(host_path: str, arcname: str) -> tarfile.TarInfo | None:
+        status = os.lstat(host_path)
+        member = tarfile.TarInfo(arcname)
+        member.mode = stat.S_IMODE(status.st_mode)
+        member.mtime = int(status.st_mtime)
+        member.uid = status.st_uid
+        member.gid = status.st_gid
+        if stat.S_ISDIR(status.st_mode):
+            member.type = tarfile.DIRTYPE
+        elif stat.S_ISLNK(status.st_mode):
+            member.type = tarfile.SYMTYPE
+            member.linkname = os.readlink(host_path)
+        elif stat.S_ISREG(status.st_mode):
+            member.size = status.st_size
+        else:
+            return None
+        return member
+
+    @classmethod
+    def stream_archive(cls, host_paths: list[str], chunk_size: int = 65536) -> typing.Iterator[bytes]:
+        for host_path in host_paths:
+            host_path = os.path.normpath(host_path)
+            members = [(host_path, os.path.basename(host_path))]
+            while members:
+                path, arcname = members.pop()
+                member = cls.archive_member(path, arcname)
+                if member is None:
+                    continue
+                yield member.tobuf(tarfile.PAX_FORMAT, "utf-8", "surrogateescape")
+                if member.isdir():
+                    members.extend(
+                        (os.path.join(path, name), f"{arcname}/{name}")
+                        for name in sorted(os.listdir(path), reverse=True)
+                    )
+                elif member.isfile():
+                    remaining = member.size
+                    with open(file=path, mode="rb") as content:
+                        while remaining > 0:
+                            chunk = content.read(min(chunk_size, remaining)) or bytes(min(chunk_size, remaining))
+                            remaining -= len(chunk)
+                            yield chunk
+                    if member.size % tarfile.BLOCKSIZE:
+                        yield bytes(tarfile.BLOCKSIZE - member.size % tarfile.BLOCKSIZE)
+        yield bytes(2 * tarfile.BLOCKSIZE)
+
+    def copy_files_to_the_container(self, host_paths: list[str], container_dirpath: str) -> None:
+        self.client.containers.get(self.container).put_archive(container_dirpath, self.stream_archive(host_paths))
+
     def copy_file_to_the_container(self, host_filepath: str, container_dirpath: str) -> None:
+        self.copy_files_to_the_container([host_filepath], container_dirpath)
+
+    def copy_file_from_the_container(self, container_filepath: str) -> bytes:
         tar_stream = io.BytesIO()
-        with tarfile.open(fileobj=tar_stream, mode='w') as archive:
-            archive.add(host_filepath, arcname=os.path.basename(host_filepath))
+        chunks, _ = self.client.containers.get(self.container).get_archive(container_filepath)
+        for chunk in chunks:
+            tar_stream.write(chunk)
         tar_stream.seek(0)
-        self.client.containers.get(self.container).put_archive(container_dirpath, tar_stream.getvalue())
-        tar_stream.close()
+        with tarfile.open(fileobj=tar_stream, mode='r') as archive:
+            member = archive.extractfile(os.path.basename(container_filepath))
+            if member is None:
+                raise ValueError(f"{container_filepath} in the container {self.container} is not a regular file")
+            return member.read()
 
     @staticmethod
     def find_in_the_output(output: bytes, text: bytes) -> bool:
@@ -161,6 +287,49 @@ class ContainerConnection:
                 raise socket.gaierror(f"Error finding IPv4 for node {node}") from socketerror
             raise ValueError(f"Cannot find host {node} by name") from socketerror
 
+    def find_local_address(self, peer: str) -> str:
+        with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as probe:
+            probe.connect((str(self.find_node_ip(peer)), 2377))
+            return probe.getsockname()[0]
+
+    def label_swarm_node(self, role: str, node_id: str | None = None) -> None:
+        swarm_node = self.client.nodes.get(node_id or self.client.info()["Swarm"]["NodeID"])
+        spec = swarm_node.attrs["Spec"]
+        spec["Labels"] = dict(spec.get("Labels") or {}, **{"superset-cluster.role": role})
+        spec["Availability"] = "drain" if role == "mysql" else "active"
+        swarm_node.update(spec)
+
+    def initialize_swarm(self, peer: str) -> dict[str, str]:
+        advertise_address = self.find_local_address(peer)
+        if self.client.info()["Swarm"]["LocalNodeState"] != "active":
+            self.client.swarm.init(advertise_addr=advertise_address, data_path_port=4789)
+        self.label_swarm_node("mgmt")
+        self.client.swarm.reload()
+        return {
+            "address": f"{advertise_address}:2377",
+            "manager_token": self.client.swarm.attrs["JoinTokens"]["Manager"],
+            "worker_token": self.client.swarm.attrs["JoinTokens"]["Worker"]
+        }
+
+    def join_swarm(self, address: str, token: str) -> str:
+        if self.client.info()["Swarm"]["LocalNodeState"] != "active":
+            self.client.swarm.join(
+                remote_addrs=[address],
+                join_token=token,
+                advertise_addr=self.find_local_address(address.rsplit(":", 1)[0])
+            )
+        return self.client.info()["Swarm"]["NodeID"]
+
+    def wait_for_superset_replica(self, timeout: float = 900) -> str:
+        if self.docker_state.wait_for(
+            lambda: any(
+                record["health"] == "healthy" for record in self.docker_state.containers(service="superset")
+            ),
+            timeout
+        ):
+            return f"Superset replica on {socket.gethostname()} is healthy"
+        return f"Timeout while waiting for a Superset replica on {socket.gethostname()} to be healthy"
+
     @staticmethod
     def extract_session_cookie(request_output: bytes) -> str | ValueError:
         cookie_section = re.search(r"Set-Cookie: session=(.*?);", request_output.decode("utf-8"))
@@ -171,50 +340,68 @@ class ContainerConnection:
     @staticmethod
     def decode_command_output(command: bytes) -> dict[str, dict]:
         try:
-            return ast.literal_eval(
-                command.decode("utf-8")
-                .replace("null", "None")
-                .replace("true", "True")
-                .replace("false", "False")
-            )
-        except (ValueError, SyntaxError) as error:
+            return json.loads(command)
+        except ValueError as error:
             raise ValueError(f"Error decoding command {command!r}") from error
 
-    def get_logs(self) -> str:
+    def log_containers(self) -> list[str]:
         if self.container == "superset":
-            try:
-                return self.client.containers.get(
-                    self.client.containers.list(
-                        filters={"name": "superset"}
-                    )[0].name
-                ).logs().decode("utf-8")
-            except IndexError:
-                return "Container superset has not been spawned by the service"
+            return [record["name"] for record in self.docker_state.containers(service="superset", running=True)[:1]]
         if self.container == "mysql-mgmt":
-            container_log = ""
-            for container in self.client.containers.list(all=True, filters={"name": "mysql-mgmt"})[::-1]:
-                container_log += self.client.containers.get(container.name).logs().decode("utf-8") + "\n\n"
-            return container_log
-        return self.client.containers.get(self.container).logs().decode("utf-8")
+            return [record["name"] for record in self.docker_state.containers(match="mysql-mgmt")][::-1]
+        if self.docker_state.container(str(self.container)) is None:
+            return [record["name"] for record in self.docker_state.containers(service=self.container)[:1]]
+        return [str(self.container)]
+
+    def get_logs(
+            self,
+            since: float | None = None,
+            until: float | None = None,
+            tail: int | None = None,
+            limit: int = 1000) -> str:
+        containers = self.log_containers()
+        if not containers:
+            return f"Container {self.container} has not been spawned by the service"
+        return "\n".join(logs.collect(self.client, containers, since=since, until=until, tail=tail, limit=limit))
+
+    def follow_logs(self, since: float | None = None, tail: int | None = None, limit: int = 1000) -> str:
+        containers = self.log_containers()
+        if not containers:
+            return f"Container {self.container} has not been spawned by the service"
+        cursor = logs.cursors.setdefault(str(self.container), logs.LogCursor())
+        return "\n".join(cursor.read(self.client, containers, since, tail, limit))
 
     def wait_until_healthy(self, cls: typing.Type[ContainerInstance]) -> str:
-        cls.run()  # type: ignore[call-arg]
-        time.sleep(cls.healthcheck_start_period)
-        for _ in range(cls.healthcheck_retries):
-            if self.container == "superset":
-                if self.client.api.tasks(filters={"service": "superset"})[0]["Status"]["State"] == "running":
-                    return f"{self.get_logs()}\nContainer {self.container} is healthy"
-            else:
-                if self.client.containers.get(self.container).attrs["State"]["Health"]["Status"] == "healthy":
-                    return f"{self.get_logs()}\nContainer {self.container} is healthy"
-            time.sleep(cls.healthcheck_interval)
-        return f"{self.get_logs()}\nTimeout while waiting for {self.container} healthcheck to be healthy"
-
-    def run_mysql_server(self) -> None:
+        started = time.time()
+        with tracing.span("run", "container", container=self.container):
+            cls.run()  # type: ignore[call-arg]
+        with tracing.span("wait_until_ready", "container", container=self.container):
+            time_to_ready = readiness.wait_until_ready(
+                str(self.container),
+                cls.ready,  # type: ignore[arg-type]
+                timeout=cls.healthcheck_start_period + cls.healthcheck_retries * cls.healthcheck_interval,
+                sleep=lambda delay: self.docker_state.wait_for_change(delay, match=str(self.container))
+            )
+        if time_to_ready is not None:
+            return (
+                f"{self.get_logs(since=int(started), tail=20, limit=20)}\n"
+                f"Container {self.container} is healthy, ready after {time_to_ready:.1f}s"
+            )
+        return (
+            f"{self.get_logs(since=int(started), tail=200, limit=200)}\n"
+            f"Timeout while waiting for {self.container} healthcheck to be healthy"
+        )
+
+    def run_mysql_server(self, overrides: dict[str, str] | None = None) -> None:
         class MySQLServer(ContainerInstance):
-            def __init__(self, client: docker.client.DockerClient, container: str) -> None:
+            def __init__(
+                    self,
+                    client: docker.client.DockerClient,
+                    container: str,
+                    overrides: dict[str, str] | None) -> None:
                 self.client = client
                 self.container = container
+                self.settings = sizing.mysql_server(sizing.detect(self.client.info()), overrides)
                 self.healthcheck_start_period = 90
                 self.healthcheck_interval = 5
                 self.healthcheck_retries = 3
@@ -243,7 +430,8 @@ class ContainerConnection:
                         "MYSQL_INITDB_SKIP_TZINFO": "true",
                         "MYSQL_ROOT_PASSWORD_FILE": "/var/run/mysqld/mysql_root_password",
                         "SERVER_ID": random.randrange(1, 4294967296),
-                        "HEALTHCHECK_START_PERIOD": 150
+                        "HEALTHCHECK_START_PERIOD": 150,
+                        **{setting.upper(): value for setting, value in self.settings.items()}
                     },
                     healthcheck={
                         "test": ["CMD", "mysqladmin", "ping"],
@@ -268,9 +456,12 @@ class ContainerConnection:
                     }
                 )
 
+            def ready(self) -> bool:
+                return readiness.mysql_handshake("127.0.0.1", 3306)
+
         return print(
             self.wait_until_healthy(
-                MySQLServer(self.client, self.container)  # type: ignore[arg-type]
+                MySQLServer(self.client, self.container, overrides)  # type: ignore[arg-type]
             )
         )
 
@@ -361,6 +552,9 @@ class ContainerConnection:
                     check=True,  # noqa: E128
                 )  # noqa: E124
 
+            def ready(self) -> bool:
+                return all(readiness.mysql_handshake("127.0.0.1", port) for port in (6446, 6447))
+
         return print(
             self.wait_until_healthy(
                 MySQLMgmt(  # type: ignore[arg-type]
@@ -377,7 +571,14 @@ class ContainerConnection:
             )
         )
 
-    def run_superset(self, virtual_ip_address: str, superset_secret_key, mysql_superset_password) -> None:
+    def run_superset(
+            self,
+            virtual_ip_address: str,
+            superset_secret_key,
+            mysql_superset_password,
+            mysql_overrides: dict[str, str] | None = None,
+            gunicorn_overrides: dict[str, str] | None = None) -> None:
+        # pylint: disable=too-many-statements
         class Redis(ContainerInstance):
             def __init__(self, client: docker.client.DockerClient, virtual_ip_address: str) -> None:
                 self.virtual_ip_address = virtual_ip_address
@@ -386,30 +587,28 @@ class ContainerConnection:
                 self.healthcheck_interval = 10
                 self.healthcheck_retries = 5
 
-            def initialize_swarm(self) -> None:
-                self.client.swarm.init(
-                    advertise_addr=self.virtual_ip_address,
-                    data_path_port=4789
-                )
-
             def create_network(self) -> None:
-                self.client.networks.create(
-                    name='superset-network',
-                    driver='overlay',
-                    attachable=True,
-                    options={"encrypted": "true"}
-                )
-
-            def run(self) -> None:
-                self.initialize_swarm()
-                self.create_network()
-                self.client.containers.run(
+                if not self.client.networks.list(names=["superset-network"]):
+                    self.client.networks.create(
+                        name='superset-network',
+                        driver='overlay',
+                        attachable=True,
+                        options={"encrypted": "true"}
+                    )
+
+            def create_service(self, name: str, settings: dict[str, str], persistent: bool) -> None:
+                command = ["redis-server"]
+                for setting, value in settings.items():
+                    command += [f"--{setting}", value]
+                if not persistent:
+                    command += ["--save", "", "--appendonly", "no"]
+                self.client.services.create(
                     "redis",
-                    detach=True,
-                    restart_policy={"Name": "always"},
-                    name="redis",
-                    hostname="redis",
-                    network="superset-network",
+                    command=command,
+                    name=name,
+                    hostname=name,
+                    networks=["superset-network"],
+                    constraints=["node.labels.superset-cluster.role==mgmt"],
                     healthcheck={
                         'test': ["CMD", "redis-cli", "ping"],
                         'interval': self.healthcheck_interval * 1000000000,
@@ -419,21 +618,78 @@ class ContainerConnection:
                     }
                 )
 
+            def run(self) -> None:
+                self.create_network()
+                memory = sizing.redis(sizing.detect(self.client.info()))
+                self.create_service("redis", memory["broker"], persistent=True)
+                self.create_service("redis-cache", memory["cache"], persistent=False)
+
+            def service_ready(self, service: str) -> bool:
+                records = dockerstate.shared().containers(service=service, running=True)
+                if not records:
+                    # The task runs on another management node, where Swarm reports it running
+                    # only once its `redis-cli ping` health check has passed.
+                    return any(
+                        task["Status"]["State"] == "running"
+                        for task in self.client.api.tasks(filters={"service": service, "desired-state": "running"})
+                    )
+                try:
+                    return ContainerConnection.find_in_the_output(
+                        self.client.containers.get(records[0]["name"]).exec_run("redis-cli ping").output,
+                        b"PONG"
+                    )
+                except docker.errors.APIError:
+                    return False
+
+            def ready(self) -> bool:
+                return all(self.service_ready(service) for service in ("redis", "redis-cache"))
+
         class Superset(ContainerInstance):
+            # pylint: disable=too-many-arguments
+            # pylint: disable=too-many-instance-attributes
             def __init__(
                     self,
                     client: docker.client.DockerClient,
                     virtual_ip_address: str,
                     superset_secret_key,
-                    mysql_superset_password) -> None:
+                    mysql_superset_password,
+                    mysql_overrides: dict[str, str] | None,
+                    gunicorn_overrides: dict[str, str] | None) -> None:
                 self.client = client
                 self.virtual_ip_address = virtual_ip_address
                 self.superset_secret_key = superset_secret_key
                 self.mysql_superset_password = mysql_superset_password
+                hardware = sizing.detect(self.client.info())
+                self.autoscaling = sizing.superset_autoscaling(
+                    hardware,
+                    len(self.client.nodes.list(filters={"node.label": "superset-cluster.role=mgmt"}))
+                )
+                self.web = sizing.superset_web(hardware, int(self.autoscaling["replicas_per_node"]), gunicorn_overrides)
+                self.connection_budget = sizing.connection_budget(
+                    self.mysql_max_connections(mysql_overrides),
+                    int(self.autoscaling["max_replicas"]),
+                    int(self.web["workers"]),
+                    int(self.web["threads"]),
+                    int(self.autoscaling["max_concurrency"]),
+                    fixed_worker_processes=sizing.CELERY_REPORTS_CONCURRENCY + sizing.CELERY_MAINTENANCE_CONCURRENCY
+                )
+                self.autoscaling["max_concurrency"] = self.connection_budget["max_concurrency"]
+                self.autoscaling["min_concurrency"] = str(
+                    min(int(self.autoscaling["min_concurrency"]), int(self.connection_budget["max_concurrency"]))
+                )
                 self.healthcheck_start_period = 60
                 self.healthcheck_interval = 60
                 self.healthcheck_retries = 14
 
+            def mysql_max_connections(self, mysql_overrides: dict[str, str] | None) -> int:
+                mysql_nodes = [
+                    sizing.swarm_node_hardware(node.attrs)
+                    for node in self.client.nodes.list(filters={"node.label": "superset-cluster.role=mysql"})
+                ] or [sizing.detect(self.client.info())]
+                return min(
+                    int(sizing.mysql_server(hardware, mysql_overrides)["max_connections"]) for hardware in mysql_nodes
+                )
+
             def create_superset_secret_key_secret(self) -> str:
                 return self.client.secrets.create(
                     name="superset_secret_key",
@@ -452,22 +708,37 @@ class ContainerConnection:
                     self.client, image, "/opt/superset-cluster/superset"
                 )
                 image_id = self.client.images.get(image).id
+                secrets = [
+                    docker.types.SecretReference(
+                        secret_id=self.create_superset_secret_key_secret(),
+                        secret_name="superset_secret_key"
+                    ),
+                    docker.types.SecretReference(
+                        secret_id=self.create_mysql_superset_password_secret(),
+                        secret_name="mysql_superset_password"
+                    )
+                ]
+                self.initialize_metadata(image_id, secrets)
                 self.client.services.create(
                     name="superset",
                     image=image_id,
                     networks=["superset-network"],
-                    secrets=[
-                        docker.types.SecretReference(
-                            secret_id=self.create_superset_secret_key_secret(),
-                            secret_name="superset_secret_key"
-                        ),
-                        docker.types.SecretReference(
-                            secret_id=self.create_mysql_superset_password_secret(),
-                            secret_name="mysql_superset_password"
-                        )
+                    secrets=secrets,
+                    mode=docker.types.ServiceMode("replicated", replicas=int(self.autoscaling["min_replicas"])),
+                    constraints=["node.labels.superset-cluster.role==mgmt"],
+                    preferences=[("spread", "node.id")],
+                    maxreplicas=int(self.autoscaling["replicas_per_node"]),
+                    env=[
+                        f"VIRTUAL_IP_ADDRESS={self.virtual_ip_address}",
+                        f"CELERY_CONCURRENCY={self.autoscaling['min_concurrency']}",
+                        f"CELERY_REPORTS_CONCURRENCY={sizing.CELERY_REPORTS_CONCURRENCY}",
+                        f"CELERY_MAINTENANCE_CONCURRENCY={sizing.CELERY_MAINTENANCE_CONCURRENCY}"
+                    ] + [
+                        f"SQLALCHEMY_{setting.upper()}={value}"
+                        for setting, value in self.connection_budget.items() if setting != "max_concurrency"
+                    ] + [
+                        f"GUNICORN_{setting.upper()}={value}" for setting, value in self.web.items()
                     ],
-                    maxreplicas=1,
-                    env=[f"VIRTUAL_IP_ADDRESS={self.virtual_ip_address}"],
                     endpoint_spec=docker.types.EndpointSpec(
                         mode="vip",
                         ports={443: 443}
@@ -492,6 +763,78 @@ class ContainerConnection:
                         )
                     ]
                 )
+                self.create_autoscaler_service(image_id)
+                self.create_beat_service(image_id, secrets)
+
+            def initialize_metadata(self, image_id: str, secrets: list[docker.types.SecretReference]) -> None:
+                service = self.client.services.create(
+                    name="superset-init",
+                    image=image_id,
+                    command=["/app/initialize_metadata.sh"],
+                    user="superset",
+                    networks=["superset-network"],
+                    secrets=secrets,
+                    mode=docker.types.ServiceMode("replicated-job", replicas=1),
+                    restart_policy=docker.types.RestartPolicy(condition="on-failure", max_attempts=2),
+                    constraints=["node.labels.superset-cluster.role==mgmt"],
+                    env=[
+                        f"VIRTUAL_IP_ADDRESS={self.virtual_ip_address}",
+                        "SQLALCHEMY_POOL_SIZE=1",
+                        "SQLALCHEMY_MAX_OVERFLOW=0"
+                    ]
+                )
+                completed = readiness.wait_until_ready(
+                    "superset-init",
+                    lambda: any(task["Status"]["State"] == "complete" for task in service.tasks()),
+                    timeout=900
+                )
+                if completed is None:
+                    raise RuntimeError(
+                        "Superset metadata not initialized: "
+                        + "; ".join(task["Status"].get("Err", task["Status"]["State"]) for task in service.tasks())
+                    )
+                service.remove()
+
+            def create_autoscaler_service(self, image_id: str) -> None:
+                self.client.services.create(
+                    name="autoscaler",
+                    image=image_id,
+                    command=["python3", "/app/autoscaler.py", "--service", "superset"],
+                    networks=["superset-network"],
+                    constraints=["node.labels.superset-cluster.role==mgmt"],
+                    env=[
+                        f"AUTOSCALER_{setting.upper()}={value}"
+                        for setting, value in self.autoscaling.items() if setting != "replicas_per_node"
+                    ],
+                    mounts=[
+                        docker.types.Mount(
+                            target="/var/run/docker.sock",
+                            source="/var/run/docker.sock",
+                            type="bind"
+                        )
+                    ]
+                )
+
+            def create_beat_service(self, image_id: str, secrets: list[docker.types.SecretReference]) -> None:
+                self.client.services.create(
+                    name="celery-beat",
+                    image=image_id,
+                    command=[
+                        "celery", "--app", "superset.tasks.celery_app:app", "beat",
+                        "--schedule", "/tmp/celerybeat-schedule", "--loglevel", "INFO"
+                    ],
+                    networks=["superset-network"],
+                    secrets=secrets,
+                    constraints=["node.labels.superset-cluster.role==mgmt"],
+                    env=[
+                        f"VIRTUAL_IP_ADDRESS={self.virtual_ip_address}",
+                        "SQLALCHEMY_POOL_SIZE=1",
+                        "SQLALCHEMY_MAX_OVERFLOW=0"
+                    ]
+                )
+
+            def ready(self) -> bool:
+                return readiness.http_health("https://127.0.0.1:443/health")
 
         self.container = "redis"
         print(
@@ -506,7 +849,9 @@ class ContainerConnection:
                     self.client,
                     virtual_ip_address,
                     superset_secret_key,
-                    mysql_superset_password
+                    mysql_superset_password,
+                    mysql_overrides,
+                    gunicorn_overrides
                 )  # type: ignore[arg-type]
             )
         )
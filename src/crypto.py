@@ -7,6 +7,13 @@ Classes:
 - `OpenSSL`:
   A utility class for cryptographic operations, providing static methods for password
   and key generation, CSR and certificate creation, and serialization of cryptographic objects.
+  Batch methods spread key generation and certificate issuance across a process pool and
+  draw pre-generated keys from an optional key pool directory.
+
+Functions:
+----------
+- `generate_private_key_pem` / `issue_certificate`:
+  Process pool workers exchanging keys and certificates with the parent process as PEM strings.
 
 Key Functionalities:
 --------------------
@@ -15,6 +22,9 @@ Key Functionalities:
 - CSR Creation: Generate Certificate Signing Requests for obtaining certificates.
 - Certificate Generation: Create X.509 certificates, optionally signed by a Certificate Authority (CA).
 - Deserialization: Convert private keys and certificates to PEM format strings for storage and transmission.
+- Batch Issuance: Generate keys, CSRs and CA-signed certificates for many common names in parallel processes,
+  since RSA key generation is CPU-bound and grows linearly with the number of nodes.
+- Key Pool: Keep pre-generated private keys on disk, each one is claimed by exactly one deployment and removed.
 
 Usage Example:
 --------------
@@ -41,24 +51,45 @@ certificate = obj.generate_certificate('temporary-cn', csr, key)
 
 # Deserializes the given RSA private key, CSR, or certificate into a PEM format string.
 print(obj.deserialize(certificate))
+
+# Issues PEM encoded keys, CSRs and certificates signed by the given CA key for several common names at once.
+for key_pem, csr_pem, certificate_pem in obj.issue_certificates(['first-cn', 'second-cn'], key):
+    print(certificate_pem)
+
+# Pre-generates 16 keys into a key pool, deployments using OpenSSL(key_pool_directory=...) draw from it.
+OpenSSL(key_pool_directory='/var/lib/superset-cluster/key-pool').fill_key_pool(16)
+```
+
+The key pool can be filled from the CLI as well:
+
+```bash
+python3 src/crypto.py /var/lib/superset-cluster/key-pool 16
+```
 """
 
 # pylint: disable=c-extension-no-member
 
 import base64
+import concurrent.futures
 import datetime
 import os
 import secrets
 import string
+import sys
+import typing
 
 import cryptography
 import cryptography.hazmat.backends
 import cryptography.hazmat.primitives.hashes
 import cryptography.hazmat.primitives.asymmetric.rsa
+import cryptography.hazmat.primitives.serialization
 import cryptography.x509
 
 
 class OpenSSL:
+    def __init__(self, key_pool_directory: str | None = None) -> None:
+        self.key_pool_directory = key_pool_directory
+
     @staticmethod
     def generate_mysql_root_password() -> str:
         return base64.b64encode(os.urandom(16)).decode('utf-8')
@@ -144,3 +175,89 @@ class OpenSSL:
         if pki:
             return pki.public_bytes(cryptography.hazmat.primitives.serialization.Encoding.PEM).decode('utf-8')
         raise ValueError('Cannot deserialize certificate, error while generation')
+
+    @staticmethod
+    def load_private_key(pem: str) -> cryptography.hazmat.primitives.asymmetric.rsa.RSAPrivateKey:
+        return cryptography.hazmat.primitives.serialization.load_pem_private_key(  # type: ignore[return-value]
+            pem.encode('utf-8'),
+            password=None,
+            backend=cryptography.hazmat.backends.default_backend()
+        )
+
+    def draw_from_key_pool(self, count: int) -> list[str]:
+        keys: list[str] = []
+        if not self.key_pool_directory or not os.path.isdir(self.key_pool_directory):
+            return keys
+        for entry in sorted(os.listdir(self.key_pool_directory)):
+            if len(keys) == count:
+                break
+            if not entry.endswith('.pem'):
+                continue
+            claimed_path = os.path.join(self.key_pool_directory, f'{entry}.claimed-{os.getpid()}')
+            try:
+                os.rename(os.path.join(self.key_pool_directory, entry), claimed_path)
+            except FileNotFoundError:
+                continue
+            with open(file=claimed_path, mode='r', encoding='utf-8') as key:
+                keys.append(key.read())
+            os.remove(claimed_path)
+        return keys
+
+    def fill_key_pool(self, count: int) -> None:
+        if not self.key_pool_directory:
+            raise ValueError('Key pool directory is not configured')
+        os.makedirs(self.key_pool_directory, mode=0o700, exist_ok=True)
+        with concurrent.futures.ProcessPoolExecutor(max_workers=min(count, os.cpu_count() or 1)) as executor:
+            for pem in executor.map(generate_private_key_pem, range(count)):
+                descriptor = os.open(
+                    os.path.join(self.key_pool_directory, f'{secrets.token_hex(16)}.pem'),
+                    os.O_WRONLY | os.O_CREAT | os.O_EXCL,
+                    0o600
+                )
+                with os.fdopen(descriptor, mode='w', encoding='utf-8') as key:
+                    key.write(pem)
+
+    def generate_private_keys(self, count: int) -> list[cryptography.hazmat.primitives.asymmetric.rsa.RSAPrivateKey]:
+        keys = self.draw_from_key_pool(count)
+        if len(keys) < count:
+            with concurrent.futures.ProcessPoolExecutor(
+                max_workers=min(count - len(keys), os.cpu_count() or 1)
+            ) as executor:
+                keys.extend(executor.map(generate_private_key_pem, range(count - len(keys))))
+        return [self.load_private_key(key) for key in keys]
+
+    def issue_certificates(
+        self,
+        common_names: list[str],
+        ca_key: cryptography.hazmat.primitives.asymmetric.rsa.RSAPrivateKey
+    ) -> list[tuple[str, str, str]]:
+        pooled_keys: list[str | None] = list(self.draw_from_key_pool(len(common_names)))
+        pooled_keys.extend([None] * (len(common_names) - len(pooled_keys)))
+        with concurrent.futures.ProcessPoolExecutor(
+            max_workers=min(len(common_names), os.cpu_count() or 1)
+        ) as executor:
+            return list(
+                executor.map(
+                    issue_certificate,
+                    common_names,
+                    pooled_keys,
+                    [self.deserialization(ca_key)] * len(common_names)
+                )
+            )
+
+
+def generate_private_key_pem(_: typing.Any = None) -> str:
+    return OpenSSL.deserialization(OpenSSL.generate_private_key())
+
+
+def issue_certificate(common_name: str, key_pem: str | None, ca_key_pem: str) -> tuple[str, str, str]:
+    key = OpenSSL.load_private_key(key_pem if key_pem else generate_private_key_pem())
+    csr = OpenSSL.generate_csr(common_name, key)
+    certificate = OpenSSL.generate_certificate(common_name, csr, OpenSSL.load_private_key(ca_key_pem))
+    return OpenSSL.deserialization(key), OpenSSL.deserialization(csr), OpenSSL.deserialization(certificate)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 3:
+        sys.exit("Usage: python3 crypto.py <key-pool-directory> <number-of-keys>")
+    OpenSSL(key_pool_directory=sys.argv[1]).fill_key_pool(int(sys.argv[2]))
@@ -0,0 +1,212 @@
+"""
+Docker State Module
+
+This module keeps an in-memory index of the containers on a node, fed by the Docker events
+stream, so that questions such as "which superset task container is running" or "is mysql
+healthy" are answered without an API round trip, and waiters are woken by the change itself.
+It runs on the nodes, in the agent process and in the functional tests.
+
+Classes:
+--------
+- `DockerState`:
+  Lists all containers once, then applies the container events (create, start, die, health status,
+  rename, destroy) from a background thread. Every change increases a counter under a condition
+  variable, which waiters block on, and is passed to the subscribed callbacks.
+
+Functions:
+----------
+- `shared`:
+  Returns the process-wide state, starting it on the first call, so that all `ContainerConnection`
+  objects share one Docker client (`DockerState.client`) and one events stream.
+
+Key Functionalities:
+--------------------
+- Lookups: `container`, `containers` and `health` read from the index, containers are matched
+  by name, by substring of the name as Docker name filters do, or by their Swarm or Compose service.
+
+- Waiting: `wait_for_change` blocks until a matching container changes or the timeout expires,
+  `wait_for` blocks until a predicate over the index holds.
+
+- Subscriptions: `subscribe` registers a callback receiving every changed container record,
+  and returns the function removing it again.
+
+- Resynchronization: when the events stream breaks, for example on a Docker daemon restart,
+  the index is listed again and the stream is reopened from the time of the listing.
+
+Example Usage:
+--------------
+```python
+state = shared()
+print(state.health("mysql"))  # "healthy", "unhealthy", "starting" or None without a health check
+state.wait_for(lambda: state.health("mysql") == "healthy", timeout=120)
+unsubscribe = state.subscribe(lambda record: print(record["name"], record["state"], record["health"]))
+```
+"""
+
+import functools
+import logging
+import re
+import threading
+import time
+import typing
+
+import docker
+
+logger = logging.getLogger(__name__)
+
+HEALTH_STATUS = re.compile(r"\((healthy|unhealthy|health: starting)\)")
+
+SERVICE_LABELS = ("com.docker.swarm.service.name", "com.docker.compose.service")
+
+STATE_ACTIONS = ("create", "start", "restart", "unpause", "pause", "die", "stop", "destroy", "rename", "health_status")
+
+
+class DockerState:
+    def __init__(self, client: docker.client.DockerClient) -> None:
+        self.client = client
+        self.condition = threading.Condition()
+        self.records: dict[str, dict] = {}
+        self.changed: dict[str, int] = {}
+        self.changes = 0
+        self.subscribers: list[typing.Callable[[dict], None]] = []
+        self.synchronized = threading.Event()
+
+    def start(self) -> None:
+        threading.Thread(target=self.follow_events, name="docker-state", daemon=True).start()
+        self.synchronized.wait(timeout=30)
+
+    def snapshot(self) -> None:
+        records = {}
+        for container in self.client.api.containers(all=True):
+            health = HEALTH_STATUS.search(container.get("Status", ""))
+            labels = container.get("Labels") or {}
+            record = {
+                "id": container["Id"],
+                "name": container["Names"][0].lstrip("/"),
+                "state": container["State"],
+                "health": health.group(1).replace("health: ", "") if health else None,
+                "service": next((labels[label] for label in SERVICE_LABELS if label in labels), None),
+                "created": container["Created"]
+            }
+            records[record["name"]] = record
+        with self.condition:
+            for name in set(self.records) | set(records):
+                if self.records.get(name) != records.get(name):
+                    self.notify(name, records.get(name) or dict(self.records[name], state="removed"))
+            self.records = records
+            self.condition.notify_all()
+
+    def apply(self, event: dict) -> None:
+        action = event.get("Action", "")
+        attributes = event.get("Actor", {}).get("Attributes", {})
+        name = attributes.get("name")
+        if event.get("Type") != "container" or not name or action.partition(":")[0] not in STATE_ACTIONS:
+            return
+        with self.condition:
+            if action == "rename":
+                old_name = attributes.get("oldName", "").lstrip("/")
+                if old_name in self.records:
+                    self.records[name] = dict(self.records.pop(old_name), name=name)
+            record = self.records.setdefault(
+                name,
+                {
+                    "id": event.get("Actor", {}).get("ID"),
+                    "name": name,
+                    "state": "created",
+                    "health": None,
+                    "service": next((attributes[label] for label in SERVICE_LABELS if label in attributes), None),
+                    "created": event.get("time", int(time.time()))
+                }
+            )
+            if action.startswith("health_status"):
+                record["health"] = action.partition(": ")[2] or attributes.get("health_status")
+            elif action in ("start", "unpause", "restart"):
+                record["state"] = "running"
+                record["health"] = "starting" if record["health"] else None
+            elif action in ("die", "stop"):
+                record["state"] = "exited"
+            elif action == "pause":
+                record["state"] = "paused"
+            elif action == "destroy":
+                record = dict(self.records.pop(name), state="removed")
+            self.notify(name, record)
+            self.condition.notify_all()
+
+    def notify(self, name: str, record: dict) -> None:
+        self.changes += 1
+        self.changed[name] = self.changes
+        for subscriber in list(self.subscribers):
+            try:
+                subscriber(dict(record))
+            except Exception:  # pylint: disable=broad-exception-caught
+                logger.exception("Docker state subscriber failed on %s", name)
+
+    def follow_events(self) -> None:
+        while True:
+            listed = int(time.time())
+            try:
+                self.snapshot()
+                self.synchronized.set()
+                for event in self.client.events(decode=True, since=listed):
+                    self.apply(event)
+            except (docker.errors.DockerException, OSError, ValueError) as error:
+                logger.warning("Docker events stream interrupted, resynchronizing: %s", error)
+            time.sleep(1)
+
+    def subscribe(self, callback: typing.Callable[[dict], None]) -> typing.Callable[[], None]:
+        with self.condition:
+            self.subscribers.append(callback)
+
+        def unsubscribe() -> None:
+            with self.condition:
+                if callback in self.subscribers:
+                    self.subscribers.remove(callback)
+        return unsubscribe
+
+    def container(self, name: str) -> dict | None:
+        with self.condition:
+            record = self.records.get(name)
+            return dict(record) if record else None
+
+    def containers(self, match: str | None = None, service: str | None = None, running: bool = False) -> list[dict]:
+        with self.condition:
+            records = [
+                dict(record) for record in self.records.values()
+                if (match is None or match in record["name"])
+                and (service is None or record["service"] == service)
+                and (not running or record["state"] == "running")
+            ]
+        return sorted(records, key=lambda record: record["created"], reverse=True)
+
+    def health(self, name: str) -> str | None:
+        record = self.container(name)
+        return record["health"] if record else None
+
+    def wait_for(self, predicate: typing.Callable[[], bool], timeout: float) -> bool:
+        with self.condition:
+            return self.condition.wait_for(predicate, timeout)
+
+    def wait_for_change(self, timeout: float, match: str | None = None) -> bool:
+        with self.condition:
+            since = self.changes
+            return self.condition.wait_for(
+                lambda: any(
+                    change > since for name, change in self.changed.items() if match is None or match in name
+                ),
+                timeout
+            )
+
+
+lock = threading.Lock()
+
+
+@functools.lru_cache(maxsize=1)
+def start_shared() -> DockerState:
+    state = DockerState(docker.from_env())
+    state.start()
+    return state
+
+
+def shared() -> DockerState:
+    with lock:
+        return start_shared()
@@ -0,0 +1,98 @@
+"""
+Image Distribution Module
+
+This module moves Docker images between the nodes, so that every image is pulled or built
+once and streamed to the remaining nodes instead of being pulled or built on each of them.
+It runs on the nodes, the controller only relays the streams between them.
+
+Functions:
+----------
+- `chain_ids`:
+  Computes the layer chain identifiers from the ordered layer diff identifiers of an image,
+  the same way the Docker layer store identifies layers including all of their parents.
+
+- `image_layers`:
+  Returns the identifier and the chain identifiers of a local image, or `None` if it is missing.
+
+- `count_present_layers`:
+  Counts how many leading layers of an image, given by their chain identifiers,
+  already exist in the local layer store.
+
+- `export`:
+  Saves an image and writes it into a stream as a gzip compressed archive accepted by `docker load`,
+  leaving out the contents of the leading layers that the receiving node already has.
+
+Key Functionalities:
+--------------------
+- Layer Deduplication: `docker load` does not read the content of a layer whose chain identifier
+  already exists in the layer store, so these layers are omitted from the stream.
+
+- Compression: The archive is compressed with the fastest gzip level, layers are transferred
+  over the SSH channels of the controller, which are usually slower than compression.
+
+Example Usage:
+--------------
+The controller streams the standard output of the following command on the first node into
+`docker load` running on another node, which already has the first 3 layers:
+
+```bash
+python3 /opt/superset-cluster/agent/images.py ghcr.io/szachovy/superset-cluster-mysql-server:latest 3
+```
+"""
+
+import gzip
+import hashlib
+import json
+import sys
+import tarfile
+import tempfile
+import typing
+
+import docker
+
+
+def chain_ids(diff_ids: list[str]) -> list[str]:
+    chain: list[str] = []
+    for diff_id in diff_ids:
+        chain.append(
+            diff_id if not chain else "sha256:" + hashlib.sha256(f"{chain[-1]} {diff_id}".encode("ascii")).hexdigest()
+        )
+    return chain
+
+
+def image_layers(client: docker.client.DockerClient, image: str) -> dict | None:
+    try:
+        attributes = client.images.get(image).attrs
+    except docker.errors.ImageNotFound:
+        return None
+    return {"id": attributes["Id"], "chain_ids": chain_ids(attributes["RootFS"].get("Layers", []))}
+
+
+def count_present_layers(client: docker.client.DockerClient, image_chain_ids: list[str]) -> int:
+    present = set()
+    for local_image in client.images.list(all=True):
+        present.update(chain_ids(local_image.attrs["RootFS"].get("Layers", [])))
+    count = 0
+    while count < len(image_chain_ids) and image_chain_ids[count] in present:
+        count += 1
+    return count
+
+
+def export(client: docker.client.DockerClient, image: str, skip_layers: int, stream: typing.BinaryIO) -> None:
+    with tempfile.TemporaryFile(prefix="superset-cluster-image-") as spool:
+        for chunk in client.images.get(image).save(named=True):
+            spool.write(chunk)
+        spool.seek(0)
+        with tarfile.open(fileobj=spool, mode="r:") as saved:
+            layer_paths = json.load(saved.extractfile("manifest.json"))[0]["Layers"]  # type: ignore[arg-type]
+            skipped = set(layer_paths[:skip_layers]) - set(layer_paths[skip_layers:])
+            with gzip.GzipFile(fileobj=stream, mode="wb", compresslevel=1) as compressed:
+                with tarfile.open(fileobj=compressed, mode="w|") as archive:  # type: ignore[call-overload]
+                    for member in saved:
+                        if member.name in skipped:
+                            continue
+                        archive.addfile(member, saved.extractfile(member) if member.isfile() else None)
+
+
+if __name__ == "__main__":
+    export(docker.from_env(), sys.argv[1], int(sys.argv[2]), sys.stdout.buffer)
@@ -20,14 +20,20 @@ Classes:
 Key Functionalities:
 --------------------
 - Cluster Initialization: Sets up MySQL and management nodes, configures
-  virtual IP settings, and initiates the Superset service.
+  virtual IP settings, forms one Docker Swarm of all nodes, managed by an odd number of
+  them so that it keeps its quorum when a node fails, and initiates the
+  Superset service with replicas spread over the management nodes.
+
+- Parallel Bootstrap: Models the dependencies between the bootstrap phases as a
+  graph and runs independent phases concurrently on a bounded worker pool, reporting
+  the measured critical path at the end.
 
 - Secure Authentication: Uses OpenSSL for generating private keys and
   certificates required for secure communications between cluster components.
 
 - Remote Management: Employs the remote connection routines for
-  handling SSH/SFTP communications with nodes, including uploading
-  directories/files and executing commands.
+  handling SSH/SFTP communications with nodes, including incremental
+  synchronization of service directories, uploading files and executing commands.
 
 Example Usage:
 --------------
@@ -46,7 +52,6 @@ python initialize.py 192.168.1.100 eth0 24 mgmt1,mgmt2 mysql1,mysql2,mysql3
 ```
 """
 
-# pylint: disable=consider-using-f-string
 # pylint: disable=attribute-defined-outside-init
 # pylint: disable=wrong-import-position
 
@@ -55,16 +60,21 @@ import sys
 if sys.version_info < (3, 10):
     sys.exit(f"Python >= 3.10 required (found {sys.version_info.major}.{sys.version_info.minor})")
 
-import base64
 import functools
 import ipaddress
 import itertools
+import os
 import re
 import socket
+import typing
 
 import crypto
 import decorators
+import pki
 import remote
+import scheduler
+import sizing
+import tracing
 
 
 @decorators.Overlay.run_all_methods  # type: ignore[arg-type]
@@ -113,94 +123,160 @@ class ArgumentParser:
 
 class Controller(ArgumentParser, metaclass=decorators.Overlay):
     # pylint: disable=too-many-instance-attributes
+    connection_class: typing.Type[remote.RemoteConnection] = remote.RemoteConnection
+
     def __init__(self) -> None:
         super().__init__()
         self.mysql_nodes: list[remote.RemoteConnection] = [
-            remote.RemoteConnection(node) for node in self.mysql_nodes
+            self.connection_class(node) for node in self.mysql_nodes
         ]  # type: ignore[assignment]
         self.mgmt_nodes: list[remote.RemoteConnection] = [
-            remote.RemoteConnection(node) for node in self.mgmt_nodes
+            self.connection_class(node) for node in self.mgmt_nodes
         ]  # type: ignore[assignment]
-        self.cert_manager = crypto.OpenSSL()
+        self.cert_manager = crypto.OpenSSL(key_pool_directory=os.environ.get('SUPERSET_CLUSTER_KEY_POOL'))
+        self.image_distribution = os.environ.get('SUPERSET_CLUSTER_IMAGE_DISTRIBUTION', 'stream')
+        self.mysql_overrides = sizing.validate_overrides(
+            {
+                name.removeprefix("SUPERSET_CLUSTER_MYSQL_").lower(): value
+                for name, value in os.environ.items() if name.startswith("SUPERSET_CLUSTER_MYSQL_")
+            },
+            sizing.MYSQL_SERVER_SETTINGS
+        )
+        self.gunicorn_overrides = sizing.validate_overrides(
+            {
+                name.removeprefix("SUPERSET_CLUSTER_GUNICORN_").lower(): value
+                for name, value in os.environ.items() if name.startswith("SUPERSET_CLUSTER_GUNICORN_")
+            },
+            sizing.SUPERSET_WEB_SETTINGS
+        )
 
     @decorators.Overlay.run_selected_methods_once
+    @tracing.traced("controller")
     def credentials(self) -> None:
-        self.ca_key = self.cert_manager.generate_private_key()
-        self.ca_certificate = self.cert_manager.generate_certificate('Superset-Cluster', self.ca_key)
+        store = pki.ArtifactStore(
+            self.cert_manager,
+            os.environ.get('SUPERSET_CLUSTER_PKI_STORE', '~/.superset-cluster/pki')
+        )
+        self.certificate_authority = store.certificate_authority('Superset-Cluster')
         self.mysql_root_password = self.cert_manager.generate_mysql_root_password()
         self.mysql_superset_password = self.cert_manager.generate_mysql_superset_password()
         self.superset_secret_key = self.cert_manager.generate_superset_secret_key()
-        for node in list(itertools.chain(self.mysql_nodes, self.mgmt_nodes)):
-            node.key = self.cert_manager.generate_private_key()
-            node.csr = self.cert_manager.generate_csr(f'Superset-Cluster-{node.node}', node.key)
-            node.certificate = self.cert_manager.generate_certificate(f'Superset-Cluster-{node.node}',
-                                                                      node.csr,
-                                                                      self.ca_key)
+        nodes = list(itertools.chain(self.mysql_nodes, self.mgmt_nodes))
+        artifacts = store.obtain(
+            {f'node-{node.node}': f'Superset-Cluster-{node.node}' for node in nodes}
+            | {f'superset-{node.node}': self.virtual_ip_address for node in self.mgmt_nodes},
+            self.certificate_authority
+        )
+        for node in nodes:
+            node.artifact = artifacts[f'node-{node.node}']
             node.create_directory('/opt/superset-cluster')
         for node in self.mgmt_nodes:
-            node.superset_key = self.cert_manager.generate_private_key()
-            node.superset_csr = self.cert_manager.generate_csr(self.virtual_ip_address, node.superset_key)
-            node.superset_certificate = self.cert_manager.generate_certificate(self.virtual_ip_address,
-                                                                               node.superset_csr,
-                                                                               self.ca_key)
+            node.superset_artifact = artifacts[f'superset-{node.node}']
+        self.ca_bundle = "".join(
+            node.artifact.certificate_pem for node in self.mysql_nodes  # type: ignore[union-attr]
+        ) + self.certificate_authority.certificate_pem
+
+    @staticmethod
+    def validate_mylogin_cnf(mylogin_cnf: bytes, login_paths: int) -> None:
+        offset = 24
+        records = 0
+        while offset < len(mylogin_cnf):
+            if offset + 4 > len(mylogin_cnf):
+                raise ValueError(f"Fetched MYSQL_TEST_LOGIN_FILE invalid: truncated record header at byte {offset}")
+            length = int.from_bytes(mylogin_cnf[offset:offset + 4], "little")
+            if length == 0 or length % 16 or offset + 4 + length > len(mylogin_cnf):
+                raise ValueError(f"Fetched MYSQL_TEST_LOGIN_FILE invalid: malformed record at byte {offset}")
+            offset += 4 + length
+            records += 1
+        if records < 4 * login_paths:
+            raise ValueError(
+                f"Fetched MYSQL_TEST_LOGIN_FILE invalid: {records} records for {login_paths} login paths"
+            )
 
     @functools.lru_cache(maxsize=1)
     def get_mylogin_cnf(self, node: remote.RemoteConnection) -> bytes:
+        failure = ""
         for _ in range(3):
-            output = node.run_python_container_command(
-                "print( \
-                    ContainerConnection( \
-                        container='mysql' \
-                    ).run_command_on_the_container( \
-                        '/opt/store_credentials.exp {mysql_nodes}', \
-                        'root', \
-                        {{'MYSQL_TEST_LOGIN_FILE': '/var/run/mysqld/.mylogin.cnf'}} \
-                    ) \
-                )".format(
-                    mysql_nodes=" ".join(node.node for node in self.mysql_nodes))
-                )["output"]
-            mylogin_cnf = base64.b64decode(output[2:-2].replace("\\n", ""))
-            if len(mylogin_cnf) > 320:
-                return mylogin_cnf
-        raise ValueError("Fetched MYSQL_TEST_LOGIN_FILE invalid")
-
-    def start_mysql_servers(self) -> None:
-        for node in self.mysql_nodes:
-            node.upload_directory(
-                local_directory_path="./services/mysql-server",
-                remote_directory_path="/opt/superset-cluster/mysql-server"
-            )
-            node.upload_file(
-                content=self.mysql_root_password,
-                remote_file_path="/opt/superset-cluster/mysql-server/mysql_root_password"
-            )
-            node.upload_file(
-                content=self.cert_manager.deserialization(self.ca_key),
-                remote_file_path="/opt/superset-cluster/mysql-server/superset_cluster_ca_key.pem")
-            node.upload_file(
-                content="".join(self.cert_manager.deserialization(node.certificate) for node in self.mysql_nodes)
-                + self.cert_manager.deserialization(self.ca_certificate),
-                remote_file_path="/opt/superset-cluster/mysql-server/superset_cluster_ca_certificate.pem"
-            )
-            node.upload_file(
-                content=self.cert_manager.deserialization(node.key),
-                remote_file_path="/opt/superset-cluster/mysql-server/mysql_server_key.pem"
-            )
-            node.upload_file(
-                content=self.cert_manager.deserialization(node.certificate),
-                remote_file_path="/opt/superset-cluster/mysql-server/mysql_server_certificate.pem"
+            stored = node.run_container_method(
+                "mysql",
+                "run_command_on_the_container",
+                f"/opt/store_credentials.exp {' '.join(node.node for node in self.mysql_nodes)}",
+                "root",
+                {"MYSQL_TEST_LOGIN_FILE": "/var/run/mysqld/.mylogin.cnf"}
             )
-            node.run_python_container_command(
-                "ContainerConnection( \
-                    container='mysql' \
-                ).run_mysql_server()"
+            if stored["error"] or stored["result"] is None:
+                failure = f"storing the login paths failed: {stored['error']}"
+                continue
+            copied = node.run_container_method(
+                "mysql",
+                "copy_file_from_the_container",
+                "/var/run/mysqld/.mylogin.cnf"
             )
+            if copied["error"] or copied["result"] is None:
+                failure = f"copying the login file failed: {copied['error']}"
+                continue
+            try:
+                self.validate_mylogin_cnf(copied["result"], len(self.mysql_nodes))
+            except ValueError as error:
+                failure = str(error)
+                continue
+            return copied["result"]
+        raise ValueError(f"Fetched MYSQL_TEST_LOGIN_FILE invalid on {node.node}: {failure}")
 
-    def start_mysql_mgmt(self, node: remote.RemoteConnection, state: str, priority: int) -> None:
-        node.upload_directory(
+    def sync_mysql_server(self, node: remote.RemoteConnection) -> None:
+        node.sync_directory(
+            local_directory_path="./services/mysql-server",
+            remote_directory_path="/opt/superset-cluster/mysql-server",
+            generated_files={
+                "superset_cluster_ca_key.pem": self.certificate_authority.key_pem,
+                "superset_cluster_ca_certificate.pem": self.ca_bundle,
+                "mysql_server_key.pem": node.artifact.key_pem,  # type: ignore[union-attr]
+                "mysql_server_certificate.pem": node.artifact.certificate_pem  # type: ignore[union-attr]
+            }
+        )
+
+    def stage_mysql_server_image(self) -> None:
+        source, *targets = self.mysql_nodes
+        self.sync_mysql_server(source)
+        self.stage_image(
+            source,
+            targets,
+            "ghcr.io/szachovy/superset-cluster-mysql-server:latest",
+            "/opt/superset-cluster/mysql-server"
+        )
+
+    def start_mysql_server(self, node: remote.RemoteConnection) -> None:
+        self.sync_mysql_server(node)
+        node.upload_file(
+            content=self.mysql_root_password,
+            remote_file_path="/opt/superset-cluster/mysql-server/mysql_root_password"
+        )
+        node.run_container_method("mysql", "run_mysql_server", self.mysql_overrides)
+
+    def sync_mysql_mgmt(self, node: remote.RemoteConnection) -> None:
+        node.sync_directory(
             local_directory_path="./services/mysql-mgmt",
-            remote_directory_path="/opt/superset-cluster/mysql-mgmt"
+            remote_directory_path="/opt/superset-cluster/mysql-mgmt",
+            generated_files={
+                "superset_cluster_ca_key.pem": self.certificate_authority.key_pem,
+                "superset_cluster_ca_certificate.pem": self.ca_bundle,
+                "mysql_router_key.pem": node.artifact.key_pem,  # type: ignore[union-attr]
+                "mysql_router_certificate.pem": node.artifact.certificate_pem  # type: ignore[union-attr]
+            }
+        )
+
+    def stage_mysql_mgmt_image(self) -> None:
+        source, *targets = self.mgmt_nodes
+        self.sync_mysql_mgmt(source)
+        self.stage_image(
+            source,
+            targets,
+            "ghcr.io/szachovy/superset-cluster-mysql-mgmt:latest",
+            "/opt/superset-cluster/mysql-mgmt"
         )
+
+    def start_mysql_mgmt(self, node: remote.RemoteConnection, state: str, priority: int) -> None:
+        self.sync_mysql_mgmt(node)
         node.upload_file(
             content=self.mysql_superset_password,
             remote_file_path="/opt/superset-cluster/mysql-mgmt/mysql_superset_password"
@@ -212,93 +288,146 @@ class Controller(ArgumentParser, metaclass=decorators.Overlay):
         node.change_permissions_to_root(
             "/opt/superset-cluster/mysql-mgmt/.mylogin.cnf"
         )
-        node.upload_file(
-            content=self.cert_manager.deserialization(self.ca_key),
-            remote_file_path="/opt/superset-cluster/mysql-mgmt/superset_cluster_ca_key.pem"
-        )
-        node.upload_file(
-            content="".join(self.cert_manager.deserialization(node.certificate) for node in self.mysql_nodes)
-            + self.cert_manager.deserialization(self.ca_certificate),
-            remote_file_path="/opt/superset-cluster/mysql-mgmt/superset_cluster_ca_certificate.pem"
+        node.run_container_method(
+            "mysql-mgmt",
+            "run_mysql_mgmt",
+            self.virtual_ip_address,
+            str(self.virtual_network_mask),
+            self.virtual_network_interface,
+            self.mysql_nodes[0].node,
+            self.mysql_nodes[1].node,
+            self.mysql_nodes[2].node,
+            state,
+            str(priority)
         )
-        node.upload_file(
-            content=self.cert_manager.deserialization(node.key),
-            remote_file_path="/opt/superset-cluster/mysql-mgmt/mysql_router_key.pem"
+
+    def stage_superset(self, node: remote.RemoteConnection) -> None:
+        node.sync_directory(
+            local_directory_path="./services/superset",
+            remote_directory_path='/opt/superset-cluster/superset',
+            generated_files={
+                "superset_cluster_ca_key.pem": self.certificate_authority.key_pem,
+                "superset_cluster_ca_certificate.pem": self.certificate_authority.certificate_pem,
+                "superset_cluster_key.pem": node.superset_artifact.key_pem,  # type: ignore[union-attr]
+                "superset_cluster_certificate.pem": node.superset_artifact.certificate_pem  # type: ignore[union-attr]
+            }
         )
-        node.upload_file(
-            content=self.cert_manager.deserialization(node.certificate),
-            remote_file_path="/opt/superset-cluster/mysql-mgmt/mysql_router_certificate.pem"
+
+    def stage_superset_image(self) -> None:
+        source, *targets = self.mgmt_nodes
+        self.stage_image(
+            source,
+            targets,
+            "ghcr.io/szachovy/superset-cluster-superset-service:latest",
+            "/opt/superset-cluster/superset"
         )
-        node.run_python_container_command(
-            "ContainerConnection( \
-                container='mysql-mgmt' \
-            ).run_mysql_mgmt( \
-                '{virtual_ip_address}', \
-                '{virtual_network_mask}', \
-                '{virtual_network_interface}', \
-                '{primary_mysql_node}', \
-                '{secondary_first_mysql_node}', \
-                '{secondary_second_mysql_node}', \
-                '{state}', \
-                '{priority}' \
-            )".format(virtual_ip_address=self.virtual_ip_address,
-                      virtual_network_mask=self.virtual_network_mask,
-                      virtual_network_interface=self.virtual_network_interface,
-                      primary_mysql_node=self.mysql_nodes[0].node,
-                      secondary_first_mysql_node=self.mysql_nodes[1].node,
-                      secondary_second_mysql_node=self.mysql_nodes[2].node,
-                      state=state,
-                      priority=priority)
+
+    def stage_image(
+            self,
+            source: remote.RemoteConnection,
+            targets: list[remote.RemoteConnection],
+            image: str,
+            build_context: str) -> None:
+        source.run_container_method(None, "stage_image", image, build_context)
+        if self.image_distribution == "stream":
+            source.distribute_image(image, targets)
+
+    def start_swarm(self) -> None:
+        swarm = self.mgmt_nodes[0].run_container_method(None, "initialize_swarm", self.mgmt_nodes[1].node)["result"]
+        if swarm is None:
+            raise RuntimeError(f"Swarm could not be initialized on {self.mgmt_nodes[0].node}")
+        self.swarm = swarm
+
+    def swarm_managers(self) -> list[remote.RemoteConnection]:
+        managers = self.mgmt_nodes + self.mysql_nodes
+        return managers if len(managers) % 2 else managers[:-1]
+
+    def join_swarm(self, node: remote.RemoteConnection, role: str) -> None:
+        token = self.swarm["manager_token"] if node in self.swarm_managers() else self.swarm["worker_token"]
+        node_id = node.run_container_method(None, "join_swarm", self.swarm["address"], token)["result"]
+        if node_id is None:
+            raise RuntimeError(f"{node.node} could not join the Swarm")
+        self.mgmt_nodes[0].run_container_method(None, "label_swarm_node", role, node_id)
+
+    def wait_for_superset_replica(self, node: remote.RemoteConnection) -> None:
+        node.run_container_method("superset", "wait_for_superset_replica")
+
+    def start_superset(self, node: remote.RemoteConnection) -> None:
+        node.run_container_method(
+            "superset",
+            "run_superset",
+            self.virtual_ip_address,
+            self.superset_secret_key,
+            self.mysql_superset_password,
+            self.mysql_overrides,
+            self.gunicorn_overrides
         )
 
-    def start_superset(self) -> None:
+    def start_cluster(self) -> None:
+        self.bootstrap = bootstrap = scheduler.Scheduler(max_workers=len(self.mysql_nodes) + len(self.mgmt_nodes))
+        bootstrap.add("mysql-server-image", self.stage_mysql_server_image)
+        bootstrap.add("mysql-mgmt-image", self.stage_mysql_mgmt_image)
+        for node in self.mysql_nodes:
+            bootstrap.add(f"mysql-server:{node.node}", self.start_mysql_server, node, depends_on=["mysql-server-image"])
         for node in self.mgmt_nodes:
-            node.upload_directory(
-                local_directory_path="./services/superset",
-                remote_directory_path='/opt/superset-cluster/superset'
-            )
-            node.upload_file(
-                content=self.cert_manager.deserialization(self.ca_key),
-                remote_file_path="/opt/superset-cluster/superset/superset_cluster_ca_key.pem"
-            )
-            node.upload_file(
-                content=self.cert_manager.deserialization(self.ca_certificate),
-                remote_file_path="/opt/superset-cluster/superset/superset_cluster_ca_certificate.pem"
-            )
-            node.upload_file(
-                content=self.cert_manager.deserialization(node.superset_key),
-                remote_file_path="/opt/superset-cluster/superset/superset_cluster_key.pem"
-            )
-            node.upload_file(
-                content=self.cert_manager.deserialization(node.superset_certificate),
-                remote_file_path="/opt/superset-cluster/superset/superset_cluster_certificate.pem"
-            )
-            node.run_python_container_command(
-                "ContainerConnection( \
-                    container='superset' \
-                ).run_superset( \
-                    '{virtual_ip_address}', \
-                    '{superset_secret_key}', \
-                    '{mysql_superset_password}' \
-                )".format(virtual_ip_address=self.virtual_ip_address,
-                          superset_secret_key=self.superset_secret_key,
-                          mysql_superset_password=self.mysql_superset_password)
+            bootstrap.add(f"superset-staging:{node.node}", self.stage_superset, node)
+        bootstrap.add(
+            "superset-image",
+            self.stage_superset_image,
+            depends_on=[f"superset-staging:{self.mgmt_nodes[0].node}"]
+        )
+        bootstrap.add(
+            f"mysql-mgmt:{self.mgmt_nodes[0].node}",
+            self.start_mysql_mgmt,
+            node=self.mgmt_nodes[0],
+            state="MASTER",
+            priority=100,
+            depends_on=[f"mysql-server:{node.node}" for node in self.mysql_nodes] + ["mysql-mgmt-image"]
+        )
+        bootstrap.add(
+            f"mysql-mgmt:{self.mgmt_nodes[1].node}",
+            self.start_mysql_mgmt,
+            node=self.mgmt_nodes[1],
+            state="BACKUP",
+            priority=90,
+            depends_on=[f"mysql-mgmt:{self.mgmt_nodes[0].node}"]
+        )
+        bootstrap.add("swarm", self.start_swarm)
+        swarm_members = [(node, "mgmt") for node in self.mgmt_nodes[1:]]
+        swarm_members += [(node, "mysql") for node in self.mysql_nodes]
+        for node, role in swarm_members:
+            bootstrap.add(f"swarm-join:{node.node}", self.join_swarm, node, role, depends_on=["swarm"])
+        bootstrap.add(
+            f"superset:{self.mgmt_nodes[0].node}",
+            self.start_superset,
+            self.mgmt_nodes[0],
+            depends_on=[f"mysql-mgmt:{mgmt_node.node}" for mgmt_node in self.mgmt_nodes[:2]]
+            + [f"superset-staging:{node.node}" for node in self.mgmt_nodes]
+            + [f"swarm-join:{node.node}" for node, _ in swarm_members]
+            + ["superset-image"]
+        )
+        for node in self.mgmt_nodes[1:]:
+            bootstrap.add(
+                f"superset-replica:{node.node}",
+                self.wait_for_superset_replica,
+                node,
+                depends_on=[f"superset:{self.mgmt_nodes[0].node}"]
             )
-
-    def start_cluster(self) -> None:
         try:
-            self.start_mysql_servers()
-            self.start_mysql_mgmt(node=self.mgmt_nodes[0], state="MASTER", priority=100)
-            self.start_mysql_mgmt(node=self.mgmt_nodes[1], state="BACKUP", priority=90)
-            self.start_superset()
+            bootstrap.run()
         finally:
             for node in list(itertools.chain(self.mysql_nodes, self.mgmt_nodes)):
-                node.ssh_client.close()
-                node.sftp_client.close()
+                node.close()
 
 
 if __name__ == "__main__":
     if len(sys.argv) != 6:
         print("Invalid form of arguments provided")
         sys.exit(1)
-    Controller().start_cluster()
+    if os.environ.get("SUPERSET_CLUSTER_TRACE"):
+        tracing.tracer.enable()
+    try:
+        Controller().start_cluster()
+    finally:
+        if tracing.tracer.enabled:
+            tracing.tracer.export(os.environ["SUPERSET_CLUSTER_TRACE"])
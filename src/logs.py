@@ -0,0 +1,150 @@
+"""
+Container Logs Module
+
+This module reads container logs as streams of lines, so that the logs of long running
+MySQL Server and MySQL Router containers never have to be held in memory as a whole.
+It runs on the nodes next to `container.py`.
+
+Classes:
+--------
+- `LogCursor`:
+  Remembers the timestamp of the last line read from every container, so that each read
+  returns only the lines written since the previous one. Cursors live in the agent process
+  and are kept in `cursors` by name between remote calls.
+
+Functions:
+----------
+- `lines`:
+  Splits a stream of log chunks into lines, truncating lines longer than `MAX_LINE_LENGTH`,
+  so that memory stays bounded by the chunk size and the line limit.
+
+- `entries`:
+  Streams the lines of one container between optional `since` and `until` cursors,
+  limited to its last `tail` lines, as `(timestamp, container, text)` tuples.
+
+- `collect`:
+  Merges the entries of several containers in timestamp order and keeps only the last `limit` lines.
+
+Key Functionalities:
+--------------------
+- Cursors: `since` and `until` accept Unix timestamps, Docker filters the log on its side,
+  so lines outside the window are not transferred from the Docker daemon.
+
+- Bounded Memory: lines are consumed one by one and only the last `limit` lines are kept.
+
+- Following: several containers, such as all `mysql-mgmt` containers, are read with one cursor
+  and their new lines are returned interleaved by time, each prefixed with its container.
+
+Example Usage:
+--------------
+```python
+client = docker.from_env()
+print("\\n".join(collect(client, ["mysql"], since=time.time() - 60, limit=20)))
+cursor = cursors.setdefault("mysql-mgmt", LogCursor())
+print("\\n".join(cursor.read(client, ["mysql-mgmt", "mysql-mgmt-1"])))  # all lines so far
+print("\\n".join(cursor.read(client, ["mysql-mgmt", "mysql-mgmt-1"])))  # only lines written meanwhile
+```
+"""
+
+import calendar
+import collections
+import heapq
+import time
+import typing
+
+import docker
+
+MAX_LINE_LENGTH = 64 * 1024
+
+Entry = tuple[int, str, str]
+
+
+def lines(chunks: typing.Iterable[bytes], max_line_length: int = MAX_LINE_LENGTH) -> typing.Iterator[bytes]:
+    buffer = bytearray()
+    for chunk in chunks:
+        *complete, rest = chunk.split(b"\n")
+        for piece in complete:
+            buffer += piece[:max(max_line_length - len(buffer), 0)]
+            yield bytes(buffer)
+            buffer.clear()
+        buffer += rest[:max(max_line_length - len(buffer), 0)]
+    if buffer:
+        yield bytes(buffer)
+
+
+def parse_timestamp(timestamp: str) -> int:
+    seconds, _, fraction = timestamp.rstrip("Z").partition(".")
+    try:
+        return calendar.timegm(time.strptime(seconds, "%Y-%m-%dT%H:%M:%S")) * 1000000000 + int(fraction.ljust(9, "0"))
+    except ValueError:
+        return 0
+
+
+def entries(
+        client: docker.client.DockerClient,
+        container: str,
+        since: float | None = None,
+        until: float | None = None,
+        tail: int | None = None) -> typing.Iterator[Entry]:
+    chunks = client.containers.get(container).logs(
+        stream=True,
+        follow=False,
+        timestamps=True,
+        since=since,
+        until=until,
+        tail=tail if tail is not None else "all"
+    )
+    for line in lines(chunks):
+        timestamp, _, text = line.decode("utf-8", errors="replace").partition(" ")
+        yield parse_timestamp(timestamp), container, text
+
+
+def merge(streams: list[typing.Iterator[Entry]], limit: int) -> list[str]:
+    last_lines = collections.deque(heapq.merge(*streams), maxlen=limit)
+    if len(streams) == 1:
+        return [text for _, _, text in last_lines]
+    return [f"[{container}] {text}" for _, container, text in last_lines]
+
+
+def collect(
+        client: docker.client.DockerClient,
+        containers: list[str],
+        *,
+        since: float | None = None,
+        until: float | None = None,
+        tail: int | None = None,
+        limit: int = 1000) -> list[str]:
+    # pylint: disable=too-many-arguments
+    return merge([entries(client, container, since, until, tail) for container in containers], limit)
+
+
+class LogCursor:
+    def __init__(self) -> None:
+        self.positions: dict[str, int] = {}
+
+    def new_entries(
+            self,
+            client: docker.client.DockerClient,
+            container: str,
+            since: float | None,
+            tail: int | None) -> typing.Iterator[Entry]:
+        position = self.positions.get(container)
+        if position is not None:
+            since = position // 1000000000
+        for entry in entries(client, container, since=since, tail=tail):
+            if position is not None and entry[0] <= position:
+                continue
+            self.positions[container] = max(entry[0], self.positions.get(container, 0))
+            yield entry
+
+    def read(
+            self,
+            client: docker.client.DockerClient,
+            containers: list[str],
+            since: float | None = None,
+            tail: int | None = None,
+            limit: int = 1000) -> list[str]:
+        return merge([self.new_entries(client, container, since, tail) for container in containers], limit)
+
+
+cursors: dict[str, LogCursor] = {}
@@ -0,0 +1,179 @@
+"""
+PKI Artifact Store Module
+
+This module keeps the private keys and certificates of the cluster on the user's host
+between deployments, so reruns reuse the material which is still valid instead of
+regenerating the whole certificate authority and every node certificate.
+
+Classes:
+--------
+- `Artifact`:
+  A private key with its certificate, held as PEM strings which are serialized exactly once.
+  The corresponding cryptographic objects are loaded lazily on first access.
+
+- `ArtifactStore`:
+  A directory of artifacts keyed by artifact name, common name and expiry. Valid artifacts are
+  loaded from the directory, missing, expiring or foreign-signed ones are issued through
+  `crypto.OpenSSL` in one batch and written back.
+
+Key Functionalities:
+--------------------
+- Reuse: A stored certificate is reused while it is valid for longer than the renewal period,
+  carries the requested common name and is signed by the current certificate authority.
+
+- Renewal: Renewing the certificate authority invalidates every certificate it signed,
+  so all of them are reissued in the same run.
+
+- Serialize Once: Every key and certificate is converted to PEM a single time, callers
+  upload the PEM strings directly, including the CA bundle built once per run.
+
+- Protection: The store directory is created with `0700` permissions and every file is written
+  with `0600` through an atomic rename, superseded files are removed.
+
+Example Usage:
+--------------
+```python
+store = ArtifactStore(crypto.OpenSSL(), '~/.superset-cluster/pki')
+certificate_authority = store.certificate_authority('Superset-Cluster')
+artifacts = store.obtain({'mysql-server-node1': 'Superset-Cluster-node1'}, certificate_authority)
+print(artifacts['mysql-server-node1'].issued, artifacts['mysql-server-node1'].certificate_pem)
+```
+"""
+
+import datetime
+import functools
+import glob
+import logging
+import os
+
+import cryptography
+import cryptography.exceptions
+import cryptography.hazmat.primitives.asymmetric.padding
+import cryptography.hazmat.primitives.asymmetric.rsa
+import cryptography.x509
+import cryptography.x509.oid
+
+import crypto
+import tracing
+
+logger = logging.getLogger(__name__)
+
+RENEWAL_PERIOD = datetime.timedelta(days=30)
+
+
+class Artifact:
+    def __init__(self, key_pem: str, certificate_pem: str, issued: bool) -> None:
+        self.key_pem = key_pem
+        self.certificate_pem = certificate_pem
+        self.issued = issued
+
+    @functools.cached_property
+    def key(self) -> cryptography.hazmat.primitives.asymmetric.rsa.RSAPrivateKey:
+        return crypto.OpenSSL.load_private_key(self.key_pem)
+
+    @functools.cached_property
+    def certificate(self) -> cryptography.x509.base.Certificate:
+        return cryptography.x509.load_pem_x509_certificate(self.certificate_pem.encode('utf-8'))
+
+    @property
+    def common_name(self) -> str:
+        return str(
+            self.certificate.subject.get_attributes_for_oid(cryptography.x509.oid.NameOID.COMMON_NAME)[0].value
+        )
+
+    @property
+    def expires(self) -> datetime.datetime:
+        if hasattr(self.certificate, 'not_valid_after_utc'):
+            return self.certificate.not_valid_after_utc
+        return self.certificate.not_valid_after.replace(tzinfo=datetime.timezone.utc)
+
+    def signed_by(self, certificate_authority: 'Artifact') -> bool:
+        try:
+            certificate_authority.key.public_key().verify(
+                self.certificate.signature,
+                self.certificate.tbs_certificate_bytes,
+                cryptography.hazmat.primitives.asymmetric.padding.PKCS1v15(),
+                self.certificate.signature_hash_algorithm  # type: ignore[arg-type]
+            )
+        except cryptography.exceptions.InvalidSignature:
+            return False
+        return True
+
+
+class ArtifactStore:
+    def __init__(self, cert_manager: crypto.OpenSSL, directory: str) -> None:
+        self.cert_manager = cert_manager
+        self.directory = os.path.expanduser(directory)
+        os.makedirs(self.directory, mode=0o700, exist_ok=True)
+
+    def paths(self, name: str) -> list[str]:
+        return sorted(glob.glob(os.path.join(glob.escape(self.directory), f'{glob.escape(name)}@*.certificate.pem')))
+
+    def load(self, name: str, common_name: str, certificate_authority: Artifact | None) -> Artifact | None:
+        for certificate_path in reversed(self.paths(name)):
+            try:
+                with open(file=certificate_path.replace('.certificate.pem', '.key.pem'), mode='r',
+                          encoding='utf-8') as key:
+                    with open(file=certificate_path, mode='r', encoding='utf-8') as certificate:
+                        artifact = Artifact(key.read(), certificate.read(), issued=False)
+                if artifact.common_name != common_name:
+                    continue
+                if artifact.expires - datetime.datetime.now(datetime.timezone.utc) < RENEWAL_PERIOD:
+                    continue
+                if certificate_authority is not None and not artifact.signed_by(certificate_authority):
+                    continue
+            except (OSError, ValueError) as error:
+                logger.warning("Ignoring unreadable PKI artifact %s: %s", certificate_path, error)
+                continue
+            return artifact
+        return None
+
+    def write(self, path: str, content: str) -> None:
+        descriptor = os.open(f'{path}.tmp', os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(descriptor, mode='w', encoding='utf-8') as file:
+            file.write(content)
+        os.replace(f'{path}.tmp', path)
+
+    def save(self, name: str, artifact: Artifact) -> None:
+        superseded = self.paths(name)
+        prefix = os.path.join(self.directory, f'{name}@{artifact.common_name}@{artifact.expires:%Y%m%d%H%M%S}')
+        self.write(f'{prefix}.key.pem', artifact.key_pem)
+        self.write(f'{prefix}.certificate.pem', artifact.certificate_pem)
+        for certificate_path in superseded:
+            if certificate_path != f'{prefix}.certificate.pem':
+                os.remove(certificate_path)
+                os.remove(certificate_path.replace('.certificate.pem', '.key.pem'))
+
+    def certificate_authority(self, common_name: str) -> Artifact:
+        artifact = self.load('ca', common_name, certificate_authority=None)
+        if artifact is None:
+            with tracing.span("generate_ca_key", "pki"):
+                key, = self.cert_manager.generate_private_keys(1)
+            artifact = Artifact(
+                self.cert_manager.deserialization(key),
+                self.cert_manager.deserialization(self.cert_manager.generate_certificate(common_name, key)),
+                issued=True
+            )
+            self.save('ca', artifact)
+        logger.info("Certificate authority %s valid until %s (%s)", common_name, artifact.expires,
+                    "issued" if artifact.issued else "reused")
+        return artifact
+
+    def obtain(self, requests: dict[str, str], certificate_authority: Artifact) -> dict[str, Artifact]:
+        artifacts = {
+            name: artifact
+            for name, common_name in requests.items()
+            if (artifact := self.load(name, common_name, certificate_authority)) is not None
+        }
+        missing = [name for name in requests if name not in artifacts]
+        if missing:
+            with tracing.span("issue_certificates", "pki", count=len(missing)):
+                issued = self.cert_manager.issue_certificates(
+                    [requests[name] for name in missing],
+                    certificate_authority.key
+                )
+            for name, (key_pem, _, certificate_pem) in zip(missing, issued):
+                artifacts[name] = Artifact(key_pem, certificate_pem, issued=True)
+                self.save(name, artifacts[name])
+        logger.info("PKI artifacts: %d issued, %d reused", len(missing), len(requests) - len(missing))
+        return artifacts
@@ -0,0 +1,96 @@
+"""
+Remote Agent Protocol Module
+
+This module defines the framing used between `RemoteConnection` on the
+user's host and the long-lived agent process running on every node.
+It only depends on the standard library, so it is shared by both sides.
+
+Classes:
+--------
+- `ChecksumError`:
+  Raised when a frame or a binary result does not match its recorded checksum or length.
+
+Functions:
+----------
+- `write_frame`:
+  Writes a JSON message followed by an optional binary payload, prefixed with a header
+  holding the request identifier, the length of both parts and their CRC32 checksum.
+
+- `read_frame`:
+  Reads one complete frame from the stream, verifies its checksum and returns the request
+  identifier, the decoded message and the binary payload. Raises `EOFError` when the stream
+  is closed in the middle of a frame and `ChecksumError` when the frame is corrupted.
+
+- `encode_result` / `decode_result`:
+  Split values returned by the container routines into a typed descriptor and a binary payload:
+  raw bytes travel unchanged in the binary part of the frame, other values as JSON.
+
+Key Functionalities:
+--------------------
+- Explicit framing: Every frame is self-delimiting, so requests and replies
+  can be multiplexed over one SSH channel and matched by their identifiers.
+
+- Integrity: Truncated or corrupted frames are detected instead of being parsed,
+  a stream with a broken frame cannot be resynchronized and is closed by both sides.
+
+Example Usage:
+--------------
+```python
+write_frame(channel_stdin, 1, {"method": "run_mysql_server", "container": "mysql"})
+request_id, reply, data = read_frame(channel_stdout)
+print(reply["output"], decode_result(reply["result"], data))
+```
+"""
+
+import json
+import struct
+import typing
+import zlib
+
+HEADER = struct.Struct(">QIII")
+
+
+class ChecksumError(ValueError):
+    pass
+
+
+def write_frame(stream: typing.BinaryIO, request_id: int, message: dict, data: bytes = b"") -> None:
+    payload = json.dumps(message, separators=(",", ":"), default=str).encode("utf-8")
+    checksum = zlib.crc32(data, zlib.crc32(payload))
+    stream.write(HEADER.pack(request_id, len(payload), len(data), checksum) + payload + data)
+    stream.flush()
+
+
+def read_exactly(stream: typing.BinaryIO, size: int) -> bytes:
+    chunks = []
+    remaining = size
+    while remaining:
+        chunk = stream.read(remaining)
+        if not chunk:
+            raise EOFError(f"Stream closed after {size - remaining} of {size} expected bytes")
+        chunks.append(chunk)
+        remaining -= len(chunk)
+    return b"".join(chunks)
+
+
+def read_frame(stream: typing.BinaryIO) -> tuple[int, dict, bytes]:
+    request_id, payload_length, data_length, checksum = HEADER.unpack(read_exactly(stream, HEADER.size))
+    payload = read_exactly(stream, payload_length)
+    data = read_exactly(stream, data_length)
+    if zlib.crc32(data, zlib.crc32(payload)) != checksum:
+        raise ChecksumError(f"Frame of request {request_id} does not match its checksum")
+    return request_id, json.loads(payload), data
+
+
+def encode_result(result: typing.Any) -> tuple[dict, bytes]:
+    if isinstance(result, bytes):
+        return {"type": "bytes", "length": len(result)}, result
+    return {"type": "json", "value": result}, b""
+
+
+def decode_result(result: dict, data: bytes) -> typing.Any:
+    if result["type"] == "bytes":
+        if len(data) != result["length"]:
+            raise ChecksumError(f"Expected {result['length']} bytes of result, received {len(data)}")
+        return data
+    return result["value"]
@@ -5,6 +5,18 @@ This module facilitates operations to the superset-cluster nodes.
 
 Classes:
 --------
+- `TransportPool`:
+  This class keeps one authenticated SSH transport per host with keepalives enabled, shared between threads.
+  Exec channels are opened on the shared transport and SFTP channels are handed out from a per-host
+  set of idle sessions, so concurrent commands and uploads do not repeat the handshake and key exchange.
+
+- `RemoteAgent`:
+  This class starts the agent process on the remote node over the SSH transport once and
+  multiplexes framed requests and structured replies over its standard streams.
+  A truncated or corrupted reply stream fails all pending requests and the agent is
+  started again on the next request, instead of silently retrying the call.
+  A reply to an unknown or already answered request is logged as a protocol error and dropped.
+
 - `RemoteConnection`:
   This class manages secure remote connections to the specified remote node using SSH and SFTP.
   It allows for executing commands on remote servers, uploading files and directories,
@@ -12,13 +24,25 @@ Classes:
 
 Key Functionalities:
 --------------------
-- SSH and SFTP client connection: Establishes SSH and SFTP connection though system settings or user's SSH config file.
+- SSH and SFTP client connection: Establishes SSH and SFTP connection though system settings or user's SSH config file,
+  once per host, and reconnects transparently when the pooled transport is no longer active.
+
+- Runs remote python commands: Logs and executes container routines or Python commands on the remote node
+  through the long-lived agent, which keeps container.py imported between the calls.
 
-- Runs remote python commands: Logs and executes a Python command on the remote node via
-  compiled container.py python file placement with functions to run on it.
+- Image distribution: An image staged on one node is streamed to the other nodes through the controller,
+  from `docker save` on the source to `docker load` on the target, leaving out the layers the target
+  already has. The loaded image identifier is verified and a failed transfer is repeated with all layers.
 
 - Remote filesystem management: Sets permissions, creates, and uploads files or directories to the remote paths
-  using dedicated SFTP client routines.
+  using dedicated SFTP client routines. Service directories are synchronized incrementally: the node side of
+  `sync.py` re-hashes the files listed in the manifest kept on the node, and only files whose SHA-256 digest
+  differs from them are sent, as one compressed tar stream over a single channel, and unpacked atomically.
+  Files changed or deleted on the node outside the synchronization are therefore sent again. Every upload
+  borrows its own SFTP channel from the pool, so concurrently running bootstrap phases can upload to the same
+  node in parallel.
+  Keys and certificates generated in memory are synchronized together with the directory,
+  so they are transferred only when they were reissued.
 
 Example Usage:
 --------------
@@ -30,60 +54,176 @@ with the remote server.
 remote_node = RemoteConnection("mysql1")
 remote_node.create_directory("/opt/example")
 remote_node.upload_directory(".", "/opt/example/content")
+remote_node.sync_directory(".", "/opt/example/content", {"certificate.pem": certificate_pem})
 remote_node.upload_file("/opt/example/content/run.py")
 output = remote_node.run_python_container_command("print('Hello World')")
 print(output)
+output = remote_node.run_container_method("mysql", "run_command_on_the_container", "echo 'Hello World'")
+print(output["result"])
 remote_node.change_permissions_to_root("/opt/example/content/run.py")
 """
 
+import concurrent.futures
+import contextlib
 import functools
 import io
+import itertools
+import json
 import logging
 import os
 import pathlib
-import random
 import socket
+import threading
 import typing
 
-import cryptography
 import paramiko
 
+import pki
+import protocol
+import sync
+import tracing
+
 logging.basicConfig(level=logging.INFO, format='%(asctime)s [%(levelname)s] %(message)s')
 logging.getLogger("paramiko").setLevel(logging.WARNING)
 logger = logging.getLogger(__name__)
 
+AGENT_MODULES = (
+    "agent.py", "container.py", "dockerstate.py", "images.py", "logs.py",
+    "protocol.py", "readiness.py", "sizing.py", "sync.py", "tracing.py"
+)
+NODE_PYTHON = "PYTHONPATH=/home/superset/.local/lib/python3.10/site-packages python3"
+
+
+class TransportPool:
+    def __init__(self, keepalive_interval: int = 30) -> None:
+        self.keepalive_interval = keepalive_interval
+        self.clients: dict[str, paramiko.SSHClient] = {}
+        self.idle_sftp_clients: dict[str, list[paramiko.SFTPClient]] = {}
+        self.host_locks: dict[str, threading.Lock] = {}
+        self.lock = threading.Lock()
+
+    def connect(self, node: str) -> paramiko.SSHClient:
+        ssh_config = paramiko.SSHConfig()
+        if os.path.exists(f"{pathlib.Path.home()}/.ssh/config"):
+            ssh_config = paramiko.SSHConfig.from_path(f"{pathlib.Path.home()}/.ssh/config")
+        host = ssh_config.lookup(node)
+        ssh_client = paramiko.SSHClient()
+        ssh_client.set_missing_host_key_policy(paramiko.AutoAddPolicy())
+        try:
+            with tracing.span("ssh_connect", "transport", node=node):
+                ssh_client.connect(
+                    hostname=host["hostname"],
+                    port=int(host.get("port", 22)),
+                    username="superset",
+                    key_filename=host.get("identityfile")
+                )
+        except (paramiko.ssh_exception.SSHException, socket.error) as error:
+            logger.error("Unable to connect to %s from the localhost", node)
+            raise ConnectionError(f"Unable to connect to {node}") from error
+        ssh_client.get_transport().set_keepalive(self.keepalive_interval)  # type: ignore[union-attr]
+        return ssh_client
+
+    def client(self, node: str) -> paramiko.SSHClient:
+        with self.lock:
+            host_lock = self.host_locks.setdefault(node, threading.Lock())
+        with host_lock:
+            ssh_client = self.clients.get(node)
+            transport = ssh_client.get_transport() if ssh_client else None
+            if ssh_client is None or transport is None or not transport.is_active():
+                ssh_client = self.connect(node)
+                with self.lock:
+                    self.clients[node] = ssh_client
+                    self.idle_sftp_clients[node] = []
+            return ssh_client
+
+    @contextlib.contextmanager
+    def sftp(self, node: str) -> typing.Iterator[paramiko.SFTPClient]:
+        ssh_client = self.client(node)
+        with self.lock:
+            idle = self.idle_sftp_clients[node]
+            sftp_client = idle.pop() if idle else None
+        if sftp_client is None:
+            sftp_client = ssh_client.open_sftp()
+        try:
+            yield sftp_client
+        except BaseException:
+            sftp_client.close()
+            raise
+        with self.lock:
+            if sftp_client.get_channel().get_transport() is ssh_client.get_transport():  # type: ignore[union-attr]
+                self.idle_sftp_clients[node].append(sftp_client)
+            else:
+                sftp_client.close()
+
+    def close(self, node: str) -> None:
+        with self.lock:
+            ssh_client = self.clients.pop(node, None)
+            for sftp_client in self.idle_sftp_clients.pop(node, []):
+                sftp_client.close()
+        if ssh_client is not None:
+            ssh_client.close()
+
+
+class RemoteAgent:
+    # pylint: disable=too-many-instance-attributes
+    def __init__(self, node: str, ssh_client: paramiko.SSHClient) -> None:
+        self.node = node
+        self.stdin, self.stdout, self.stderr = ssh_client.exec_command(
+            f"{NODE_PYTHON} /opt/superset-cluster/agent/agent.py"
+        )
+        self.lock = threading.Lock()
+        self.request_ids = itertools.count(1)
+        self.pending: dict[int, concurrent.futures.Future] = {}
+        self.failure: ConnectionError | None = None
+        threading.Thread(target=self.receive_replies, daemon=True).start()
+        threading.Thread(target=self.receive_errors, daemon=True).start()
+
+    def request(self, message: dict) -> tuple[dict, bytes]:
+        future: concurrent.futures.Future = concurrent.futures.Future()
+        with self.lock:
+            if self.failure is not None:
+                raise self.failure
+            request_id = next(self.request_ids)
+            self.pending[request_id] = future
+            protocol.write_frame(self.stdin, request_id, message)
+        return future.result()
+
+    def receive_replies(self) -> None:
+        try:
+            while True:
+                request_id, reply, data = protocol.read_frame(self.stdout)
+                with self.lock:
+                    future = self.pending.pop(request_id, None)
+                if future is None:
+                    logger.error("[Node: %s] Agent protocol error: reply to unknown request %s", self.node, request_id)
+                    continue
+                future.set_result((reply, data))
+        except (EOFError, OSError, protocol.ChecksumError) as error:
+            with self.lock:
+                self.failure = ConnectionError(f"Agent on {self.node} terminated: {error}")
+                for future in self.pending.values():
+                    future.set_exception(self.failure)
+                self.pending.clear()
+
+    def receive_errors(self) -> None:
+        for line in self.stderr:
+            logger.warning("[Node: %s] Agent: %s", self.node, line.rstrip())
+
+    def close(self) -> None:
+        self.stdin.channel.shutdown_write()
+
 
 class RemoteConnection:
     # pylint: disable=too-many-instance-attributes
+    pool = TransportPool()
+
     def __init__(self, node: str) -> None:
         self.node = node
-        self.ssh_client = paramiko.SSHClient()
-        self.ssh_client.set_missing_host_key_policy(paramiko.AutoAddPolicy())
-        try:
-            self.ssh_client.connect(hostname=node, username='superset')
-        except (paramiko.ssh_exception.SSHException, socket.gaierror):
-            self.ssh_config = paramiko.SSHConfig()
-            with open(
-                file=f"{pathlib.Path.home()}/.ssh/config",
-                mode="r",
-                encoding="utf-8"
-            ) as ssh_config_file:
-                self.ssh_config.parse(ssh_config_file)
-            try:
-                self.ssh_client.connect(
-                    hostname=self.node_hostname(),
-                    username='superset',
-                    key_filename=self.identity_path()
-                )
-            except KeyError:
-                logger.error("Unable to connect to %s from the localhost", self.node)
-        self.sftp_client = self.ssh_client.open_sftp()
-        self.key: cryptography.hazmat.primitives.asymmetric.rsa.RSAPrivateKey | None = None
-        self.csr: cryptography.x509.base.CertificateSigningRequest | None = None
-        self.certificate: cryptography.x509.base.Certificate | None = None
-        self.superset_key: cryptography.hazmat.primitives.asymmetric.rsa.RSAPrivateKey | None = None
-        self.superset_csr: cryptography.x509.base.CertificateSigningRequest | None = None
-        self.superset_certificate: cryptography.x509.base.Certificate | None = None
+        self.pool.client(node)
+        self.agent: RemoteAgent | None = None
+        self.agent_lock = threading.Lock()
+        self.artifact: pki.Artifact | None = None
+        self.superset_artifact: pki.Artifact | None = None
 
     @staticmethod
     def log_remote_command_execution(func: typing.Callable):
@@ -109,47 +249,167 @@ class RemoteConnection:
             return result
         return wrapper
 
-    def node_hostname(self) -> str:
-        return self.ssh_config.lookup(self.node)['hostname']
+    @property
+    def ssh_client(self) -> paramiko.SSHClient:
+        return self.pool.client(self.node)
 
-    def identity_path(self) -> str:
-        return self.ssh_config.lookup(self.node)['identityfile'][0]
+    def start_agent(self) -> RemoteAgent:
+        with self.agent_lock:
+            if self.agent is None or self.agent.failure is not None:
+                _, stdout, _ = self.ssh_client.exec_command("mkdir -p /opt/superset-cluster/agent")
+                stdout.channel.recv_exit_status()
+                for module in AGENT_MODULES:
+                    with open(
+                        file=f"{os.path.dirname(os.path.abspath(__file__))}/{module}",
+                        mode="r",
+                        encoding="utf-8"
+                    ) as memfile:
+                        self.upload_file(
+                            content=memfile.read(),
+                            remote_file_path=f"/opt/superset-cluster/agent/{module}"
+                        )
+                self.agent = RemoteAgent(self.node, self.ssh_client)
+            return self.agent
 
     @log_remote_command_execution
+    def run_agent_request(self, command: str, request: dict) -> dict:  # pylint: disable=unused-argument
+        with tracing.span(request["method"], "remote", node=self.node, container=request.get("container")):
+            reply, data = self.start_agent().request(dict(request, trace=tracing.tracer.enabled))
+        tracing.tracer.merge(reply.get("spans", []), process=self.node)
+        return {
+            "output": reply["output"],
+            "error": reply["error"],
+            "result": protocol.decode_result(reply["result"], data)
+        }
+
     def run_python_container_command(self, command: str) -> dict:
-        nonce = f'{self.node}-{random.randrange(1, 4294967296)}'
-        with open(
-            file=f"{os.path.dirname(os.path.abspath(__file__))}/container.py",
-            mode="r",
-            encoding="utf-8"
-        ) as memfile:
-            source = memfile.read() + command
-        self.upload_file(content=source, remote_file_path=f'/opt/{nonce}.py')
-        _, stdout, stderr = self.ssh_client.exec_command(
-            f"PYTHONPATH=/home/superset/.local/lib/python3.10/site-packages python3 /opt/{nonce}.py"
+        return self.run_agent_request(command, {"method": "exec", "source": command})
+
+    def run_container_method(self, container: str | None, method: str, *args, **kwargs) -> dict:
+        return self.run_agent_request(
+            f"ContainerConnection(container={container!r}).{method}(...)",
+            {"method": method, "container": container, "args": args, "kwargs": kwargs}
         )
-        result = {
-            "output": stdout.read().decode(),
-            "error": stderr.read().decode()
-        }
-        self.ssh_client.exec_command(f"rm -f /opt/{nonce}.py")
-        return result
 
     def upload_directory(self, local_directory_path: str, remote_directory_path: str) -> None:
         stack = [(local_directory_path, remote_directory_path)]
-        while stack:
-            local_path, remote_path = stack.pop()
-            try:
-                self.sftp_client.mkdir(remote_path)
-            except IOError:
-                pass
-            for item in os.listdir(local_path):
-                local_item_path = os.path.join(local_path, item)
-                remote_item_path = os.path.join(remote_path, item)
-                if os.path.isdir(local_item_path):
-                    stack.append((local_item_path, remote_item_path))
-                else:
-                    self.sftp_client.put(local_item_path, remote_item_path)
+        with self.pool.sftp(self.node) as sftp_client:
+            while stack:
+                local_path, remote_path = stack.pop()
+                try:
+                    sftp_client.mkdir(remote_path)
+                except IOError:
+                    pass
+                for item in os.listdir(local_path):
+                    local_item_path = os.path.join(local_path, item)
+                    remote_item_path = os.path.join(remote_path, item)
+                    if os.path.isdir(local_item_path):
+                        stack.append((local_item_path, remote_item_path))
+                    else:
+                        sftp_client.put(local_item_path, remote_item_path)
+
+    def sync_directory(
+            self,
+            local_directory_path: str,
+            remote_directory_path: str,
+            generated_files: dict[str, str] | None = None) -> None:
+        self.start_agent()
+        with tracing.span("sync_directory", "sftp", node=self.node, directory=remote_directory_path):
+            self.synchronize(local_directory_path, remote_directory_path, generated_files)
+
+    def synchronize(
+            self,
+            local_directory_path: str,
+            remote_directory_path: str,
+            generated_files: dict[str, str] | None) -> None:
+        manifest_path = f"{remote_directory_path}.manifest.json"
+        generated = {path: content.encode("utf-8") for path, content in (generated_files or {}).items()}
+        files = sync.manifest(local_directory_path, generated)
+        _, stdout, _ = self.ssh_client.exec_command(
+            f"python3 /opt/superset-cluster/agent/sync.py --verify {remote_directory_path} {manifest_path}"
+        )
+        verified = stdout.read()
+        try:
+            previous_files = json.loads(verified) if stdout.channel.recv_exit_status() == 0 else {}
+        except ValueError:
+            previous_files = {}
+        changed = sorted(path for path, digest in files.items() if previous_files.get(path) != digest)
+        removed = sorted(set(previous_files) - set(files))
+        if not changed and not removed:
+            logger.info("[Node: %s] %s is up to date", self.node, remote_directory_path)
+            return
+        stdin, stdout, stderr = self.ssh_client.exec_command(
+            f"python3 /opt/superset-cluster/agent/sync.py {remote_directory_path} {manifest_path}"
+        )
+        sync.pack(stdin, local_directory_path, changed, files, removed, generated=generated)  # type: ignore[arg-type]
+        stdin.flush()
+        stdin.channel.shutdown_write()
+        if stdout.channel.recv_exit_status() != 0:
+            raise IOError(
+                f"Synchronization of {remote_directory_path} on {self.node} failed:\n{stderr.read().decode()}"
+            )
+        logger.info(
+            "[Node: %s] Synchronized %s: %d changed, %d removed, %d unchanged files",
+            self.node,
+            remote_directory_path,
+            len(changed),
+            len(removed),
+            len(files) - len(changed)
+        )
+
+    def distribute_image(self, image: str, targets: list["RemoteConnection"]) -> None:
+        source_layers = self.run_container_method(None, "image_layers", image)["result"]
+        if source_layers is None:
+            raise ValueError(f"Image {image} is not staged on {self.node}")
+        with concurrent.futures.ThreadPoolExecutor(
+            max_workers=max(len(targets), 1),
+            thread_name_prefix="image"
+        ) as executor:
+            futures = {executor.submit(self.send_image, image, source_layers, target): target for target in targets}
+            for future in concurrent.futures.as_completed(futures):
+                try:
+                    future.result()
+                except (IOError, ConnectionError) as error:
+                    logger.warning(
+                        "[Node: %s] %s, the node pulls or builds the image on its own", futures[future].node, error
+                    )
+
+    def send_image(self, image: str, source_layers: dict, target: "RemoteConnection") -> None:
+        target_layers = target.run_container_method(None, "image_layers", image)["result"]
+        if target_layers is not None and target_layers["id"] == source_layers["id"]:
+            logger.info("[Node: %s] Image %s is up to date", target.node, image)
+            return
+        present = target.run_container_method(None, "count_present_layers", source_layers["chain_ids"])["result"]
+        for skip_layers in dict.fromkeys((present, 0)):
+            with tracing.span("send_image", "image", source=self.node, target=target.node, skipped=skip_layers):
+                self.pipe_image(image, skip_layers, target)
+            target_layers = target.run_container_method(None, "image_layers", image)["result"]
+            if target_layers is not None and target_layers["id"] == source_layers["id"]:
+                logger.info(
+                    "[Node: %s] Received image %s from %s, %d of %d layers were already present",
+                    target.node,
+                    image,
+                    self.node,
+                    skip_layers,
+                    len(source_layers["chain_ids"])
+                )
+                return
+            logger.warning("[Node: %s] Image %s does not match %s after loading", target.node, image, self.node)
+        raise IOError(f"Image {image} could not be distributed from {self.node} to {target.node}")
+
+    def pipe_image(self, image: str, skip_layers: int, target: "RemoteConnection") -> None:
+        source_stdin, source_stdout, source_stderr = self.ssh_client.exec_command(
+            f"{NODE_PYTHON} /opt/superset-cluster/agent/images.py {image} {skip_layers}"
+        )
+        source_stdin.channel.shutdown_write()
+        target_stdin, target_stdout, target_stderr = target.ssh_client.exec_command("docker load")
+        for chunk in iter(lambda: source_stdout.read(1048576), b""):
+            target_stdin.write(chunk)
+        target_stdin.channel.shutdown_write()
+        if source_stdout.channel.recv_exit_status() != 0:
+            raise IOError(f"Export of {image} on {self.node} failed:\n{source_stderr.read().decode()}")
+        if target_stdout.channel.recv_exit_status() != 0:
+            raise IOError(f"Loading {image} on {target.node} failed:\n{target_stderr.read().decode()}")
 
     def create_directory(self, remote_directory_path: str) -> None:
         self.ssh_client.exec_command(f"mkdir -p {remote_directory_path}")
@@ -157,7 +417,14 @@ class RemoteConnection:
     def upload_file(self, content: str | bytes, remote_file_path: str) -> None:
         if isinstance(content, str):
             content = content.encode('utf-8')
-        self.sftp_client.putfo(io.BytesIO(content), remote_file_path)
+        with tracing.span("upload_file", "sftp", node=self.node, path=remote_file_path, size=len(content)):
+            with self.pool.sftp(self.node) as sftp_client:
+                sftp_client.putfo(io.BytesIO(content), remote_file_path)
 
     def change_permissions_to_root(self, filepath: str) -> None:
         self.ssh_client.exec_command(f"chmod 600 {filepath}")
+
+    def close(self) -> None:
+        if self.agent is not None:
+            self.agent.close()
+        self.pool.close(self.node)
@@ -0,0 +1,156 @@
+"""
+Bootstrap Scheduling Module
+
+This module runs the cluster bootstrap as a graph of dependent phases
+on a bounded pool of worker threads.
+
+Classes:
+--------
+- `Phase`:
+  A single unit of bootstrap work, holding the callable to run, the names of
+  the phases it depends on and its measured start and finish times.
+
+- `Scheduler`:
+  Collects phases, validates the dependency graph and starts every phase as soon
+  as all of its dependencies have finished, keeping at most `max_workers` phases
+  running at the same time. After the run it reports the measured critical path.
+
+Key Functionalities:
+--------------------
+- Dependency Resolution: Phases start only after the phases they depend on have
+  completed successfully, independent phases overlap in time.
+
+- Failure Propagation: The first failing phase stops scheduling of new phases,
+  already running phases are allowed to finish and the original exception is re-raised.
+
+- Critical Path Reporting: The chain of phases that determined the total wall-clock
+  time of the run is reconstructed from the measured timings.
+
+Example Usage:
+--------------
+```python
+scheduler = Scheduler(max_workers=4)
+scheduler.add("mysql-server:node1", start_mysql_server, node1)
+scheduler.add("mysql-server:node2", start_mysql_server, node2)
+scheduler.add("mysql-mgmt:node0", start_mysql_mgmt, node0, depends_on=["mysql-server:node1", "mysql-server:node2"])
+scheduler.run()
+print(scheduler.critical_path())
+```
+"""
+
+import concurrent.futures
+import logging
+import time
+import typing
+
+import tracing
+
+logger = logging.getLogger(__name__)
+
+
+class Phase:
+    # pylint: disable=too-many-arguments
+    def __init__(
+            self,
+            name: str,
+            function: typing.Callable,
+            args: tuple,
+            kwargs: dict,
+            depends_on: list[str]) -> None:
+        self.name = name
+        self.function = function
+        self.args = args
+        self.kwargs = kwargs
+        self.depends_on = depends_on
+        self.started: float = 0.0
+        self.finished: float = 0.0
+
+    @property
+    def duration(self) -> float:
+        return self.finished - self.started
+
+    def run(self) -> None:
+        self.started = time.monotonic()
+        try:
+            with tracing.span(self.name, "phase", depends_on=self.depends_on):
+                self.function(*self.args, **self.kwargs)
+        finally:
+            self.finished = time.monotonic()
+
+
+class Scheduler:
+    def __init__(self, max_workers: int) -> None:
+        self.max_workers = max_workers
+        self.phases: dict[str, Phase] = {}
+        self.started: float = 0.0
+        self.finished: float = 0.0
+
+    def add(self, name: str, function: typing.Callable, *args, depends_on: list[str] | None = None, **kwargs) -> None:
+        if name in self.phases:
+            raise ValueError(f"Phase {name} is already scheduled")
+        self.phases[name] = Phase(name, function, args, kwargs, depends_on if depends_on else [])
+
+    def validate(self) -> None:
+        for phase in self.phases.values():
+            for dependency in phase.depends_on:
+                if dependency not in self.phases:
+                    raise ValueError(f"Phase {phase.name} depends on the unknown phase {dependency}")
+        resolved: set[str] = set()
+        pending = dict(self.phases)
+        while pending:
+            ready = [name for name, phase in pending.items() if resolved.issuperset(phase.depends_on)]
+            if not ready:
+                raise ValueError(f"Dependency cycle detected between phases {sorted(pending)}")
+            for name in ready:
+                resolved.add(name)
+                del pending[name]
+
+    def run(self) -> None:
+        self.validate()
+        waiting = dict(self.phases)
+        running: dict[concurrent.futures.Future, Phase] = {}
+        completed: set[str] = set()
+        failure: BaseException | None = None
+        self.started = time.monotonic()
+        with concurrent.futures.ThreadPoolExecutor(
+            max_workers=self.max_workers,
+            thread_name_prefix="phase"
+        ) as executor:
+            while waiting or running:
+                if failure is None:
+                    for name in [name for name, phase in waiting.items() if completed.issuperset(phase.depends_on)]:
+                        phase = waiting.pop(name)
+                        logger.info("Starting phase %s", name)
+                        running[executor.submit(phase.run)] = phase
+                if not running:
+                    break
+                done, _ = concurrent.futures.wait(running, return_when=concurrent.futures.FIRST_COMPLETED)
+                for future in done:
+                    phase = running.pop(future)
+                    error = future.exception()
+                    if error is not None:
+                        logger.error("Phase %s failed after %.1fs: %s", phase.name, phase.duration, error)
+                        failure = failure if failure else error
+                    else:
+                        logger.info("Phase %s finished in %.1fs", phase.name, phase.duration)
+                        completed.add(phase.name)
+        self.finished = time.monotonic()
+        if failure is not None:
+            raise failure
+        self.report()
+
+    def critical_path(self) -> list[Phase]:
+        path: list[Phase] = []
+        candidates = list(self.phases.values())
+        while candidates:
+            phase = max(candidates, key=lambda candidate: candidate.finished)
+            path.append(phase)
+            candidates = [self.phases[name] for name in phase.depends_on]
+        return path[::-1]
+
+    def report(self) -> None:
+        logger.info(
+            "Cluster bootstrap finished in %.1fs, critical path: %s",
+            self.finished - self.started,
+            " -> ".join(f"{phase.name} ({phase.duration:.1f}s)" for phase in self.critical_path())
+        )
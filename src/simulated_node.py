@@ -0,0 +1,1083 @@
+"""
+Simulated Node Module
+
+This module emulates the operating system and the Docker engine of one cluster node on the
+user's host, so that the node side of the deployment (`agent.py`, `container.py`, `sync.py`
+and `images.py`) runs unmodified against it. Every command that the controller executes on a
+node runs in a process of this module, see `simulation.py` for the SSH transport starting them.
+
+Classes:
+--------
+- `Latencies`:
+  Durations of the emulated operations in seconds, multiplied by a common time scale,
+  so that a full deployment can be replayed in a fraction of its real duration.
+
+- `StateFile`:
+  A JSON document shared by the processes of the emulated nodes, every transaction holds
+  an exclusive `fcntl` lock on it and writes the document back when it has changed.
+
+- `SimulatedDockerClient`:
+  A stand-in for `docker.DockerClient` with the part of the API used by the node modules:
+  images with layers, containers with health checks, the events stream and a Swarm whose
+  services place their tasks on the emulated nodes.
+
+- `SimulatedNode`:
+  The environment of one node process: its files under the node directory, its hostname
+  and address resolution, `docker compose` and the network probes of `readiness.py`.
+
+Key Functionalities:
+--------------------
+- Shared State: The images and containers of a node are kept in `docker.json` in its directory,
+  the Swarm in `swarm.json` next to the node directories, so the agent, `sync.py`, `images.py`
+  and `docker load` running at the same time on one node see the same engine.
+
+- Time-Based Transitions: Containers store when they start, turn healthy and exit, every access
+  to the state applies the transitions that are due and appends them to the events of the node.
+
+- Image Layers: Images are deterministic `docker save` archives with layers shared between them,
+  `docker load` checks the digests of the loaded layers and requires the skipped ones locally.
+
+- Validation: Bind mounts, build contexts, compose files, secrets, networks and join tokens are
+  checked like the engine does, so a missing file or a wrong order of the phases fails the deployment.
+
+Example Usage:
+--------------
+The controller side in `simulation.py` starts one process for every command run on a node:
+
+```bash
+python3 src/simulated_node.py mgmt-0 /tmp/cluster python3 /opt/superset-cluster/agent/agent.py
+```
+"""
+
+# pylint: disable=too-many-lines
+
+import contextlib
+import datetime
+import fcntl
+import functools
+import gzip
+import hashlib
+import importlib
+import io
+import json
+import os
+import re
+import runpy
+import shlex
+import socket
+import subprocess
+import sys
+import tarfile
+import time
+import types
+import typing
+import urllib.parse
+import uuid
+
+import docker
+
+LATENCIES_VARIABLE = "SUPERSET_CLUSTER_SIMULATION_LATENCIES"
+NODE_CPUS = 4
+NODE_MEMORY = 16 * 1024 ** 3
+LAYER_SIZE = 256 * 1024
+BASE_LAYERS = 3
+IMAGE_LAYERS = 5
+EVENTS_INTERVAL = 0.01
+PROFILES: dict[str, dict] = {
+    "mysql-server": {"ports": (3306,), "startup": "mysql_server_startup"},
+    "mysql-mgmt": {"ports": (6446, 6447), "startup": "mysql_mgmt_startup"},
+    "superset-service": {"ports": (443,), "startup": "superset_startup"},
+    "redis": {"ports": (6379,), "startup": "redis_startup"}
+}
+JOBS = {
+    "/app/initialize_metadata.sh": "superset_initialization",
+    "initcontainer": "mysql_mgmt_initialization"
+}
+
+
+class Latencies:
+    # pylint: disable=too-many-instance-attributes
+    def __init__(self, time_scale: float = 0.01, registry: bool = True, **overrides: float) -> None:
+        self.time_scale = time_scale
+        self.registry = registry
+        self.round_trip = 0.02
+        self.bandwidth = 50 * 1024 * 1024
+        self.image_pull = 40.0
+        self.image_build = 240.0
+        self.image_load = 20.0
+        self.container_run = 3.0
+        self.swarm_join = 2.0
+        self.mysql_server_startup = 25.0
+        self.mysql_mgmt_initialization = 10.0
+        self.mysql_mgmt_startup = 25.0
+        self.redis_startup = 1.0
+        self.superset_initialization = 60.0
+        self.superset_startup = 120.0
+        for name, value in overrides.items():
+            if not hasattr(self, name):
+                raise AttributeError(f"Unknown latency {name}")
+            setattr(self, name, value)
+
+    @classmethod
+    def from_environment(cls) -> "Latencies":
+        return cls(**json.loads(os.environ.get(LATENCIES_VARIABLE, "{}")))
+
+    def environment(self) -> dict[str, str]:
+        return {LATENCIES_VARIABLE: json.dumps(vars(self))}
+
+    def scaled(self, seconds: float) -> float:
+        return seconds * self.time_scale
+
+    def sleep(self, seconds: float) -> None:
+        time.sleep(self.scaled(seconds))
+
+    def transfer(self, size: int) -> None:
+        self.sleep(size / self.bandwidth)
+
+
+class StateFile:  # pylint: disable=too-few-public-methods
+    def __init__(self, path: str, default: typing.Callable[[], dict]) -> None:
+        self.path = path
+        self.default = default
+
+    @contextlib.contextmanager
+    def transaction(self) -> typing.Iterator[dict]:
+        with open(file=f"{self.path}.lock", mode="a", encoding="utf-8") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                with open(file=self.path, mode="r", encoding="utf-8") as state_file:
+                    text = state_file.read()
+            except FileNotFoundError:
+                text = ""
+            state = json.loads(text) if text else self.default()
+            yield state
+            updated = json.dumps(state)
+            if updated != text:
+                with open(file=f"{self.path}.tmp", mode="w", encoding="utf-8") as state_file:
+                    state_file.write(updated)
+                os.replace(f"{self.path}.tmp", self.path)
+
+
+def node_state() -> dict:
+    return {"images": {}, "containers": {}, "events": [], "swarm": {"NodeID": "", "LocalNodeState": "inactive"}}
+
+
+def identifier(*parts: str) -> str:
+    return hashlib.sha256(":".join(parts).encode("utf-8")).hexdigest()
+
+
+def digest(content: bytes) -> str:
+    return f"sha256:{hashlib.sha256(content).hexdigest()}"
+
+
+def chain_ids(diff_ids: list[str]) -> list[str]:
+    chain: list[str] = []
+    for diff_id in diff_ids:
+        chain.append(diff_id if not chain else digest(f"{chain[-1]} {diff_id}".encode("ascii")))
+    return chain
+
+
+def image_profile(tag: str) -> dict:
+    return next((profile for name, profile in PROFILES.items() if name in tag), {"ports": (), "startup": None})
+
+
+def image_archive(tag: str) -> tuple[str, bytes]:
+    layers = [
+        hashlib.shake_256(seed.encode("utf-8")).digest(LAYER_SIZE)
+        for seed in [f"base-{index}" for index in range(BASE_LAYERS)]
+        + [f"{tag}-{index}" for index in range(IMAGE_LAYERS)]
+    ]
+    layer_archives = []
+    for layer in layers:
+        layer_archive = io.BytesIO()
+        with tarfile.open(fileobj=layer_archive, mode="w") as archive:
+            member = tarfile.TarInfo(f"layer-{digest(layer)[7:19]}")
+            member.size = len(layer)
+            archive.addfile(member, io.BytesIO(layer))
+        layer_archives.append(layer_archive.getvalue())
+    diff_ids = [digest(layer_archive) for layer_archive in layer_archives]
+    config = json.dumps(
+        {"config": {"Labels": {"simulated": tag}}, "rootfs": {"type": "layers", "diff_ids": diff_ids}}
+    ).encode("utf-8")
+    image_id = digest(config)
+    members = [(f"{image_id[7:]}.json", config)]
+    members += [(f"{diff_id[7:]}/layer.tar", layer_archive) for diff_id, layer_archive in zip(diff_ids, layer_archives)]
+    members.append((
+        "manifest.json",
+        json.dumps([{
+            "Config": f"{image_id[7:]}.json",
+            "RepoTags": [tag],
+            "Layers": [f"{diff_id[7:]}/layer.tar" for diff_id in diff_ids]
+        }]).encode("utf-8")
+    ))
+    saved = io.BytesIO()
+    with tarfile.open(fileobj=saved, mode="w") as archive:
+        for name, content in members:
+            member = tarfile.TarInfo(name)
+            member.size = len(content)
+            archive.addfile(member, io.BytesIO(content))
+    return image_id, saved.getvalue()
+
+
+def image_record(tag: str) -> dict:
+    image_id, saved = image_archive(tag)
+    with tarfile.open(fileobj=io.BytesIO(saved), mode="r") as archive:
+        config = json.load(archive.extractfile(f"{image_id[7:]}.json"))  # type: ignore[arg-type]
+    return {"Id": image_id, "RepoTags": [tag], "RootFS": {"Type": "layers", "Layers": config["rootfs"]["diff_ids"]}}
+
+
+def compose_services(text: str) -> tuple[dict[str, dict], list[str]]:
+    services: dict[str, dict] = {}
+    secret_files = re.findall(r'^\s+file:\s*"([^"]+)"', text, re.MULTILINE)
+    section = service = key = ""
+    for line in text.splitlines():
+        if not line.strip() or line.lstrip().startswith("#"):
+            continue
+        indent = len(line) - len(line.lstrip())
+        if indent == 0:
+            section = line.rstrip(":")
+            continue
+        if section != "services":
+            continue
+        if indent == 2:
+            service = line.strip().rstrip(":")
+            services[service] = {"volumes": [], "healthcheck": False}
+        elif indent == 4:
+            key, _, value = line.strip().partition(":")
+            if key in ("image", "container_name"):
+                services[service][key] = value.strip().strip('"')
+            elif key == "healthcheck":
+                services[service]["healthcheck"] = True
+        elif indent == 6 and key == "volumes" and line.strip().startswith("-"):
+            source = line.strip().lstrip("-").strip().strip('"').split(":")[0]
+            if source.startswith("/"):
+                services[service]["volumes"].append(source)
+    return services, secret_files
+
+
+class SimulatedDockerClient:
+    # pylint: disable=too-many-public-methods,too-many-instance-attributes
+    def __init__(self, node: "SimulatedNode") -> None:
+        self.node = node
+        self.latencies = node.latencies
+        self.state = StateFile(os.path.join(node.directory, "docker.json"), node_state)
+        self.swarm_state = StateFile(os.path.join(node.root, "swarm.json"), dict)
+        self.api = types.SimpleNamespace(containers=self.list_container_records, tasks=self.list_tasks)
+        self.containers = types.SimpleNamespace(get=self.get_container, run=self.run_container)
+        self.images = types.SimpleNamespace(
+            get=self.get_image,
+            list=self.list_images,
+            pull=self.pull_image,
+            build=self.build_image,
+            load=self.load_images
+        )
+        self.networks = types.SimpleNamespace(list=self.list_networks, create=self.create_network)
+        self.nodes = types.SimpleNamespace(get=self.get_swarm_node, list=self.list_swarm_nodes)
+        self.secrets = types.SimpleNamespace(create=self.create_secret)
+        self.services = types.SimpleNamespace(create=self.create_service)
+        self.swarm = types.SimpleNamespace(
+            attrs={}, init=self.init_swarm, join=self.join_swarm, reload=self.reload_swarm
+        )
+
+    @contextlib.contextmanager
+    def transaction(self, node: str | None = None) -> typing.Iterator[dict]:
+        state_file = self.state if node in (None, self.node.name) else StateFile(
+            os.path.join(self.node.root, str(node), "docker.json"), node_state
+        )
+        with state_file.transaction() as state:  # pylint: disable=contextmanager-generator-missing-cleanup
+            self.advance(state, time.time())
+            yield state
+
+    @staticmethod
+    def record_event(state: dict, container: dict, action: str, moment: float) -> None:
+        state["events"].append({
+            "Type": "container",
+            "Action": action,
+            "Actor": {"ID": container["Id"], "Attributes": dict(container["Labels"], name=container["Name"])},
+            "time": int(moment),
+            "timeNano": int(moment * 1000000000)
+        })
+
+    def advance(self, state: dict, now: float) -> None:
+        for container in state["containers"].values():
+            if container["State"] == "created" and container["StartAt"] <= now:
+                container["State"] = "running"
+                self.record_event(state, container, "start", container["StartAt"])
+            if container["State"] == "running" and container["Health"] == "starting" and container["HealthyAt"] <= now:
+                container["Health"] = "healthy"
+                self.record_event(state, container, "health_status: healthy", container["HealthyAt"])
+            if container["State"] == "running" and container["ExitAt"] is not None and container["ExitAt"] <= now:
+                container["State"] = "exited"
+                self.record_event(state, container, "die", container["ExitAt"])
+
+    @staticmethod
+    def find_image(state: dict, reference: str) -> dict | None:
+        for image in state["images"].values():
+            if reference in image["RepoTags"] or image["Id"] == reference or image["Id"][7:].startswith(reference):
+                return image
+        return None
+
+    def image_model(self, image: dict) -> types.SimpleNamespace:
+        return types.SimpleNamespace(
+            id=image["Id"],
+            tags=image["RepoTags"],
+            attrs=image,
+            save=functools.partial(self.save_image, image["RepoTags"][0])
+        )
+
+    def get_image(self, reference: str) -> types.SimpleNamespace:
+        with self.transaction() as state:
+            image = self.find_image(state, reference)
+        if image is None:
+            raise docker.errors.ImageNotFound(f"No such image: {reference}")
+        return self.image_model(image)
+
+    def list_images(self, all: bool = False) -> list[types.SimpleNamespace]:
+        # pylint: disable=redefined-builtin,unused-argument
+        with self.transaction() as state:
+            return [self.image_model(image) for image in state["images"].values()]
+
+    def add_image(self, image: dict) -> types.SimpleNamespace:
+        with self.transaction() as state:
+            for other in state["images"].values():
+                other["RepoTags"] = [tag for tag in other["RepoTags"] if tag not in image["RepoTags"]]
+            state["images"][image["Id"]] = image
+        return self.image_model(image)
+
+    def pull_image(self, repository: str, tag: str | None = None, **kwargs) -> types.SimpleNamespace:
+        # pylint: disable=unused-argument
+        reference = f"{repository}:{tag}" if tag else repository
+        if not self.latencies.registry and reference.startswith("ghcr.io/"):
+            raise docker.errors.APIError(f"pull access denied for {reference}")
+        self.latencies.sleep(self.latencies.image_pull)
+        return self.add_image(image_record(reference if ":" in reference else f"{reference}:latest"))
+
+    def build_image(self, path: str, tag: str, **kwargs) -> tuple[types.SimpleNamespace, list]:
+        # pylint: disable=unused-argument
+        if not os.path.isfile(os.path.join(self.node.path(path), "Dockerfile")):
+            raise docker.errors.BuildError(f"Cannot locate Dockerfile in the build context {path}", [])
+        self.latencies.sleep(self.latencies.image_build)
+        return self.add_image(image_record(tag)), []
+
+    @staticmethod
+    def save_image(tag: str, named: bool = False) -> typing.Iterator[bytes]:  # pylint: disable=unused-argument
+        _, saved = image_archive(tag)
+        for offset in range(0, len(saved), 65536):
+            yield saved[offset:offset + 65536]
+
+    def load_images(self, data: bytes) -> list[types.SimpleNamespace]:
+        if data[:2] == b"\x1f\x8b":
+            data = gzip.decompress(data)
+        with tarfile.open(fileobj=io.BytesIO(data), mode="r") as archive:
+            manifest = json.load(archive.extractfile("manifest.json"))[0]  # type: ignore[arg-type]
+            config = json.load(archive.extractfile(manifest["Config"]))  # type: ignore[arg-type]
+            diff_ids = config["rootfs"]["diff_ids"]
+            with self.transaction() as state:
+                present = {
+                    chain_id for image in state["images"].values() for chain_id in chain_ids(image["RootFS"]["Layers"])
+                }
+            loaded = 0
+            for path, diff_id, chain_id in zip(manifest["Layers"], diff_ids, chain_ids(diff_ids)):
+                try:
+                    layer = archive.extractfile(path)
+                except KeyError:
+                    layer = None
+                if layer is None:
+                    if chain_id not in present:
+                        raise docker.errors.APIError(f"open {path}: no such file or directory")
+                    continue
+                if digest(layer.read()) != diff_id:
+                    raise docker.errors.APIError(f"layer {path} does not match its digest {diff_id}")
+                loaded += 1
+        self.latencies.sleep(self.latencies.image_load * loaded / len(diff_ids))
+        return [self.add_image({
+            "Id": f"sha256:{manifest['Config'].removesuffix('.json')}",
+            "RepoTags": manifest["RepoTags"],
+            "RootFS": {"Type": "layers", "Layers": diff_ids}
+        })]
+
+    def create_container_record(
+            self,
+            state: dict,
+            name: str,
+            image: dict,
+            *,
+            healthcheck: bool,
+            job: str | None,
+            labels: dict[str, str],
+            delay: float = 0.0) -> dict:
+        # pylint: disable=too-many-arguments
+        if any(container["Name"] == name for container in state["containers"].values()):
+            raise docker.errors.APIError(f'Conflict. The container name "/{name}" is already in use')
+        profile = image_profile(image["RepoTags"][0] if image["RepoTags"] else "")
+        now = time.time()
+        start_at = now + self.latencies.scaled(delay + self.latencies.container_run)
+        container = {
+            "Id": identifier(self.node.name, name, str(now)),
+            "Name": name,
+            "Image": image["Id"],
+            "Labels": labels,
+            "Ports": list(profile["ports"]),
+            "State": "created",
+            "Health": "starting" if healthcheck else None,
+            "StartAt": start_at,
+            "HealthyAt": start_at + self.latencies.scaled(
+                getattr(self.latencies, profile["startup"]) if profile["startup"] else 0
+            ),
+            "ExitAt": start_at + self.latencies.scaled(getattr(self.latencies, JOBS[job])) if job else None,
+            "ExitCode": 0,
+            "Created": now
+        }
+        state["containers"][container["Id"]] = container
+        self.record_event(state, container, "create", now)
+        return container
+
+    def remove_container_record(self, state: dict, container_id: str) -> None:
+        container = state["containers"].pop(container_id, None)
+        if container is not None:
+            self.record_event(state, container, "destroy", time.time())
+
+    def container_model(self, container: dict) -> types.SimpleNamespace:
+        return types.SimpleNamespace(
+            id=container["Id"],
+            name=container["Name"],
+            attrs=container,
+            status=container["State"],
+            exec_run=functools.partial(self.exec_in_container, container["Id"]),
+            get_archive=functools.partial(self.get_container_archive, container["Id"]),
+            put_archive=functools.partial(self.put_container_archive, container["Id"]),
+            logs=functools.partial(self.container_logs, container["Id"])
+        )
+
+    def container_record(self, reference: str) -> dict:
+        with self.transaction() as state:
+            container = next(
+                (
+                    container for container in state["containers"].values()
+                    if reference in (container["Name"], container["Id"])
+                    or (len(reference) >= 12 and container["Id"].startswith(reference))
+                ),
+                None
+            )
+        if container is None:
+            raise docker.errors.NotFound(f"No such container: {reference}")
+        return container
+
+    def container_path(self, container: dict, path: str) -> str:
+        return os.path.join(self.node.directory, "containers", container["Id"], path.lstrip("/"))
+
+    def get_container(self, reference: str) -> types.SimpleNamespace:
+        return self.container_model(self.container_record(reference))
+
+    def run_container(
+            self,
+            image: str,
+            detach: bool = False,
+            name: str | None = None,
+            healthcheck: dict | None = None,
+            volumes: dict | None = None,
+            **kwargs) -> types.SimpleNamespace:
+        # pylint: disable=too-many-arguments,unused-argument
+        for source in volumes or {}:
+            if not os.path.exists(self.node.path(source)):
+                raise docker.errors.APIError(
+                    f'invalid mount config for type "bind": bind source path does not exist: {source}'
+                )
+        with self.transaction() as state:
+            record = self.find_image(state, image)
+            if record is None:
+                raise docker.errors.ImageNotFound(f"No such image: {image}")
+            container = self.create_container_record(
+                state,
+                name or uuid.uuid4().hex[:12],
+                record,
+                healthcheck=healthcheck is not None,
+                job=None,
+                labels={}
+            )
+        return self.container_model(container)
+
+    def exec_in_container(
+            self,
+            container_id: str,
+            cmd: str | list[str],
+            environment: dict | None = None,
+            **kwargs) -> docker.models.containers.ExecResult:
+        # pylint: disable=unused-argument
+        container = self.container_record(container_id)
+        if container["State"] != "running":
+            raise docker.errors.APIError(f"Container {container['Name']} is not running")
+        command = shlex.split(cmd) if isinstance(cmd, str) else list(cmd)
+        healthy = container["Health"] in (None, "healthy")
+        if command[:2] == ["redis-cli", "ping"]:
+            if not healthy:
+                return docker.models.containers.ExecResult(1, b"Could not connect to Redis at 127.0.0.1:6379\n")
+            return docker.models.containers.ExecResult(0, b"PONG\n")
+        if command[:1] == ["/opt/store_credentials.exp"]:
+            if not healthy:
+                return docker.models.containers.ExecResult(1, b"Can't connect to local MySQL server\n")
+            login_file = self.container_path(container, (environment or {})["MYSQL_TEST_LOGIN_FILE"])
+            os.makedirs(os.path.dirname(login_file), exist_ok=True)
+            with open(file=login_file, mode="wb") as login:
+                login.write(bytes(24))
+                for _ in range(4 * len(command[1:])):
+                    login.write((32).to_bytes(4, "little") + os.urandom(32))
+        return docker.models.containers.ExecResult(0, b"")
+
+    def get_container_archive(self, container_id: str, path: str, **kwargs) -> tuple[typing.Iterator[bytes], dict]:
+        # pylint: disable=unused-argument
+        host_path = self.container_path(self.container_record(container_id), path)
+        if not os.path.isfile(host_path):
+            raise docker.errors.NotFound(f"Could not find the file {path} in container {container_id}")
+        archive_stream = io.BytesIO()
+        with tarfile.open(fileobj=archive_stream, mode="w") as archive:
+            archive.add(host_path, arcname=os.path.basename(path))
+        return iter([archive_stream.getvalue()]), {"name": os.path.basename(path), "size": os.path.getsize(host_path)}
+
+    def put_container_archive(self, container_id: str, path: str, data: bytes | typing.Iterable[bytes]) -> bool:
+        host_path = self.container_path(self.container_record(container_id), path)
+        os.makedirs(host_path, exist_ok=True)
+        with tarfile.open(fileobj=io.BytesIO(data if isinstance(data, bytes) else b"".join(data)), mode="r") as archive:
+            archive.extractall(host_path, filter="data")
+        return True
+
+    def container_logs(
+            self,
+            container_id: str,
+            stream: bool = False,
+            timestamps: bool = False,
+            since: float | None = None,
+            until: float | None = None,
+            tail: int | str = "all",
+            **kwargs) -> bytes | typing.Iterator[bytes]:
+        # pylint: disable=too-many-arguments,too-many-locals,unused-argument
+        container = self.container_record(container_id)
+        with self.transaction() as state:
+            events = [event for event in state["events"] if event["Actor"]["ID"] == container_id]
+        lines = []
+        for event in events:
+            moment = event["timeNano"] / 1000000000
+            if (since is not None and moment < since) or (until is not None and moment >= until):
+                continue
+            text = f"Container {container['Name']}: {event['Action']}\n"
+            if timestamps:
+                text = f"{datetime.datetime.fromtimestamp(moment, datetime.timezone.utc):%Y-%m-%dT%H:%M:%S.%fZ} {text}"
+            lines.append(text)
+        if tail != "all":
+            lines = lines[len(lines) - int(tail):] if int(tail) else []
+        output = "".join(lines).encode("utf-8")
+        return iter([output]) if stream else output
+
+    @staticmethod
+    def container_status(container: dict) -> str:
+        if container["State"] == "created":
+            return "Created"
+        if container["State"] == "exited":
+            return f"Exited ({container['ExitCode']})"
+        if container["Health"] == "starting":
+            return "Up (health: starting)"
+        return "Up (healthy)" if container["Health"] else "Up"
+
+    def list_container_records(self, all: bool = False, **kwargs) -> list[dict]:  # pylint: disable=redefined-builtin
+        # pylint: disable=unused-argument
+        with self.transaction() as state:
+            containers = list(state["containers"].values())
+        return [
+            {
+                "Id": container["Id"],
+                "Names": [f"/{container['Name']}"],
+                "Image": container["Image"],
+                "State": container["State"],
+                "Status": self.container_status(container),
+                "Labels": container["Labels"],
+                "Created": int(container["Created"])
+            }
+            for container in containers if all or container["State"] == "running"
+        ]
+
+    def events(self, decode: bool = False, since: float | None = None, **kwargs) -> typing.Iterator[dict]:
+        # pylint: disable=unused-argument
+        position = 0
+        while True:
+            with self.transaction() as state:
+                events = state["events"][position:]
+            position += len(events)
+            for event in events:
+                if since is None or event["time"] >= since:
+                    yield event
+            time.sleep(EVENTS_INTERVAL)
+
+    def local_swarm(self) -> dict:
+        with self.transaction() as state:
+            return state["swarm"]
+
+    def require_manager(self, swarm: dict) -> None:
+        node_id = self.local_swarm()["NodeID"]
+        if swarm.get("Nodes", {}).get(node_id, {}).get("Spec", {}).get("Role") != "manager":
+            raise docker.errors.APIError(
+                "This node is not a swarm manager. Use \"docker swarm init\" or \"docker swarm join\" "
+                "to connect this node to swarm and try again."
+            )
+
+    def info(self) -> dict:
+        with self.swarm_state.transaction() as swarm:
+            local = self.local_swarm()
+        nodes = swarm.get("Nodes", {})
+        return {
+            "Name": self.node.name,
+            "NCPU": NODE_CPUS,
+            "MemTotal": NODE_MEMORY,
+            "DockerRootDir": self.node.directory,
+            "Swarm": {
+                "NodeID": local["NodeID"],
+                "LocalNodeState": local["LocalNodeState"],
+                "ControlAvailable": nodes.get(local["NodeID"], {}).get("Spec", {}).get("Role") == "manager",
+                "Nodes": len(nodes),
+                "Managers": sum(node["Spec"]["Role"] == "manager" for node in nodes.values())
+            }
+        }
+
+    def join_node(self, swarm: dict, role: str, address: str | None) -> str:
+        node_id = identifier(self.node.name, swarm["ID"])[:25]
+        with self.transaction() as state:
+            if state["swarm"]["LocalNodeState"] == "active":
+                raise docker.errors.APIError("This node is already part of a swarm.")
+            state["swarm"] = {"NodeID": node_id, "LocalNodeState": "active"}
+        swarm["Nodes"][node_id] = {
+            "ID": node_id,
+            "Spec": {"Labels": {}, "Role": role, "Availability": "active"},
+            "Description": {
+                "Hostname": self.node.name,
+                "Resources": {"NanoCPUs": NODE_CPUS * 1000000000, "MemoryBytes": NODE_MEMORY}
+            },
+            "Status": {"State": "ready", "Addr": address or self.node.address(self.node.name)}
+        }
+        return node_id
+
+    def init_swarm(self, advertise_addr: str | None = None, **kwargs) -> str:  # pylint: disable=unused-argument
+        with self.swarm_state.transaction() as swarm:
+            if swarm:
+                raise docker.errors.APIError("The emulated nodes already form a swarm.")
+            swarm.update({"ID": identifier("swarm", str(time.time()))[:25], "Nodes": {}, "Services": {}, "Secrets": {}})
+            swarm["Networks"] = {}
+            swarm["JoinTokens"] = {
+                role: f"SWMTKN-1-{identifier(swarm['ID'])[:50]}-{identifier(swarm['ID'], role)[:25]}"
+                for role in ("Manager", "Worker")
+            }
+            return self.join_node(swarm, "manager", advertise_addr)
+
+    def join_swarm(
+            self,
+            remote_addrs: list[str],
+            join_token: str,
+            advertise_addr: str | None = None,
+            **kwargs) -> bool:
+        # pylint: disable=unused-argument
+        self.latencies.sleep(self.latencies.swarm_join)
+        with self.swarm_state.transaction() as swarm:
+            if not swarm:
+                raise docker.errors.APIError(f"could not connect to the swarm manager at {remote_addrs[0]}")
+            role = next((role.lower() for role, token in swarm["JoinTokens"].items() if token == join_token), None)
+            if role is None:
+                raise docker.errors.APIError("A valid join token is necessary to join this cluster")
+            self.join_node(swarm, role, advertise_addr)
+        return True
+
+    def reload_swarm(self) -> None:
+        with self.swarm_state.transaction() as swarm:
+            self.require_manager(swarm)
+            self.swarm.attrs = {"ID": swarm["ID"], "JoinTokens": dict(swarm["JoinTokens"])}
+
+    def swarm_node_model(self, node: dict) -> types.SimpleNamespace:
+        return types.SimpleNamespace(
+            id=node["ID"],
+            attrs=node,
+            update=functools.partial(self.update_swarm_node, node["ID"])
+        )
+
+    def get_swarm_node(self, node_id: str) -> types.SimpleNamespace:
+        with self.swarm_state.transaction() as swarm:
+            self.require_manager(swarm)
+            node = swarm["Nodes"].get(node_id)
+        if node is None:
+            raise docker.errors.NotFound(f"node {node_id} not found")
+        return self.swarm_node_model(node)
+
+    def update_swarm_node(self, node_id: str, node_spec: dict) -> bool:
+        with self.swarm_state.transaction() as swarm:
+            self.require_manager(swarm)
+            swarm["Nodes"][node_id]["Spec"] = node_spec
+        return True
+
+    def list_swarm_nodes(self, filters: dict | None = None) -> list[types.SimpleNamespace]:
+        with self.swarm_state.transaction() as swarm:
+            self.require_manager(swarm)
+            nodes = list(swarm["Nodes"].values())
+        label, separator, value = (filters or {}).get("node.label", "").partition("=")
+        role = (filters or {}).get("role")
+        return [
+            self.swarm_node_model(node) for node in nodes
+            if (not label or (
+                node["Spec"]["Labels"].get(label) == value if separator else label in node["Spec"]["Labels"]
+            ))
+            and (not role or node["Spec"]["Role"] == role)
+        ]
+
+    def list_networks(self, names: list[str] | None = None, **kwargs) -> list[types.SimpleNamespace]:
+        # pylint: disable=unused-argument
+        with self.swarm_state.transaction() as swarm:
+            networks = swarm.get("Networks", {}) if self.local_swarm()["LocalNodeState"] == "active" else {}
+        return [
+            types.SimpleNamespace(id=network["Id"], name=name, attrs=network)
+            for name, network in networks.items() if names is None or name in names
+        ]
+
+    def create_network(self, name: str, driver: str | None = None, **kwargs) -> types.SimpleNamespace:
+        with self.swarm_state.transaction() as swarm:
+            self.require_manager(swarm)
+            network = {"Id": identifier("network", name)[:25], "Name": name, "Driver": driver, "Options": kwargs}
+            swarm["Networks"][name] = network
+        return types.SimpleNamespace(id=network["Id"], name=name, attrs=network)
+
+    def create_secret(self, name: str, data: str | bytes, **kwargs) -> types.SimpleNamespace:
+        # pylint: disable=unused-argument
+        with self.swarm_state.transaction() as swarm:
+            self.require_manager(swarm)
+            if any(secret["Spec"]["Name"] == name for secret in swarm["Secrets"].values()):
+                raise docker.errors.APIError(f"secret {name} conflicts with an existing object")
+            secret = {"ID": identifier("secret", name, swarm["ID"])[:25], "Spec": {"Name": name}}
+            swarm["Secrets"][secret["ID"]] = secret
+        return types.SimpleNamespace(id=secret["ID"], name=name, attrs=secret)
+
+    def create_service(self, image: str, command: list[str] | None = None, **kwargs) -> types.SimpleNamespace:
+        name = kwargs["name"]
+        with self.swarm_state.transaction() as swarm:
+            self.require_manager(swarm)
+            if any(service["Spec"]["Name"] == name for service in swarm["Services"].values()):
+                raise docker.errors.APIError(f"service {name} already exists")
+            for network in kwargs.get("networks") or []:
+                if network not in swarm["Networks"]:
+                    raise docker.errors.NotFound(f"network {network} not found")
+            for secret in kwargs.get("secrets") or []:
+                if secret["SecretID"] not in swarm["Secrets"]:
+                    raise docker.errors.NotFound(f"secret {secret['SecretID']} not found")
+            service = {
+                "ID": identifier("service", name, str(time.time()))[:25],
+                "Spec": {
+                    "Name": name,
+                    "Mode": {
+                        mode[:1].upper() + mode[1:]: settings
+                        for mode, settings in dict(kwargs.get("mode") or {"replicated": {"Replicas": 1}}).items()
+                    },
+                    "TaskTemplate": {
+                        "ContainerSpec": {
+                            "Image": image,
+                            "Command": command or [],
+                            "Mounts": [dict(mount) for mount in kwargs.get("mounts") or []],
+                            "Healthcheck": kwargs.get("healthcheck")
+                        },
+                        "Placement": {
+                            "Constraints": kwargs.get("constraints") or [],
+                            "MaxReplicas": kwargs.get("maxreplicas") or 0
+                        }
+                    },
+                    "EndpointSpec": dict(kwargs.get("endpoint_spec") or {})
+                },
+                "Tasks": []
+            }
+            swarm["Services"][service["ID"]] = service
+            self.schedule(swarm, service)
+        return self.service_model(service)
+
+    @staticmethod
+    def satisfies(node: dict, constraint: str) -> bool:
+        key, _, value = (part.strip() for part in constraint.partition("=="))
+        if key.startswith("node.labels."):
+            return node["Spec"]["Labels"].get(key.removeprefix("node.labels.")) == value
+        if key == "node.role":
+            return node["Spec"]["Role"] == value
+        return key == "node.hostname" and node["Description"]["Hostname"] == value
+
+    def schedule(self, swarm: dict, service: dict) -> None:
+        mode = service["Spec"]["Mode"]
+        placement = service["Spec"]["TaskTemplate"]["Placement"]
+        candidates = sorted(
+            (
+                node for node in swarm["Nodes"].values()
+                if node["Spec"]["Availability"] == "active"
+                and all(self.satisfies(node, constraint) for constraint in placement["Constraints"])
+            ),
+            key=lambda node: node["Description"]["Hostname"]
+        )
+        placed = {node["ID"]: 0 for node in candidates}
+        replicas = len(candidates)
+        if "Replicated" in mode:
+            replicas = mode["Replicated"]["Replicas"]
+        elif "ReplicatedJob" in mode:
+            replicas = mode["ReplicatedJob"]["TotalCompletions"]
+        for slot in range(1, replicas + 1):
+            task = {
+                "ID": identifier(service["ID"], str(slot))[:25],
+                "ServiceID": service["ID"],
+                "Slot": slot,
+                "NodeID": None,
+                "DesiredState": "complete" if "ReplicatedJob" in mode else "running",
+                "Container": None,
+                "Status": {"State": "pending", "Err": "no suitable node"}
+            }
+            service["Tasks"].append(task)
+            available = [
+                node for node in candidates
+                if not placement["MaxReplicas"] or placed[node["ID"]] < placement["MaxReplicas"]
+            ]
+            if available:
+                node = min(available, key=lambda node: placed[node["ID"]])
+                placed[node["ID"]] += 1
+                task["NodeID"] = node["ID"]
+                self.start_task(service, task, node["Description"]["Hostname"])
+
+    def start_task(self, service: dict, task: dict, hostname: str) -> None:
+        container_spec = service["Spec"]["TaskTemplate"]["ContainerSpec"]
+        reference = container_spec["Image"]
+        for mount in container_spec["Mounts"]:
+            if not os.path.exists(self.node.path(mount["Source"], hostname)):
+                task["Status"] = {
+                    "State": "rejected",
+                    "Err": f'invalid mount config for type "bind": bind source path does not exist: {mount["Source"]}'
+                }
+                return
+        with self.transaction(hostname) as state:
+            image = self.find_image(state, reference)
+            delay = 0.0
+            if image is None and not reference.startswith("sha256:") and (
+                    self.latencies.registry or not reference.startswith("ghcr.io/")):
+                image = image_record(reference if ":" in reference else f"{reference}:latest")
+                state["images"][image["Id"]] = image
+                delay = self.latencies.image_pull
+            if image is None:
+                task["Status"] = {"State": "rejected", "Err": f"No such image: {reference}"}
+                return
+            container = self.create_container_record(
+                state,
+                f"{service['Spec']['Name']}.{task['Slot']}.{task['ID']}",
+                image,
+                healthcheck=bool(container_spec["Healthcheck"]),
+                job=next((argument for argument in container_spec["Command"] if argument in JOBS), None),
+                labels={
+                    "com.docker.swarm.service.name": service["Spec"]["Name"],
+                    "com.docker.swarm.task.id": task["ID"]
+                },
+                delay=delay
+            )
+        task["Container"] = container["Id"]
+        task["Status"] = {"State": "assigned"}
+
+    @staticmethod
+    def task_state(container: dict | None) -> str:
+        if container is None:
+            return "shutdown"
+        if container["State"] == "exited":
+            return "complete" if container["ExitCode"] == 0 else "failed"
+        if container["State"] == "created" or container["Health"] == "starting":
+            return "starting"
+        return "running"
+
+    def service_tasks(self, swarm: dict, service: dict) -> list[dict]:
+        tasks = []
+        for task in service["Tasks"]:
+            task = dict(task)
+            if task["Container"] is not None:
+                with self.transaction(swarm["Nodes"][task["NodeID"]]["Description"]["Hostname"]) as state:
+                    container = state["containers"].get(task["Container"])
+                task["Status"] = {
+                    "State": self.task_state(container),
+                    "ContainerStatus": {"ContainerID": task["Container"]}
+                }
+            tasks.append(task)
+        return tasks
+
+    def service_model(self, service: dict) -> types.SimpleNamespace:
+        return types.SimpleNamespace(
+            id=service["ID"],
+            name=service["Spec"]["Name"],
+            attrs=service,
+            tasks=functools.partial(self.list_service_tasks, service["ID"]),
+            remove=functools.partial(self.remove_service, service["ID"])
+        )
+
+    def list_service_tasks(self, service_id: str, filters: dict | None = None) -> list[dict]:
+        # pylint: disable=unused-argument
+        with self.swarm_state.transaction() as swarm:
+            self.require_manager(swarm)
+            if service_id not in swarm["Services"]:
+                raise docker.errors.NotFound(f"service {service_id} not found")
+            return self.service_tasks(swarm, swarm["Services"][service_id])
+
+    def list_tasks(self, filters: dict | None = None) -> list[dict]:
+        filters = filters or {}
+        with self.swarm_state.transaction() as swarm:
+            self.require_manager(swarm)
+            tasks = [
+                task
+                for service in swarm["Services"].values()
+                if filters.get("service") in (None, service["ID"], service["Spec"]["Name"])
+                for task in self.service_tasks(swarm, service)
+            ]
+        return [task for task in tasks if filters.get("desired-state") in (None, task["DesiredState"])]
+
+    def remove_service(self, service_id: str) -> bool:
+        with self.swarm_state.transaction() as swarm:
+            self.require_manager(swarm)
+            service = swarm["Services"].pop(service_id)
+            for task in service["Tasks"]:
+                if task["Container"] is not None:
+                    with self.transaction(swarm["Nodes"][task["NodeID"]]["Description"]["Hostname"]) as state:
+                        self.remove_container_record(state, task["Container"])
+        return True
+
+    def published(self, port: int) -> bool:
+        with self.swarm_state.transaction() as swarm:
+            if self.local_swarm()["LocalNodeState"] != "active":
+                return False
+            return any(
+                task["Status"]["State"] == "running"
+                for service in swarm["Services"].values()
+                if any(
+                    published.get("PublishedPort") == port
+                    for published in service["Spec"]["EndpointSpec"].get("Ports", [])
+                )
+                for task in self.service_tasks(swarm, service)
+            )
+
+
+class SimulatedNode:
+    def __init__(self, name: str, root: str, latencies: Latencies) -> None:
+        self.name = name
+        self.root = root
+        self.directory = os.path.join(root, name)
+        self.latencies = latencies
+        self.client = SimulatedDockerClient(self)
+        self.run_process = subprocess.run
+        self.resolve = socket.gethostbyname
+
+    def path(self, path: str, node: str | None = None) -> str:
+        return os.path.join(self.root, node or self.name, "fs", path.lstrip("/"))
+
+    def open(self, file: str, *args, **kwargs) -> typing.IO:
+        # pylint: disable=unspecified-encoding
+        return open(self.path(file) if file.startswith("/") else file, *args, **kwargs)
+
+    def hostname(self) -> str:
+        return self.name
+
+    def address(self, host: str) -> str:
+        nodes = sorted(entry.name for entry in os.scandir(self.root) if entry.is_dir())
+        if host in nodes:
+            return f"127.0.1.{nodes.index(host) + 1}"
+        return self.resolve(host)
+
+    def accepts(self, port: int) -> bool:
+        with self.client.transaction() as state:
+            listening = any(
+                container["State"] == "running" and container["Health"] in (None, "healthy")
+                and port in container["Ports"] and "com.docker.swarm.service.name" not in container["Labels"]
+                for container in state["containers"].values()
+            )
+        if listening or self.client.published(port):
+            return True
+        raise ConnectionRefusedError(f"Connection refused by {self.name}:{port}")
+
+    def probe_mysql(self, host: str, port: int, timeout: float = 2.0) -> bool:  # pylint: disable=unused-argument
+        return self.accepts(port)
+
+    def probe_http(self, url: str, timeout: float = 2.0) -> bool:  # pylint: disable=unused-argument
+        return self.accepts(urllib.parse.urlsplit(url).port or 443)
+
+    def compose_up(self, compose_file: str, service: str, detach: bool) -> None:
+        with self.open(compose_file, mode="r", encoding="utf-8") as compose:
+            services, secret_files = compose_services(compose.read())
+        if service not in services:
+            raise ValueError(f"no such service: {service}")
+        definition = services[service]
+        for path in definition["volumes"] + secret_files:
+            if not os.path.exists(self.path(path)):
+                raise FileNotFoundError(f"bind source path does not exist: {path}")
+        try:
+            self.client.get_image(definition["image"])
+        except docker.errors.ImageNotFound:
+            self.client.pull_image(definition["image"])
+        with self.client.transaction() as state:
+            for container in list(state["containers"].values()):
+                if container["Name"] == definition["container_name"]:
+                    self.client.remove_container_record(state, container["Id"])
+            container = self.client.create_container_record(
+                state,
+                definition["container_name"],
+                self.client.find_image(state, definition["image"]),  # type: ignore[arg-type]
+                healthcheck=definition["healthcheck"],
+                job=None if detach else service,
+                labels={"com.docker.compose.service": service}
+            )
+        if not detach:
+            time.sleep(max(container["ExitAt"] - time.time(), 0))
+
+    def compose(self, args: typing.Any, *positional, **kwargs) -> subprocess.CompletedProcess:
+        if not isinstance(args, str) or "compose" not in args.split():
+            return self.run_process(args, *positional, **kwargs)  # pylint: disable=subprocess-run-check
+        for command in args.split("&&"):
+            tokens = command.split()
+            try:
+                self.compose_up(
+                    tokens[tokens.index("--file") + 1], tokens[tokens.index("up") + 1], "--detach" in tokens
+                )
+            except (OSError, ValueError, docker.errors.DockerException) as error:
+                raise subprocess.CalledProcessError(1, args, output="", stderr=str(error)) from error
+        return subprocess.CompletedProcess(args, 0, stdout="", stderr="")
+
+    def install(self) -> None:
+        docker.from_env = lambda *args, **kwargs: self.client
+        socket.gethostname = self.hostname
+        socket.gethostbyname = self.address
+        subprocess.run = self.compose  # type: ignore[assignment]
+
+    def patch_agent(self) -> None:
+        readiness = importlib.import_module("readiness")
+        setattr(readiness, "mysql_handshake", self.probe_mysql)
+        setattr(readiness, "http_health", self.probe_http)
+        setattr(importlib.import_module("container"), "open", self.open)
+
+    def arguments(self, arguments: list[str]) -> list[str]:
+        return [self.path(argument) if argument.startswith("/") else argument for argument in arguments]
+
+    def execute(self, command: list[str]) -> int:
+        while command and re.match(r"^[A-Za-z_][A-Za-z0-9_]*=", command[0]):
+            command = command[1:]
+        if command[:2] == ["docker", "load"]:
+            try:
+                for image in self.client.load_images(sys.stdin.buffer.read()):
+                    print(f"Loaded image: {image.tags[0]}")
+            except (docker.errors.DockerException, tarfile.TarError, OSError) as error:
+                sys.stderr.write(f"{error}\n")
+                return 1
+            return 0
+        if command[:1] == ["python3"] and len(command) > 1:
+            script = self.path(command[1])
+            sys.argv = [script, *self.arguments(command[2:])]
+            sys.path.insert(0, os.path.dirname(script))
+            if os.path.basename(script) == "agent.py":
+                self.patch_agent()
+            runpy.run_path(script, run_name="__main__")
+            return 0
+        if command[:1] in (["mkdir"], ["chmod"]):
+            return self.run_process(
+                [command[0], *self.arguments(command[1:])],
+                check=False
+            ).returncode
+        sys.stderr.write(f"{command[0] if command else ''}: command not found\n")
+        return 127
+
+
+if __name__ == "__main__":
+    simulated_node = SimulatedNode(sys.argv[1], sys.argv[2], Latencies.from_environment())
+    simulated_node.install()
+    sys.exit(simulated_node.execute(sys.argv[3:]))
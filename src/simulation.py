@@ -0,0 +1,261 @@
+"""
+Simulated Backend Module
+
+This module emulates the SSH transport to the cluster nodes on the user's host, so that the
+orchestration in `initialize.Controller` can be run and measured without virtual machines.
+Only `paramiko` is replaced: `remote.RemoteConnection`, the agent, `sync.py`, `images.py` and
+the container routines of `container.ContainerConnection` run unmodified, the commands they
+execute on a node run in `simulated_node.py` processes against an emulated Docker engine.
+
+Classes:
+--------
+- `SimulatedCluster`:
+  The directories of the emulated nodes and the accounting of the traffic to them. The files and
+  images of the nodes outlive a deployment, `reset` removes their containers and the Swarm.
+
+- `SimulatedTransport`:
+  The state of an emulated SSH transport, active until its client is closed.
+
+- `SimulatedChannel`:
+  The channel of a command running in a `simulated_node.py` process, with its exit status.
+
+- `SimulatedChannelFile`:
+  A standard stream of a command, delayed by the round trip and the bandwidth of the link.
+
+- `SimulatedSFTPClient`:
+  Uploads and directories written into the directory of the emulated node.
+
+- `SimulatedSSHClient`:
+  A stand-in for `paramiko.SSHClient` starting every executed command as a node process.
+
+- `SimulatedTransportPool`:
+  A `remote.TransportPool` connecting to the emulated nodes of a cluster.
+
+- `SimulatedConnection`:
+  `remote.RemoteConnection` over the simulated transport pool.
+
+Key Functionalities:
+--------------------
+- Real Node Code: The agent protocol, the directory synchronization, the image streaming and
+  the Docker calls of the container routines are the same as on real nodes, only the transport
+  below `remote.RemoteConnection` and the Docker engine below `docker.DockerClient` are emulated.
+
+- Link Latency: Every command, SFTP operation and agent request costs a round trip, every byte
+  written to or read from a node costs its transfer time at the configured bandwidth.
+
+- Accounting: The cluster counts the remote calls and the transferred bytes of every node.
+
+Example Usage:
+--------------
+```python
+cluster = SimulatedCluster("/tmp/superset-cluster-nodes", Latencies(time_scale=0.01))
+SimulatedConnection.pool = SimulatedTransportPool(cluster)
+initialize.Controller.connection_class = SimulatedConnection
+initialize.Controller().start_cluster()
+```
+
+See `benchmark.py` for a driver running complete deployments against this backend.
+"""
+
+import collections
+import os
+import shlex
+import shutil
+import subprocess
+import sys
+import threading
+import typing
+
+import paramiko
+
+import remote
+import simulated_node
+import tracing
+
+Latencies = simulated_node.Latencies
+
+
+class SimulatedCluster:
+    def __init__(self, root: str, latencies: Latencies) -> None:
+        self.root = root
+        self.latencies = latencies
+        self.nodes: dict[str, simulated_node.SimulatedNode] = {}
+        self.lock = threading.Lock()
+        self.calls: collections.Counter = collections.Counter()
+        self.transferred: collections.Counter = collections.Counter()
+
+    def node(self, name: str) -> simulated_node.SimulatedNode:
+        with self.lock:
+            if name not in self.nodes:
+                self.nodes[name] = simulated_node.SimulatedNode(name, self.root, self.latencies)
+                os.makedirs(self.nodes[name].path("/var/run"), exist_ok=True)
+                with open(file=self.nodes[name].path("/var/run/docker.sock"), mode="a", encoding="utf-8"):
+                    pass
+            return self.nodes[name]
+
+    def operation(self, node: str, size: int = 0) -> None:
+        with self.lock:
+            self.calls[node] += 1
+        self.latencies.sleep(self.latencies.round_trip)
+        self.transfer(node, size)
+
+    def transfer(self, node: str, size: int) -> None:
+        with self.lock:
+            self.transferred[node] += size
+        self.latencies.transfer(size)
+
+    def reset(self) -> None:
+        if os.path.exists(os.path.join(self.root, "swarm.json")):
+            os.remove(os.path.join(self.root, "swarm.json"))
+        for node in self.nodes.values():
+            with node.client.state.transaction() as state:
+                state.update(simulated_node.node_state(), images=state["images"])
+            shutil.rmtree(os.path.join(node.directory, "containers"), ignore_errors=True)
+        with self.lock:
+            self.calls.clear()
+            self.transferred.clear()
+
+
+class SimulatedTransport:
+    def __init__(self) -> None:
+        self.active = True
+
+    def is_active(self) -> bool:
+        return self.active
+
+    def set_keepalive(self, interval: int) -> None:
+        pass
+
+    def close(self) -> None:
+        self.active = False
+
+
+class SimulatedChannel:
+    def __init__(self, transport: SimulatedTransport, process: subprocess.Popen | None = None) -> None:
+        self.transport = transport
+        self.process = process
+
+    def get_transport(self) -> SimulatedTransport:
+        return self.transport
+
+    def recv_exit_status(self) -> int:
+        return self.process.wait() if self.process is not None else 0
+
+    def shutdown_write(self) -> None:
+        if self.process is not None and self.process.stdin is not None:
+            try:
+                self.process.stdin.close()
+            except BrokenPipeError:
+                pass
+
+
+class SimulatedChannelFile:
+    def __init__(
+            self,
+            cluster: SimulatedCluster,
+            node: str,
+            channel: SimulatedChannel,
+            stream: typing.IO[bytes] | None) -> None:
+        self.cluster = cluster
+        self.node = node
+        self.channel = channel
+        self.stream = stream
+
+    def write(self, data: bytes) -> int:
+        self.cluster.transfer(self.node, len(data))
+        self.stream.write(data)  # type: ignore[union-attr]
+        return len(data)
+
+    def flush(self) -> None:
+        self.stream.flush()  # type: ignore[union-attr]
+        self.cluster.operation(self.node)
+
+    def read(self, size: int = -1) -> bytes:
+        data = self.stream.read(size)  # type: ignore[union-attr]
+        self.cluster.transfer(self.node, len(data))
+        return data
+
+    def __iter__(self) -> typing.Iterator[str]:
+        for line in self.stream:  # type: ignore[union-attr]
+            self.cluster.transfer(self.node, len(line))
+            yield line.decode("utf-8", errors="replace")
+
+
+class SimulatedSFTPClient:
+    def __init__(self, ssh_client: "SimulatedSSHClient") -> None:
+        self.ssh_client = ssh_client
+        self.node = ssh_client.cluster.node(ssh_client.node)
+        self.channel = SimulatedChannel(ssh_client.transport)
+
+    def get_channel(self) -> SimulatedChannel:
+        return self.channel
+
+    def putfo(self, fl: typing.IO[bytes], remotepath: str, **kwargs) -> None:  # pylint: disable=unused-argument
+        content = fl.read()
+        self.ssh_client.cluster.operation(self.ssh_client.node, len(content))
+        with open(file=self.node.path(remotepath), mode="wb") as remote_file:
+            remote_file.write(content)
+
+    def put(self, localpath: str, remotepath: str, **kwargs) -> None:  # pylint: disable=unused-argument
+        with open(file=localpath, mode="rb") as local_file:
+            self.putfo(local_file, remotepath)
+
+    def mkdir(self, path: str, mode: int = 511) -> None:
+        self.ssh_client.cluster.operation(self.ssh_client.node)
+        os.mkdir(self.node.path(path), mode)
+
+    def close(self) -> None:
+        pass
+
+
+class SimulatedSSHClient:
+    def __init__(self, cluster: SimulatedCluster, node: str) -> None:
+        self.cluster = cluster
+        self.node = node
+        self.transport = SimulatedTransport()
+        self.cluster.node(node)
+
+    def get_transport(self) -> SimulatedTransport:
+        return self.transport
+
+    def exec_command(self, command: str) -> tuple[SimulatedChannelFile, SimulatedChannelFile, SimulatedChannelFile]:
+        self.cluster.operation(self.node)
+        process = subprocess.Popen(  # pylint: disable=consider-using-with
+            [sys.executable, simulated_node.__file__, self.node, self.cluster.root, *shlex.split(command)],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            env=dict(os.environ, **self.cluster.latencies.environment())
+        )
+        channel = SimulatedChannel(self.transport, process)
+        return (
+            SimulatedChannelFile(self.cluster, self.node, channel, process.stdin),
+            SimulatedChannelFile(self.cluster, self.node, channel, process.stdout),
+            SimulatedChannelFile(self.cluster, self.node, channel, process.stderr)
+        )
+
+    def open_sftp(self) -> SimulatedSFTPClient:
+        self.cluster.operation(self.node)
+        return SimulatedSFTPClient(self)
+
+    def close(self) -> None:
+        self.transport.close()
+
+
+class SimulatedTransportPool(remote.TransportPool):
+    def __init__(self, cluster: SimulatedCluster | None = None, keepalive_interval: int = 30) -> None:
+        super().__init__(keepalive_interval)
+        self.cluster = cluster
+
+    def connect(self, node: str) -> paramiko.SSHClient:
+        if self.cluster is None:
+            raise ConnectionError(f"Unable to connect to {node}, no simulated cluster is set up")
+        with tracing.span("ssh_connect", "transport", node=node):
+            self.cluster.latencies.sleep(self.cluster.latencies.round_trip * 4)
+            ssh_client = SimulatedSSHClient(self.cluster, node)
+        ssh_client.get_transport().set_keepalive(self.keepalive_interval)
+        return ssh_client  # type: ignore[return-value]
+
+
+class SimulatedConnection(remote.RemoteConnection):
+    pool = SimulatedTransportPool()
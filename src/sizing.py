@@ -0,0 +1,271 @@
+"""
+Resource Sizing Module
+
+This module derives service settings from the hardware of the node they run on, instead of
+using the same fixed values on every machine. It only depends on the standard library and
+runs on the nodes next to `container.py`, which passes it the output of `docker info`.
+
+Classes:
+--------
+- `Hardware`:
+  The CPU count, memory size and storage type of a node.
+
+Functions:
+----------
+- `detect`:
+  Builds `Hardware` from `docker info`, probing `/sys/block` for whether the device holding
+  the Docker root directory is rotational.
+
+- `swarm_node_hardware`:
+  Builds `Hardware` from the resources a Swarm node reports, so that the settings of the
+  MySQL nodes can be computed on the management nodes.
+
+- `mysql_server`:
+  Computes the MySQL Server settings rendered into `mysql_config.cnf.tpl`: buffer pool size and
+  instances, redo log capacity, IO capacity and threads, parallel applier workers and connection limits.
+  Operator overrides replace computed values.
+
+- `superset_autoscaling`:
+  Computes the limits of the Superset autoscaler: the Celery worker pool size range, about one
+  process per CPU on average, and the number of Superset replicas, at least one per management
+  node and at most one per 4 CPUs of every management node, up to 4 per node.
+
+- `superset_web`:
+  Computes the Gunicorn profile of the Superset web tier: the worker class, one worker process per CPU
+  of a replica within a quarter of its memory, the threads of every worker, application preloading,
+  worker recycling after a number of requests and the keepalive and request timeouts.
+  Operator overrides replace computed values, the other values follow the chosen worker class.
+
+- `connection_budget`:
+  Splits the connections a MySQL node accepts among the Superset processes of all replicas,
+  computing the SQLAlchemy pool of the metadata engine and, when the `sql_lab` Celery workers
+  would take more than half of the connections left by the fixed `reports` and `maintenance`
+  workers, a lower maximum concurrency of the `sql_lab` workers.
+
+- `redis`:
+  Computes the memory limit and eviction policy of the two Redis instances: the broker, holding the
+  Celery queues and results, never evicts, the cache evicts the least frequently used keys.
+  Each takes a share of the memory of the management node, within fixed bounds.
+
+- `validate_overrides`:
+  Rejects operator overrides of settings that are not computed, such as misspelled ones.
+
+- `format_size`:
+  Formats a byte count with the largest binary unit suffix understood by MySQL.
+
+Key Functionalities:
+--------------------
+- Dedicated Hosts: MySQL nodes run only the MySQL Server container, the buffer pool takes
+  three quarters of the memory of larger nodes, the same share `innodb_dedicated_server` uses.
+
+- Storage Awareness: IO capacity and neighbor page flushing follow the storage type, since solid
+  state drives sustain far more random writes than rotational disks.
+
+- Overrides: Every computed setting can be replaced by the operator, unknown settings are rejected.
+
+- Connection Budget: the Superset pools are planned for the worst case of every connection landing
+  on one MySQL node, as happens when the read-only port falls back to the primary.
+
+Example Usage:
+--------------
+```python
+hardware = detect(docker.from_env().info())
+settings = mysql_server(hardware, {"max_connections": "300"})
+print(settings["innodb_buffer_pool_size"])  # 24G on a 32 GiB node
+```
+"""
+
+import os
+
+MIB = 1024 * 1024
+GIB = 1024 * MIB
+
+CELERY_REPORTS_CONCURRENCY = 2
+CELERY_MAINTENANCE_CONCURRENCY = 2
+
+BUFFER_POOL_CHUNK = 128 * MIB
+CONNECTION_MEMORY = 12 * MIB
+WEB_WORKER_MEMORY = 512 * MIB
+
+WORKER_CLASSES = ("sync", "gthread", "gevent")
+
+MYSQL_SERVER_SETTINGS = (
+    "innodb_buffer_pool_size",
+    "innodb_buffer_pool_instances",
+    "innodb_redo_log_capacity",
+    "innodb_io_capacity",
+    "innodb_io_capacity_max",
+    "innodb_flush_neighbors",
+    "innodb_read_io_threads",
+    "innodb_write_io_threads",
+    "replica_parallel_workers",
+    "max_connections"
+)
+
+SUPERSET_WEB_SETTINGS = (
+    "worker_class",
+    "workers",
+    "threads",
+    "preload",
+    "max_requests",
+    "max_requests_jitter",
+    "keepalive",
+    "timeout"
+)
+
+
+class Hardware:  # pylint: disable=too-few-public-methods
+    def __init__(self, cpus: int, memory: int, rotational: bool = False) -> None:
+        self.cpus = max(cpus, 1)
+        self.memory = memory
+        self.rotational = rotational
+
+    def __repr__(self) -> str:
+        return f"Hardware(cpus={self.cpus}, memory={format_size(self.memory)}, rotational={self.rotational})"
+
+
+def rotational_storage(path: str) -> bool:
+    try:
+        device = os.stat(path).st_dev
+        block = os.path.realpath(f"/sys/dev/block/{os.major(device)}:{os.minor(device)}")
+        if not os.path.isdir(os.path.join(block, "queue")):
+            block = os.path.dirname(block)
+        with open(file=os.path.join(block, "queue", "rotational"), mode="r", encoding="utf-8") as rotational:
+            return rotational.read().strip() == "1"
+    except OSError:
+        return False
+
+
+def detect(info: dict) -> Hardware:
+    return Hardware(
+        cpus=int(info.get("NCPU") or os.cpu_count() or 1),
+        memory=int(info.get("MemTotal") or os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES")),
+        rotational=rotational_storage(info.get("DockerRootDir") or "/var/lib/docker")
+    )
+
+
+def format_size(size: int) -> str:
+    if size % GIB == 0:
+        return f"{size // GIB}G"
+    return f"{size // MIB}M"
+
+
+def swarm_node_hardware(attributes: dict) -> Hardware:
+    resources = attributes.get("Description", {}).get("Resources", {})
+    return Hardware(
+        cpus=int(resources.get("NanoCPUs", 0)) // 1000000000,
+        memory=int(resources.get("MemoryBytes", 0))
+    )
+
+
+def validate_overrides(overrides: dict[str, str], known: tuple[str, ...]) -> dict[str, str]:
+    for setting in overrides:
+        if setting not in known:
+            raise ValueError(f"Unknown setting override {setting}, expected one of {', '.join(known)}")
+    return overrides
+
+
+def superset_autoscaling(hardware: Hardware, nodes: int = 1) -> dict[str, str]:
+    replicas_per_node = min(max(hardware.cpus // 4, 1), 4)
+    return {
+        "min_concurrency": str(max(hardware.cpus // 2, 2)),
+        "max_concurrency": str(max(hardware.cpus * 2, 4)),
+        "min_replicas": str(max(nodes, 1)),
+        "max_replicas": str(max(nodes, 1) * replicas_per_node),
+        "replicas_per_node": str(replicas_per_node)
+    }
+
+
+def superset_web(
+        hardware: Hardware,
+        replicas_per_node: int = 1,
+        overrides: dict[str, str] | None = None) -> dict[str, str]:
+    overrides = validate_overrides(overrides or {}, SUPERSET_WEB_SETTINGS)
+    worker_class = overrides.get("worker_class", "gthread")
+    if worker_class not in WORKER_CLASSES:
+        raise ValueError(f"Unknown Gunicorn worker class {worker_class}, expected one of {', '.join(WORKER_CLASSES)}")
+    cpus = max(hardware.cpus // max(replicas_per_node, 1), 1)
+    memory_workers = max(hardware.memory // max(replicas_per_node, 1) // 4 // WEB_WORKER_MEMORY, 1)
+    if worker_class == "sync":
+        workers, threads = min(2 * cpus + 1, memory_workers), 1
+    elif worker_class == "gthread":
+        workers = min(cpus, memory_workers)
+        threads = min(max(8 * cpus // workers, 4), 32)
+    else:
+        workers, threads = min(cpus, memory_workers), 100
+    settings = {
+        "worker_class": worker_class,
+        "workers": str(workers),
+        "threads": str(threads),
+        "preload": "false" if worker_class == "gevent" else "true",
+        "max_requests": "1000",
+        "max_requests_jitter": "200",
+        "keepalive": "75",
+        "timeout": "60"
+    }
+    settings.update(overrides)
+    return settings
+
+
+def connection_budget(
+        max_connections: int,
+        replicas: int,
+        web_processes: int,
+        web_threads: int,
+        worker_processes: int,
+        *,
+        fixed_worker_processes: int = 0) -> dict[str, str]:
+    # pylint: disable=too-many-arguments
+    reserved = max(max_connections // 10, 10) + 2 * replicas * fixed_worker_processes
+    available = max(max_connections - reserved, 2 * replicas * (web_processes + 1))
+    worker_processes = min(worker_processes, max(available // (4 * replicas), 1))
+    web_share = (available - 2 * replicas * worker_processes) // (replicas * web_processes)
+    pool_size = min(max(web_share // 4, 1), max(web_threads // 4, 1))
+    return {
+        "pool_size": str(pool_size),
+        "max_overflow": str(min(max(web_share // 2 - pool_size, 0), web_threads - pool_size)),
+        "pool_timeout": "10",
+        "pool_recycle": "3600",
+        "max_concurrency": str(worker_processes)
+    }
+
+
+def redis(hardware: Hardware) -> dict[str, dict[str, str]]:
+    return {
+        "broker": {
+            "maxmemory": f"{min(max(hardware.memory // 16, 128 * MIB), 2 * GIB) // MIB}mb",
+            "maxmemory-policy": "noeviction"
+        },
+        "cache": {
+            "maxmemory": f"{min(max(hardware.memory // 8, 256 * MIB), 8 * GIB) // MIB}mb",
+            "maxmemory-policy": "allkeys-lfu"
+        }
+    }
+
+
+def mysql_server(hardware: Hardware, overrides: dict[str, str] | None = None) -> dict[str, str]:
+    if hardware.memory < GIB:
+        buffer_pool = BUFFER_POOL_CHUNK
+    elif hardware.memory <= 4 * GIB:
+        buffer_pool = hardware.memory // 2
+    else:
+        buffer_pool = hardware.memory * 3 // 4
+    buffer_pool_instances = max(min(buffer_pool // GIB, hardware.cpus, 64), 1)
+    buffer_pool -= buffer_pool % (BUFFER_POOL_CHUNK * buffer_pool_instances)
+    buffer_pool = max(buffer_pool, BUFFER_POOL_CHUNK * buffer_pool_instances)
+    redo_log_capacity = min(max(hardware.cpus // 2, 1) * GIB, 16 * GIB, max(buffer_pool // 2, 256 * MIB))
+    io_capacity = 200 if hardware.rotational else 2000
+    settings = {
+        "innodb_buffer_pool_size": format_size(buffer_pool),
+        "innodb_buffer_pool_instances": str(buffer_pool_instances),
+        "innodb_redo_log_capacity": format_size(redo_log_capacity),
+        "innodb_io_capacity": str(io_capacity),
+        "innodb_io_capacity_max": str(io_capacity * 2),
+        "innodb_flush_neighbors": "1" if hardware.rotational else "0",
+        "innodb_read_io_threads": str(min(max(hardware.cpus // 2, 4), 64)),
+        "innodb_write_io_threads": str(min(max(hardware.cpus // 2, 4), 64)),
+        "replica_parallel_workers": str(min(max(hardware.cpus, 2), 32)),
+        "max_connections": str(min(max((hardware.memory - buffer_pool) // CONNECTION_MEMORY, 50), 2000))
+    }
+    settings.update(validate_overrides(overrides or {}, MYSQL_SERVER_SETTINGS))
+    return settings
@@ -0,0 +1,176 @@
+"""
+Incremental Directory Synchronization Module
+
+This module keeps service directories on the nodes in sync with the local tree,
+sending only the files whose content changed since the previous deployment.
+It only depends on the standard library, so it is used on the user's host to
+build manifests and archives, and on the nodes to unpack them.
+
+Functions:
+----------
+- `manifest`:
+  Walks a directory and returns the SHA-256 digest of every file, keyed by its
+  path relative to the directory. Generated files held in memory, such as keys and
+  certificates, are included under their relative paths as well.
+
+- `verify`:
+  Runs on the node and re-hashes the files listed in the manifest stored there, returning
+  the digests of the files as they are on disk. Files changed or deleted on the node
+  outside the synchronization therefore differ from the local digests and are sent again.
+
+- `pack`:
+  Writes the given files, followed by the new manifest and the list of removed
+  files, as one gzip compressed tar stream into a writable file object.
+  Generated files are written from memory.
+
+- `unpack`:
+  Extracts such a stream next to the target directory, moves every file into place
+  with an atomic rename, deletes the removed files and finally replaces the manifest.
+
+Key Functionalities:
+--------------------
+- Change Detection: Local digests are compared with the files listed in the manifest stored
+  on the node from the previous synchronization, re-hashed on the node, unchanged files are
+  not transferred.
+
+- Atomic Updates: Files are staged on the same filesystem and renamed into place,
+  the manifest is written last, so an interrupted transfer leaves every file either old or new
+  and is fully repeated on the next synchronization.
+
+Example Usage:
+--------------
+The digests of the files on the node are printed as JSON by:
+
+```bash
+python3 /opt/superset-cluster/agent/sync.py --verify \
+  /opt/superset-cluster/mysql-server \
+  /opt/superset-cluster/mysql-server.manifest.json
+```
+
+On the user's host the archive is streamed into the standard input of:
+
+```bash
+python3 /opt/superset-cluster/agent/sync.py \
+  /opt/superset-cluster/mysql-server \
+  /opt/superset-cluster/mysql-server.manifest.json
+```
+"""
+
+import hashlib
+import io
+import json
+import os
+import shutil
+import sys
+import tarfile
+import tempfile
+import typing
+
+MANIFEST_MEMBER = ".superset-cluster-manifest.json"
+
+
+def digest(path: str) -> str:
+    sha256 = hashlib.sha256()
+    with open(file=path, mode="rb") as content:
+        for chunk in iter(lambda: content.read(65536), b""):
+            sha256.update(chunk)
+    return sha256.hexdigest()
+
+
+def manifest(directory: str, generated: dict[str, bytes] | None = None) -> dict[str, str]:
+    files = {}
+    for root, _, filenames in os.walk(directory):
+        for filename in filenames:
+            path = os.path.join(root, filename)
+            files[os.path.relpath(path, directory)] = digest(path)
+    for relative_path, content in (generated or {}).items():
+        files[relative_path] = hashlib.sha256(content).hexdigest()
+    return files
+
+
+def verify(directory: str, manifest_path: str) -> dict[str, str]:
+    try:
+        with open(file=manifest_path, mode="r", encoding="utf-8") as manifest_file:
+            listed = json.load(manifest_file)
+    except (OSError, ValueError):
+        return {}
+    files = {}
+    for relative_path in listed:
+        path = safe_path(directory, relative_path)
+        if os.path.isfile(path):
+            files[relative_path] = digest(path)
+    return files
+
+
+def pack(
+        stream: typing.BinaryIO,
+        directory: str,
+        changed: list[str],
+        files: dict[str, str],
+        removed: list[str],
+        *,
+        generated: dict[str, bytes] | None = None) -> None:
+    # pylint: disable=too-many-arguments
+    generated = generated or {}
+    with tarfile.open(fileobj=stream, mode="w|gz") as archive:
+        for relative_path in changed:
+            if relative_path in generated:
+                member = tarfile.TarInfo(relative_path)
+                member.size = len(generated[relative_path])
+                member.mode = 0o644
+                archive.addfile(member, io.BytesIO(generated[relative_path]))
+            else:
+                archive.add(os.path.join(directory, relative_path), arcname=relative_path, recursive=False)
+        metadata = json.dumps({"files": files, "removed": removed}).encode("utf-8")
+        member = tarfile.TarInfo(MANIFEST_MEMBER)
+        member.size = len(metadata)
+        archive.addfile(member, io.BytesIO(metadata))
+
+
+def safe_path(directory: str, relative_path: str) -> str:
+    path = os.path.realpath(os.path.join(directory, relative_path))
+    if os.path.commonpath([path, os.path.realpath(directory)]) != os.path.realpath(directory):
+        raise ValueError(f"Path {relative_path} points outside of {directory}")
+    return path
+
+
+def unpack(stream: typing.BinaryIO, directory: str, manifest_path: str) -> None:
+    os.makedirs(directory, exist_ok=True)
+    staging = tempfile.mkdtemp(prefix=".sync-", dir=os.path.dirname(os.path.abspath(directory)))
+    try:
+        metadata: dict = {}
+        staged: list[str] = []
+        with tarfile.open(fileobj=stream, mode="r|gz") as archive:
+            for member in archive:
+                if member.name == MANIFEST_MEMBER:
+                    metadata = json.load(archive.extractfile(member))  # type: ignore[arg-type]
+                elif member.isfile():
+                    staged_path = safe_path(staging, member.name)
+                    os.makedirs(os.path.dirname(staged_path), exist_ok=True)
+                    with open(file=staged_path, mode="wb") as staged_file:
+                        shutil.copyfileobj(archive.extractfile(member), staged_file)  # type: ignore[arg-type]
+                    os.chmod(staged_path, member.mode & 0o777)
+                    staged.append(member.name)
+        if not metadata:
+            raise ValueError("Synchronization stream ended before the manifest was received")
+        for relative_path in staged:
+            target_path = safe_path(directory, relative_path)
+            os.makedirs(os.path.dirname(target_path), exist_ok=True)
+            os.replace(os.path.join(staging, relative_path), target_path)
+        for relative_path in metadata["removed"]:
+            try:
+                os.remove(safe_path(directory, relative_path))
+            except FileNotFoundError:
+                pass
+        with open(file=f"{manifest_path}.tmp", mode="w", encoding="utf-8") as manifest_file:
+            json.dump(metadata["files"], manifest_file)
+        os.replace(f"{manifest_path}.tmp", manifest_path)
+    finally:
+        shutil.rmtree(staging, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    if sys.argv[1] == "--verify":
+        print(json.dumps(verify(sys.argv[2], sys.argv[3])))
+    else:
+        unpack(sys.stdin.buffer, sys.argv[1], sys.argv[2])
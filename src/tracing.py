@@ -0,0 +1,162 @@
+"""
+Deployment Tracing Module
+
+This module records timed spans of a deployment and exports them in the Chrome trace
+event format, which can be opened in `chrome://tracing` or https://ui.perfetto.dev.
+It only depends on the standard library, so it is used both by the controller on the
+user's host and by the agent on the nodes.
+
+Classes:
+--------
+- `Tracer`:
+  Collects complete events (`"ph": "X"`) with wall-clock timestamps in microseconds.
+  Spans are recorded only while the tracer is enabled or while the current thread captures
+  spans on behalf of a remote request, otherwise they cost a single attribute lookup.
+
+Functions:
+----------
+- `span`:
+  Context manager recording one span on the module-wide tracer.
+
+- `traced`:
+  Decorator recording a span around every call of the decorated function.
+
+Key Functionalities:
+--------------------
+- Remote Spans: The agent captures the spans of a traced request in the handling thread and
+  returns them with the reply, the controller merges them under a process named after the node.
+
+- Chrome Trace Export: Every process and thread is named through metadata events, so the
+  controller, its bootstrap phase threads and every node appear as separate tracks.
+
+Example Usage:
+--------------
+```python
+tracer.enable()
+with span("credentials", "controller"):
+    generate_credentials()
+tracer.merge(reply["spans"], process="node1")
+tracer.export("deployment.trace.json")
+```
+"""
+
+import contextlib
+import functools
+import json
+import os
+import threading
+import time
+import typing
+
+
+class Tracer:
+    def __init__(self) -> None:
+        self.enabled = False
+        self.events: list[dict] = []
+        self.lock = threading.Lock()
+        self.local = threading.local()
+        self.processes: dict[str, int] = {}
+        self.threads: set[tuple[int, int]] = set()
+
+    def enable(self) -> None:
+        self.enabled = True
+        self.process_id("controller")
+
+    def process_id(self, process: str) -> int:
+        with self.lock:
+            if process not in self.processes:
+                self.processes[process] = len(self.processes) + 1
+                self.events.append(
+                    {"name": "process_name", "ph": "M", "pid": self.processes[process], "args": {"name": process}}
+                )
+            return self.processes[process]
+
+    def thread_id(self, process_id: int) -> int:
+        thread_id = threading.get_ident()
+        with self.lock:
+            if (process_id, thread_id) not in self.threads:
+                self.threads.add((process_id, thread_id))
+                self.events.append(
+                    {
+                        "name": "thread_name",
+                        "ph": "M",
+                        "pid": process_id,
+                        "tid": thread_id,
+                        "args": {"name": threading.current_thread().name}
+                    }
+                )
+        return thread_id
+
+    @contextlib.contextmanager
+    def capture(self, enabled: bool) -> typing.Iterator[list[dict]]:
+        spans: list[dict] = []
+        if enabled:
+            self.local.spans = spans
+        try:
+            yield spans
+        finally:
+            self.local.__dict__.pop("spans", None)
+
+    @contextlib.contextmanager
+    def span(self, name: str, category: str, **args) -> typing.Iterator[None]:
+        captured = getattr(self.local, "spans", None)
+        if captured is None and not self.enabled:
+            yield
+            return
+        started = time.time()
+        try:
+            yield
+        finally:
+            event: dict[str, typing.Any] = {
+                "name": name,
+                "cat": category,
+                "ph": "X",
+                "ts": int(started * 1000000),
+                "dur": int((time.time() - started) * 1000000),
+                "args": args
+            }
+            if captured is not None:
+                event["tid"] = threading.get_ident()
+                captured.append(event)
+            else:
+                event["pid"] = self.processes["controller"]
+                event["tid"] = self.thread_id(event["pid"])
+                with self.lock:
+                    self.events.append(event)
+
+    def merge(self, spans: list[dict], process: str) -> None:
+        if not self.enabled or not spans:
+            return
+        process_id = self.process_id(process)
+        with self.lock:
+            for event in spans:
+                if (process_id, event["tid"]) not in self.threads:
+                    self.threads.add((process_id, event["tid"]))
+                    self.events.append(
+                        {"name": "thread_name", "ph": "M", "pid": process_id, "tid": event["tid"],
+                         "args": {"name": f"agent-{event['tid']}"}}
+                    )
+                self.events.append(dict(event, pid=process_id))
+
+    def export(self, path: str) -> None:
+        with self.lock:
+            events = list(self.events)
+        with open(file=os.path.expanduser(path), mode="w", encoding="utf-8") as trace:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, trace)
+
+
+tracer = Tracer()
+
+
+def span(name: str, category: str, **args) -> typing.ContextManager[None]:
+    return tracer.span(name, category, **args)
+
+
+def traced(category: str) -> typing.Callable:
+    def decorator(func: typing.Callable) -> typing.Callable:
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with tracer.span(func.__qualname__, category):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
@@ -74,17 +74,45 @@ class Redis(container.ContainerConnection, metaclass=decorators.Overlay):
 
     @decorators.Overlay.run_selected_methods_once
     def status(self) -> None:
-        command = """python3 -c \
-            'import redis; print(redis.StrictRedis(host=\"redis\", port=6379).ping())'
+        for host in ("redis", "redis-cache"):
+            command = f"""python3 -c \
+                'import redis; print(redis.StrictRedis(host=\"{host}\", port=6379).ping())'
+            """
+            test_connection = self.run_command_on_the_container(command)
+            assert \
+                self.find_in_the_output(test_connection, b'True'), \
+                f"The {host} container is not responding\nCommand: {command!r}\nReturned: {test_connection!r}"
+
+    @decorators.Overlay.run_selected_methods_once
+    def status_eviction_policies(self) -> None:
+        for host, policy in (("redis", "noeviction"), ("redis-cache", "allkeys-lfu")):
+            command = f"""python3 -c
+                'import redis; print(redis.StrictRedis(host=\"{host}\", port=6379).config_get(\"maxmemory*\"))'
+            """
+            configuration = self.run_command_on_the_container(command)
+            assert \
+                self.find_in_the_output(configuration, policy.encode("utf-8")) \
+                and not self.find_in_the_output(configuration, b"'maxmemory': '0'"), \
+                f"The {host} instance is not bounded with the {policy} policy\nReturned: {configuration!r}"
+
+    @decorators.Overlay.run_selected_methods_once
+    def status_cache_compression(self) -> None:
+        command = """python3 -c
+            'import compressed_cache; \
+            cache = compressed_cache.CompressedRedisCache(host=\"redis-cache\", db=3, key_prefix=\"testing_\"); \
+            cache.set(\"compression\", \"superset\" * 1024); \
+            print(cache.get(\"compression\") == \"superset\" * 1024, \
+                cache._read_client.get(\"testing_compression\")[:1]); \
+            cache.delete(\"compression\")'
         """
-        test_connection = self.run_command_on_the_container(command)
+        round_trip = self.run_command_on_the_container(command)
         assert \
-            self.find_in_the_output(test_connection, b'True'), \
-            f"The redis container is not responding\nCommand: {command!r}\nReturned: {test_connection!r}"
+            self.find_in_the_output(round_trip, b"True b'\\xff'"), \
+            f"The cache values are not compressed or not restored\nCommand: {command!r}\nReturned: {round_trip!r}"
 
     def fetch_query_result(self, results_key: str) -> bool:
         command = f"""python3 -c
-            'import redis; print(redis.StrictRedis(host=\"redis\", port=6379).get(\"{results_key}\"))'
+            'import redis; print(redis.StrictRedis(host=\"redis\", port=6379, db=2).get(\"{results_key}\"))'
         """
         query_result = self.run_command_on_the_container(command)
         assert \
@@ -101,6 +129,9 @@ class Celery(container.ContainerConnection, metaclass=decorators.Overlay):
         self.superset_container = container
         self.celery_broker = "redis://redis:6379/0"
         self.celery_sql_lab_task_annotations = "sql_lab.get_sql_results"
+        self.celery_inspect = \
+            'import celery, json; ' \
+            f'inspect = celery.Celery(\"tasks\", broker=\"{self.celery_broker}\").control.inspect()'
 
     @decorators.Overlay.run_selected_methods_once
     def status(self) -> None:
@@ -117,7 +148,7 @@ class Celery(container.ContainerConnection, metaclass=decorators.Overlay):
     @decorators.Overlay.run_selected_methods_once
     def status_cache(self) -> None:
         command = f"""python3 -c
-            'import celery; print(celery.Celery(\"tasks\", broker=\"{self.celery_broker}\").control.inspect().conf())'
+            '{self.celery_inspect}; print(json.dumps(inspect.conf(), default=str))'
         """
         celery_workers_configuration: dict = self.decode_command_output(
             self.run_command_on_the_container(command)
@@ -126,22 +157,66 @@ class Celery(container.ContainerConnection, metaclass=decorators.Overlay):
         assert \
             all(
                 features in celery_workers_configuration[celery_worker_id]["include"]
-                for features in ['superset.tasks.cache', 'superset.tasks.scheduler']
+                for features in ['superset.tasks.cache', 'superset.tasks.scheduler', 'cache_warmup']
             ), \
             f"""Celery cache and scheduler features in the {self.celery_broker} not found
                 \nCommand: {command}\nReturned decoded: {celery_workers_configuration}
             """
 
+    @decorators.Overlay.run_selected_methods_once
+    def status_queues(self) -> None:
+        command = f"""python3 -c
+            '{self.celery_inspect}; print(json.dumps(inspect.active_queues(), default=str))'
+        """
+        celery_workers_queues: dict = self.decode_command_output(
+            self.run_command_on_the_container(command)
+        )
+        consumed = {
+            worker.partition("@")[0]: [queue["name"] for queue in queues]
+            for worker, queues in celery_workers_queues.items()
+        }
+        assert \
+            all(consumed.get(queue) == [queue] for queue in ("sql_lab", "reports", "maintenance")), \
+            f"""The sql_lab, reports and maintenance workers are supposed to consume only their own queue
+                \nCommand: {command}\nReturned decoded: {celery_workers_queues}
+            """
+
+    @decorators.Overlay.run_selected_methods_once
+    def status_cache_warmup(self) -> None:
+        beat_services = self.client.services.list(filters={"name": "celery-beat"})
+        assert \
+            beat_services and any(
+                task["Status"]["State"] == "running"
+                for task in beat_services[0].tasks(filters={"desired-state": "running"})
+            ), \
+            "The celery-beat service scheduling the cache warm-up is not running"
+        command = f"""python3 -c
+            '{self.celery_inspect}; print(json.dumps(inspect.registered(), default=str))'
+        """
+        celery_workers_tasks: dict = self.decode_command_output(
+            self.run_command_on_the_container(command)
+        )
+        assert \
+            any(
+                "cache_warmup.warm_up_chart" in tasks
+                for worker, tasks in celery_workers_tasks.items() if worker.startswith("maintenance@")
+            ), \
+            f"""The cache warm-up tasks are not registered by the maintenance worker
+                \nCommand: {command}\nReturned decoded: {celery_workers_tasks}
+            """
+
     def find_processed_queries(self) -> bool:
         command = f"""python3 -c
-            'import celery; print(celery.Celery(\"tasks\", broker=\"{self.celery_broker}\").control.inspect().stats())'
+            '{self.celery_inspect}; print(json.dumps(inspect.stats(), default=str))'
         """
         celery_workers_stats: dict = self.decode_command_output(
             self.run_command_on_the_container(command)
         )
-        celery_worker_id = next(iter(celery_workers_stats))
         assert \
-            celery_workers_stats[celery_worker_id]["total"][self.celery_sql_lab_task_annotations] > 0, \
+            any(
+                worker_stats["total"].get(self.celery_sql_lab_task_annotations, 0) > 0
+                for worker, worker_stats in celery_workers_stats.items() if worker.startswith("sql_lab@")
+            ), \
             f"""Executed SQL Lab queries are not processed or registered by Celery,
                 check the Celery worker process on the {self.superset_container}
                 \nCommand: {command}\nReturned decoded: {celery_workers_stats}
@@ -256,10 +331,12 @@ class Superset(container.ContainerConnection, metaclass=decorators.Overlay):
             mode="r",
             encoding="utf-8"
         ) as mysql_superset_password:
+            password = mysql_superset_password.read().strip()
+        for database_name, port in (("MySQL", 6446), ("MySQL (read-only)", 6447)):
             payload = f'''
             {{
-                "database_name": "MySQL",
-                "sqlalchemy_uri": "mysql+mysqlconnector://superset:{mysql_superset_password.read().strip()}@{self.virtual_ip_address}:6446/superset",
+                "database_name": "{database_name}",
+                "sqlalchemy_uri": "mysql+mysqlconnector://superset:{password}@{self.virtual_ip_address}:{port}/superset",
                 "impersonate_user": "false"
             }}
             '''    # noqa: E501
@@ -279,11 +356,53 @@ class Superset(container.ContainerConnection, metaclass=decorators.Overlay):
             test_database_connection = self.run_command_on_the_container(command)
             assert \
                 self.find_in_the_output(test_database_connection, b'{"message":"OK"}'), \
-                f"""Could not connect to the superset database on {self.virtual_ip_address} port 6446, \
+                f"""Could not connect to the superset database on {self.virtual_ip_address} port {port}, \
                     the database is either down or not configured according to the given SQL Alchemy URI \
                     \nCommand: {command!r}\nReturned: {test_database_connection!r} \
                 """
 
+    @decorators.Overlay.run_selected_methods_once
+    def status_connection_budget(self) -> None:
+        command = "printenv \
+            SQLALCHEMY_POOL_SIZE SQLALCHEMY_MAX_OVERFLOW SQLALCHEMY_POOL_TIMEOUT SQLALCHEMY_POOL_RECYCLE"
+        connection_budget = self.run_command_on_the_container(command).split()
+        assert \
+            len(connection_budget) == 4 and all(setting.isdigit() for setting in connection_budget), \
+            f"The connection budget is not passed to the Superset container\nReturned: {connection_budget!r}"
+
+    @decorators.Overlay.run_selected_methods_once
+    def status_static_assets(self) -> None:
+        command = f"""
+            curl \
+                --cacert /app/server_certificate.pem \
+                --silent \
+                --http2 \
+                --compressed \
+                --output /dev/null \
+                --dump-header - \
+                https://{self.virtual_ip_address}/static/assets/images/favicon.png
+        """
+        self.run_command_on_the_container(command)
+        static_asset_headers = self.run_command_on_the_container(command)
+        assert \
+            self.find_in_the_output(static_asset_headers, b"HTTP/2 200"), \
+            f"Static assets are not served over HTTP/2\nCommand: {command!r}\nReturned: {static_asset_headers!r}"
+        assert \
+            self.find_in_the_output(static_asset_headers, b"x-cache-status: HIT"), \
+            f"Static assets are not served from the Nginx cache\nCommand: {command!r}\n" \
+            f"Returned: {static_asset_headers!r}"
+        assert \
+            self.find_in_the_output(static_asset_headers, b"cache-control: max-age=31536000"), \
+            f"Static assets are served without long expiry\nCommand: {command!r}\nReturned: {static_asset_headers!r}"
+
+    @decorators.Overlay.run_selected_methods_once
+    def status_web_profile(self) -> None:
+        command = "python3 /app/load_test.py --duration 10"
+        load_test_output = self.run_command_on_the_container(command)
+        assert \
+            self.find_in_the_output(load_test_output, b"Profile checks passed"), \
+            f"The Gunicorn profile did not pass the load test\nCommand: {command!r}\nReturned: {load_test_output!r}"
+
     @decorators.Overlay.run_selected_methods_once
     def status_swarm(self) -> None:
         swarm_info = self.info()["Swarm"]
@@ -293,6 +412,18 @@ class Superset(container.ContainerConnection, metaclass=decorators.Overlay):
         assert \
             swarm_info["ControlAvailable"] is True, \
             "The testing localhost is supposed to be a Swarm manager, but it is not"
+        managers = {node.id: node for node in self.client.nodes.list(filters={"role": "manager"})}
+        mgmt_nodes = {node.id for node in self.client.nodes.list(filters={"node.label": "superset-cluster.role=mgmt"})}
+        assert \
+            len(managers) % 2 == 1 and mgmt_nodes <= set(managers), \
+            f"The Swarm is supposed to have an odd number of managers including the management nodes\n" \
+            f"Managers: {set(managers)}\nMgmt: {mgmt_nodes}"
+        assert \
+            all(
+                node.attrs["Spec"]["Availability"] == "drain"
+                for node_id, node in managers.items() if node_id not in mgmt_nodes
+            ), \
+            "The MySQL nodes managing the Swarm are supposed to be drained"
 
     def run_query(self) -> float:
         payload = '{"database_id": 1, "runAsync": true, "sql": "SELECT * FROM superset.logs;"}'